@@ -3,6 +3,10 @@ import re
 
 import review4d
 
+__review4d__ = {
+    "ContextCollector": ["BNS Context"],
+}
+
 CTX_PATTERNS = [
     r"/animation/3d/(?P<folder>.*?)/(?P<parent>.*?)/(?P<name>.*?)(/|$)",
     r"/animation/(?P<folder>.*?)/(?P<parent>.*?)/(?P<name>.*?)(/|$)",
@@ -25,6 +29,8 @@ class BnsContextCollector(review4d.ContextCollector):
         }
     """
 
+    label = "BNS Context"
+
     def execute(self, file, ctx):
         bns_ctx = {
             "project": "",
@@ -2,6 +2,10 @@ import datetime
 
 import review4d
 
+__review4d__ = {
+    "PathPreset": ["Animation", "Dailies"],
+}
+
 
 class AnimPreset(review4d.PathPreset):
     """Generates a path to the correct review/animation folder in the
@@ -1,16 +1,25 @@
+import contextlib
+import heapq
+import importlib.util
+import itertools
 import json
 import os
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 import c4d
 
 import review4d
 
-try:
-    import sgtk
-
-    SHOTGRID_AVAILABLE = True
-except ImportError:
-    SHOTGRID_AVAILABLE = False
+# This module registers a c4d command plugin so it can't be loaded lazily.
+# Avoid importing sgtk until it's actually needed.
+SHOTGRID_AVAILABLE = importlib.util.find_spec("sgtk") is not None
 
 
 SHOTGRID_COMMAND_ID = 1058262
@@ -18,9 +27,1319 @@ SHOTGRID_COMMAND_ID = 1058262
 
 CTX = {
     "render_path": "",
+    "render_paths": [],
 }
 
 
+class ShotGridUnavailable(Exception):
+    """Raised when there is no sgtk engine to get a ShotGrid connection from."""
+
+
+class UploadStatus:
+    """ShotGridUpload status Enum."""
+
+    queued = "queued"
+    deferred = "deferred"
+    creating = "creating"
+    uploading = "uploading"
+    waiting = "waiting"
+    done = "done"
+    failed = "failed"
+    cancelled = "cancelled"
+
+    finished = (done, failed, cancelled)
+
+
+class ShotGridUpload:
+    """A Version to create or update and the media to upload to it.
+
+    Attributes:
+        version_data (dict): Fields of the Version.
+        path (str): Media file to upload.
+        field_name (str): Version field to upload the media to.
+        status (str): One of the UploadStatus values.
+        progress (float): Upload progress from 0 to 1.
+        version (dict): The created or updated Version.
+        error (str): Error raised by the last attempt.
+        id (int): Row id in the UploadQueue.
+        checksum (str): Content hash of the media file.
+        skipped (bool): True if the media was already uploaded to the
+            Version and the upload was skipped.
+        attempts (int): Number of times the upload was started.
+        next_attempt (float): Time the upload may start. Failed attempts
+            push this back.
+    """
+
+    def __init__(self, version_data, path, field_name="sg_uploaded_movie"):
+        self.version_data = version_data
+        self.path = path
+        self.field_name = field_name
+        self.status = UploadStatus.queued
+        self.progress = 0.0
+        self.version = None
+        self.media = None
+        self.error = None
+        self.id = None
+        self.checksum = None
+        self.skipped = False
+        self.attempts = 0
+        self.next_attempt = 0.0
+        self.cancelled = False
+        self.on_progress = None
+        self.on_finished = None
+        self.queued_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    def __repr__(self):
+        return "<ShotGridUpload:{}:{}>".format(self.name, self.status)
+
+    @property
+    def name(self):
+        return self.version_data["code"]
+
+    @property
+    def finished(self):
+        return self.status in UploadStatus.finished
+
+    def wait(self, timeout=None):
+        """Block until the upload is finished or deferred.
+
+        Returns True if finished or deferred.
+        """
+
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        """Cancel the upload.
+
+        A request already sent to ShotGrid can't be interrupted, the upload
+        stops before its next request.
+        """
+
+        self.cancelled = True
+
+
+class SQLiteStore:
+    """Base class of stores kept in a SQLite database in the review4d cache.
+
+    Subclasses set filename and the schema statements run on first connect.
+
+    Arguments:
+        path (str): Database file. Defaults to filename in the local review4d
+            cache.
+    """
+
+    filename = None
+    schema = []
+
+    def __init__(self, path=None):
+        self.path = path or review4d.get_cache_path(self.filename)
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            for statement in self.schema:
+                conn.execute(statement)
+            conn.commit()
+            self._initialized = True
+        return conn
+
+
+class UploadQueue(SQLiteStore):
+    """Durable record of ShotGridUploads stored in a SQLite database.
+
+    Uploads are written when queued and updated on every status change so
+    unfinished uploads can be resumed after C4D restarts. Each upload is owned
+    by the process that queued or resumed it. The owner renews its lease on
+    every update and other C4D instances only resume the upload once the
+    lease expired or the owner isn't running anymore.
+
+    Attributes:
+        lease (float): Seconds an upload stays owned by a process after its
+            last update.
+    """
+
+    filename = "shotgrid_uploads.sqlite"
+    lease = 60 * 60.0
+    schema = [
+        "CREATE TABLE IF NOT EXISTS uploads ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "version_data TEXT NOT NULL, "
+        "path TEXT NOT NULL, "
+        "field_name TEXT NOT NULL, "
+        "status TEXT NOT NULL, "
+        "version TEXT, "
+        "error TEXT, "
+        "attempts INTEGER NOT NULL DEFAULT 0, "
+        "next_attempt REAL NOT NULL DEFAULT 0, "
+        "queued_at REAL NOT NULL, "
+        "finished_at REAL, "
+        "owner INTEGER, "
+        "lease_expires REAL NOT NULL DEFAULT 0)"
+    ]
+
+    def add(self, upload):
+        """Store a new upload and set its id."""
+
+        with self._lock, contextlib.closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "INSERT INTO uploads (version_data, path, field_name, status, "
+                "queued_at, owner, lease_expires) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    json.dumps(upload.version_data),
+                    upload.path,
+                    upload.field_name,
+                    upload.status,
+                    upload.queued_at,
+                    os.getpid(),
+                    time.time() + self.lease,
+                ),
+            )
+            conn.commit()
+            upload.id = cursor.lastrowid
+        return upload
+
+    def update(self, upload):
+        """Store the current state of an upload."""
+
+        with self._lock, contextlib.closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE uploads SET status = ?, version = ?, error = ?, "
+                "attempts = ?, next_attempt = ?, finished_at = ?, owner = ?, "
+                "lease_expires = ? WHERE id = ?",
+                (
+                    upload.status,
+                    json.dumps(upload.version) if upload.version else None,
+                    upload.error,
+                    upload.attempts,
+                    upload.next_attempt,
+                    upload.finished_at,
+                    os.getpid(),
+                    time.time() + self.lease,
+                    upload.id,
+                ),
+            )
+            conn.commit()
+
+    def claim_pending(self):
+        """Take ownership of the unfinished uploads that can be resumed.
+
+        Uploads owned by this process, by a process that isn't running or
+        whose lease expired are claimed. Uploads of other running C4D
+        instances are skipped.
+
+        Returns:
+            list of ShotGridUpload in the order they were queued.
+        """
+
+        pid = os.getpid()
+        with self._lock, contextlib.closing(self._connect()) as conn:
+            # Lock the database so two instances can't claim the same upload
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            rows = [
+                row
+                for row in conn.execute(
+                    "SELECT id, version_data, path, field_name, version, error, "
+                    "attempts, next_attempt, queued_at, owner, lease_expires "
+                    "FROM uploads WHERE status NOT IN (?, ?, ?) ORDER BY id",
+                    UploadStatus.finished,
+                ).fetchall()
+                if row[9] in (None, pid)
+                or row[10] < now
+                or not is_process_running(row[9])
+            ]
+            conn.executemany(
+                "UPDATE uploads SET owner = ?, lease_expires = ? WHERE id = ?",
+                [(pid, now + self.lease, row[0]) for row in rows],
+            )
+            conn.commit()
+
+        uploads = []
+        for row in rows:
+            upload = ShotGridUpload(json.loads(row[1]), row[2], row[3])
+            upload.id = row[0]
+            upload.version = json.loads(row[4]) if row[4] else None
+            upload.error = row[5]
+            upload.attempts = row[6]
+            upload.next_attempt = row[7]
+            upload.queued_at = row[8]
+            uploads.append(upload)
+        return uploads
+
+    def purge(self, age=7 * 24 * 60 * 60):
+        """Delete finished uploads older than age seconds."""
+
+        with self._lock, contextlib.closing(self._connect()) as conn:
+            conn.execute(
+                "DELETE FROM uploads WHERE finished_at < ?", (time.time() - age,)
+            )
+            conn.commit()
+
+
+class MediaIndex(SQLiteStore):
+    """Index of the media uploaded to ShotGrid by content hash.
+
+    Checksums are stored with the size and mtime of the file they were
+    computed from so unchanged files aren't hashed again.
+    """
+
+    filename = "shotgrid_media.sqlite"
+    schema = [
+        "CREATE TABLE IF NOT EXISTS files ("
+        "path TEXT PRIMARY KEY, "
+        "size INTEGER NOT NULL, "
+        "mtime_ns INTEGER NOT NULL, "
+        "checksum TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS media ("
+        "checksum TEXT NOT NULL, "
+        "entity_type TEXT NOT NULL, "
+        "entity_id INTEGER NOT NULL, "
+        "field_name TEXT NOT NULL, "
+        "size INTEGER NOT NULL, "
+        "attachment_id INTEGER, "
+        "status TEXT NOT NULL, "
+        "uploaded_at REAL NOT NULL, "
+        "PRIMARY KEY (checksum, entity_type, entity_id, field_name))",
+    ]
+
+    def get_checksum(self, path):
+        """Get the checksum of a file, hashing it only if it changed."""
+
+        stat = os.stat(path)
+        with self._lock, contextlib.closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT checksum FROM files WHERE path = ? AND size = ? "
+                "AND mtime_ns = ?",
+                (path, stat.st_size, stat.st_mtime_ns),
+            ).fetchone()
+        if row:
+            return row[0]
+
+        checksum = review4d.hash_file(path)
+        with self._lock, contextlib.closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, checksum),
+            )
+            conn.commit()
+        return checksum
+
+    def is_uploaded(self, checksum, entity, field_name):
+        """Return True if media with checksum was uploaded to an entity."""
+
+        with self._lock, contextlib.closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT status FROM media WHERE checksum = ? AND entity_type = ? "
+                "AND entity_id = ? AND field_name = ?",
+                (checksum, entity["type"], entity["id"], field_name),
+            ).fetchone()
+        return bool(row) and row[0] == UploadStatus.done
+
+    def record(self, checksum, size, entity, field_name, attachment_id=None):
+        """Record that media with checksum was uploaded to an entity."""
+
+        with self._lock, contextlib.closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    checksum,
+                    entity["type"],
+                    entity["id"],
+                    field_name,
+                    size,
+                    attachment_id,
+                    UploadStatus.done,
+                    time.time(),
+                ),
+            )
+            conn.commit()
+
+
+class ShotGridUploader:
+    """Uploads Versions to ShotGrid in background threads.
+
+    Failed uploads are retried with exponential backoff. When a queue is
+    provided every upload is stored in it, and load_pending resumes the
+    uploads left unfinished by a previous session.
+
+    Arguments:
+        get_shotgun (callable): Returns the Shotgun connection to use. Called
+            from the worker thread. Defaults to the current sgtk engine's
+            connection, which is local to each thread.
+        workers (int): Maximum number of concurrent uploads.
+        queue (UploadQueue): Durable store of uploads.
+        media_index (MediaIndex): Index of uploaded media. Media whose
+            content was already uploaded to the Version is skipped.
+        max_attempts (int): Attempts before an upload fails.
+        backoff (float): Seconds to wait after the first failed attempt. The
+            wait doubles after each failed attempt up to max_backoff.
+    """
+
+    def __init__(
+        self,
+        get_shotgun=None,
+        workers=4,
+        queue=None,
+        media_index=None,
+        max_attempts=5,
+        backoff=10.0,
+        max_backoff=900.0,
+    ):
+        self.get_shotgun = get_shotgun or get_engine_shotgun
+        self.workers = workers
+        self.queue = queue
+        self.media_index = media_index
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.uploads = []
+        self._executor = None
+        self._waiting = []
+        self._waiting_count = itertools.count()
+        self._drainer = None
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+
+    @property
+    def active(self):
+        """Uploads that are not finished."""
+
+        with self._lock:
+            return [upload for upload in self.uploads if not upload.finished]
+
+    def upload(self, version_data, path, on_progress=None, on_finished=None):
+        """Create or update a Version and upload media to it in the background.
+
+        Arguments:
+            version_data (dict): Fields of the Version.
+            path (str): Media file to upload.
+            on_progress (callable): Called with the ShotGridUpload whenever its
+                status or progress changes. Called from a worker thread.
+            on_finished (callable): Called with the ShotGridUpload once it is
+                finished or deferred. Called from a worker thread.
+
+        Returns:
+            ShotGridUpload
+        """
+
+        return self.upload_many([(version_data, path)], on_progress, on_finished)[0]
+
+    def upload_many(self, items, on_progress=None, on_finished=None):
+        """Create or update Versions and upload media to them in the background.
+
+        All Versions are created or updated together by upsert_versions, then
+        their media is uploaded concurrently.
+
+        Arguments:
+            items (list): (version_data, path) tuples.
+            on_progress (callable): Called with a ShotGridUpload whenever its
+                status or progress changes. Called from a worker thread.
+            on_finished (callable): Called with a ShotGridUpload once it is
+                finished or deferred. Called from a worker thread.
+
+        Returns:
+            list of ShotGridUpload
+        """
+
+        uploads = []
+        for version_data, path in items:
+            upload = ShotGridUpload(version_data, path)
+            upload.on_progress = on_progress
+            upload.on_finished = on_finished
+            if self.queue:
+                try:
+                    self.queue.add(upload)
+                except sqlite3.Error as e:
+                    print(
+                        "review4d> Failed to queue ShotGrid upload %s: %s" % (path, e)
+                    )
+            uploads.append(upload)
+
+        with self._lock:
+            self.uploads = [u for u in self.uploads if not u.finished] + uploads
+            self._get_executor().submit(self._run_upsert, uploads)
+        return uploads
+
+    def load_pending(self, on_progress=None, on_finished=None):
+        """Resume the unfinished uploads stored in the queue.
+
+        Returns:
+            list of ShotGridUpload
+        """
+
+        if not self.queue:
+            return []
+
+        with self._lock:
+            ids = {upload.id for upload in self.uploads}
+
+        uploads = []
+        for upload in self.queue.claim_pending():
+            if upload.id in ids:
+                continue
+            upload.on_progress = on_progress
+            upload.on_finished = on_finished
+            self._schedule(upload)
+            uploads.append(upload)
+        return uploads
+
+    def cancel_all(self):
+        for upload in self.active:
+            upload.cancel()
+
+        with self._wake:
+            self._wake.notify()
+
+    def _schedule(self, upload):
+        with self._lock:
+            if upload not in self.uploads:
+                self.uploads = [u for u in self.uploads if not u.finished]
+                self.uploads.append(upload)
+
+            if upload.next_attempt > time.time() and not upload.cancelled:
+                entry = (upload.next_attempt, next(self._waiting_count), upload)
+                heapq.heappush(self._waiting, entry)
+                if self._drainer is None:
+                    self._drainer = threading.Thread(
+                        target=self._drain,
+                        name="review4d.ShotGridUploader.drain",
+                        daemon=True,
+                    )
+                    self._drainer.start()
+                self._wake.notify()
+                return
+
+            self._get_executor().submit(self._run, upload)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="review4d.ShotGridUploader",
+            )
+        return self._executor
+
+    def _drain(self):
+        """Submit waiting uploads once they are due."""
+
+        while True:
+            with self._wake:
+                while True:
+                    now = time.time()
+                    ready = [
+                        entry
+                        for entry in self._waiting
+                        if entry[0] <= now or entry[2].cancelled
+                    ]
+                    if ready:
+                        break
+                    timeout = self._waiting[0][0] - now if self._waiting else None
+                    self._wake.wait(timeout)
+
+                self._waiting = [e for e in self._waiting if e not in ready]
+                heapq.heapify(self._waiting)
+                for _, _, upload in ready:
+                    self._get_executor().submit(self._run, upload)
+
+    def _run_upsert(self, uploads):
+        """Create or update the Versions of uploads then schedule them.
+
+        Uploads whose Version could not be upserted create it themselves and
+        retry like any other failed request.
+        """
+
+        pending = [u for u in uploads if u.version is None and not u.cancelled]
+        if pending:
+            try:
+                for upload in pending:
+                    self._set_status(upload, UploadStatus.creating, 0.1)
+                versions = upsert_versions(
+                    self.get_shotgun(), [u.version_data for u in pending]
+                )
+                for upload, version in zip(pending, versions):
+                    upload.version = version
+                    self._save(upload)
+            except Exception as e:
+                print("review4d> Failed to update ShotGrid versions: %s" % e)
+
+        for upload in uploads:
+            self._schedule(upload)
+
+    def _run(self, upload):
+        try:
+            if upload.cancelled:
+                upload.status = UploadStatus.cancelled
+                return
+
+            shotgun = self.get_shotgun()
+            upload.attempts += 1
+            upload.error = None
+            if upload.version is None:
+                self._set_status(upload, UploadStatus.creating, 0.1)
+                upload.version = create_version(shotgun, upload.version_data)
+
+            if upload.cancelled:
+                upload.status = UploadStatus.cancelled
+                return
+
+            if self._is_uploaded(upload):
+                upload.skipped = True
+                upload.progress = 1.0
+                upload.status = UploadStatus.done
+                return
+
+            self._set_status(upload, UploadStatus.uploading, 0.2)
+            upload.media = shotgun.upload(
+                "Version",
+                upload.version["id"],
+                path=upload.path,
+                field_name=upload.field_name,
+            )
+            self._record_uploaded(upload)
+            upload.progress = 1.0
+            upload.status = UploadStatus.done
+        except ShotGridUnavailable as e:
+            self._defer(upload, e)
+        except Exception as e:
+            upload.error = str(e)
+            if upload.attempts < self.max_attempts and not upload.cancelled:
+                self._retry(upload)
+                return
+            upload.status = UploadStatus.failed
+        finally:
+            if upload.finished:
+                upload.finished_at = time.time()
+                self._save(upload)
+                self._notify(upload, upload.on_progress)
+                self._notify(upload, upload.on_finished)
+                upload._done.set()
+
+    def _is_uploaded(self, upload):
+        """Return True if the upload's media was already uploaded."""
+
+        if not self.media_index:
+            return False
+
+        try:
+            if upload.checksum is None:
+                upload.checksum = self.media_index.get_checksum(upload.path)
+            version = {"type": "Version", "id": upload.version["id"]}
+            return self.media_index.is_uploaded(
+                upload.checksum, version, upload.field_name
+            )
+        except sqlite3.Error as e:
+            print("review4d> Failed to read ShotGrid media index: %s" % e)
+            return False
+
+    def _record_uploaded(self, upload):
+        if not self.media_index or upload.checksum is None:
+            return
+
+        try:
+            self.media_index.record(
+                upload.checksum,
+                os.path.getsize(upload.path),
+                {"type": "Version", "id": upload.version["id"]},
+                upload.field_name,
+                upload.media,
+            )
+        except (OSError, sqlite3.Error) as e:
+            print("review4d> Failed to update ShotGrid media index: %s" % e)
+
+    def _defer(self, upload, error):
+        """Leave an upload in the queue until ShotGrid is available.
+
+        This is not counted as a failed attempt, the upload is resumed by the
+        next load_pending. on_finished is called with the deferred upload.
+        """
+
+        upload.error = str(error)
+        upload.status = UploadStatus.deferred
+        self._save(upload)
+        with self._lock:
+            if upload in self.uploads:
+                self.uploads.remove(upload)
+        print(
+            "review4d> ShotGrid upload %s deferred until ShotGrid is available."
+            % upload.name
+        )
+        self._notify(upload, upload.on_progress)
+        self._notify(upload, upload.on_finished)
+        upload._done.set()
+
+    def _retry(self, upload):
+        delay = min(self.backoff * 2 ** (upload.attempts - 1), self.max_backoff)
+        upload.next_attempt = time.time() + delay * random.uniform(0.5, 1.0)
+        upload.status = UploadStatus.waiting
+        self._save(upload)
+        self._notify(upload, upload.on_progress)
+        print(
+            "review4d> ShotGrid upload %s failed, retrying in %ds: %s"
+            % (upload.name, upload.next_attempt - time.time(), upload.error)
+        )
+        self._schedule(upload)
+
+    def _set_status(self, upload, status, progress):
+        upload.status = status
+        upload.progress = progress
+        self._save(upload)
+        self._notify(upload, upload.on_progress)
+
+    def _save(self, upload):
+        if not self.queue:
+            return
+        try:
+            self.queue.update(upload)
+        except sqlite3.Error as e:
+            print("review4d> Failed to save ShotGrid upload %s: %s" % (upload.name, e))
+
+    def _notify(self, upload, callback):
+        if callback is None:
+            return
+        try:
+            callback(upload)
+        except Exception as e:
+            print("review4d> ShotGrid upload callback failed: %s" % e)
+
+
+def is_process_running(pid):
+    """Return True if a process with the pid is running."""
+
+    if sys.platform == "win32":
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        # PROCESS_QUERY_LIMITED_INFORMATION
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            # ERROR_ACCESS_DENIED, the process exists
+            return kernel32.GetLastError() == 5
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            # STILL_ACTIVE
+            return exit_code.value == 259
+        finally:
+            kernel32.CloseHandle(handle)
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def get_engine_shotgun():
+    import sgtk
+
+    engine = sgtk.platform.current_engine()
+    if engine is None:
+        raise ShotGridUnavailable("No ShotGrid engine is running.")
+    return engine.shotgun
+
+
+shotgrid_uploader = ShotGridUploader(queue=UploadQueue(), media_index=MediaIndex())
+
+
+def get_uploader():
+    """Get the ShotGridUploader shared by all dialogs."""
+
+    return shotgrid_uploader
+
+
+class ProjectCache:
+    """Cached entities and tasks of a ShotGrid project.
+
+    Attributes:
+        project_id (int): Id of the Project.
+        entities (list): Assets and Shots sorted by code or None if the
+            entities were never fetched.
+        entities_fetched_at (float): Time the entities were fetched.
+        tasks (dict): Maps entity keys to their Tasks sorted by content or
+            None if the tasks were never fetched.
+        tasks_fetched_at (float): Time the tasks were fetched.
+        entity_index (EntityIndex): Search index of the entities. Rebuilt
+            when the entities change, not stored in snapshots.
+    """
+
+    def __init__(self, project_id):
+        self.project_id = project_id
+        self.entities = None
+        self.entities_fetched_at = 0.0
+        self.tasks = None
+        self.tasks_fetched_at = 0.0
+        self.entity_index = None
+
+    def to_dict(self):
+        return {
+            "project_id": self.project_id,
+            "entities": self.entities,
+            "entities_fetched_at": self.entities_fetched_at,
+            "tasks": self.tasks,
+            "tasks_fetched_at": self.tasks_fetched_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        cache = cls(data["project_id"])
+        cache.entities = data["entities"]
+        cache.entities_fetched_at = data["entities_fetched_at"]
+        cache.tasks = data["tasks"]
+        cache.tasks_fetched_at = data["tasks_fetched_at"]
+        return cache
+
+
+class EntityIndex:
+    """Search index over the codes of ShotGrid entities.
+
+    Codes are split into lowercase tokens of letters or digits. A prefix trie
+    maps every prefix of a token, or of the whole code, to the entities it
+    matches and a token index maps whole tokens to entities. Queries match
+    entities where every query token is a prefix of one of their tokens.
+
+    Arguments:
+        entities (list): Entities with a code field.
+    """
+
+    def __init__(self, entities):
+        self.entities = entities
+        self.codes = [entity["code"].lower() for entity in entities]
+        self.positions = {}
+        self.trie = {}
+        self.tokens = {}
+        for i, (entity, code) in enumerate(zip(entities, self.codes)):
+            self.positions.setdefault(entity["id"], i)
+            for token in set(tokenize(code)) | {code}:
+                self.tokens.setdefault(token, set()).add(i)
+                node = self.trie
+                for char in token:
+                    node = node.setdefault(char, {})
+                    node.setdefault(None, set()).add(i)
+
+    def __len__(self):
+        return len(self.entities)
+
+    def match(self, query):
+        """Get the positions of the entities matching a query.
+
+        Returns:
+            set
+        """
+
+        terms = tokenize(query)
+        if not terms:
+            return set(range(len(self.entities)))
+
+        matches = None
+        for term in terms:
+            node = self.trie
+            for char in term:
+                node = node.get(char)
+                if node is None:
+                    return set()
+            matches = node[None] if matches is None else matches & node[None]
+            if not matches:
+                break
+        return set(matches)
+
+    def search(self, query, limit=100, pinned=()):
+        """Get the best matching entities for a query.
+
+        Matches are ranked by exact code, code prefix, exact tokens then
+        token prefixes, and by code within each rank.
+
+        Arguments:
+            query (str): Text typed by the user.
+            limit (int): Maximum number of entities to return.
+            pinned (list): Ids of entities to list first when they match,
+                like recent or context entities.
+
+        Returns:
+            list of entities
+        """
+
+        query = query.strip().lower()
+        terms = tokenize(query)
+        matches = self.match(query)
+
+        def rank(i):
+            code = self.codes[i]
+            if query and code == query:
+                return (0, code)
+            if query and code.startswith(query):
+                return (1, code)
+            if terms and all(i in self.tokens.get(term, ()) for term in terms):
+                return (2, code)
+            return (3, code)
+
+        results = []
+        for entity_id in pinned:
+            i = self.positions.get(entity_id)
+            if i in matches and i not in results:
+                results.append(i)
+
+        pinned_positions = set(results)
+        results.extend(
+            heapq.nsmallest(
+                limit,
+                (i for i in matches if i not in pinned_positions),
+                key=rank,
+            )
+        )
+        return [self.entities[i] for i in results[:limit]]
+
+
+def tokenize(text):
+    return re.findall(r"[a-z]+|\d+", text.lower())
+
+
+class ShotGridCache:
+    """Process wide cache of the entities and tasks of ShotGrid projects.
+
+    Cached values are returned immediately. Values older than ttl are
+    refreshed in a background thread and the stale value is returned until
+    the refresh completes. The Tasks of every entity in a project are fetched
+    together in one query, so looking up the Tasks of another entity doesn't
+    need a request. Each project is also written to a JSON snapshot so
+    the first dialog opened in a session doesn't wait for ShotGrid.
+
+    Arguments:
+        get_shotgun (callable): Returns the Shotgun connection to use.
+        ttl (float): Seconds before cached values are refreshed.
+        snapshot_folder (str): Folder to store snapshots in. Defaults to the
+            shotgrid folder of the local review4d cache. Set snapshots to
+            False to disable snapshots.
+    """
+
+    def __init__(
+        self, get_shotgun=None, ttl=300.0, snapshot_folder=None, snapshots=True
+    ):
+        self.get_shotgun = get_shotgun or get_engine_shotgun
+        self.ttl = ttl
+        self.snapshot_folder = snapshot_folder
+        self.snapshots = snapshots
+        self._projects = {}
+        self._refreshing = {}
+        self._lock = threading.RLock()
+
+    def get_entities(self, project):
+        """Get the Assets and Shots of a project sorted by code.
+
+        Cached and stale values are returned immediately. Waits for a running
+        prefetch only when nothing is cached yet.
+        """
+
+        cache = self._get_project(project)
+        with self._lock:
+            entities = cache.entities
+            fetched_at = cache.entities_fetched_at
+
+        if entities is None:
+            self._wait_for_refresh(self.refresh_entities, project)
+            with self._lock:
+                entities = cache.entities
+            if entities is None:
+                return self.refresh_entities(project)
+            return entities
+
+        if self._expired(fetched_at):
+            self._refresh_in_background(self.refresh_entities, project)
+        return entities
+
+    def get_entity_index(self, project):
+        """Get a search index of the entities of a project."""
+
+        entities = self.get_entities(project)
+        cache = self._get_project(project)
+        with self._lock:
+            index = cache.entity_index
+        if index is None or index.entities is not entities:
+            index = EntityIndex(entities)
+            with self._lock:
+                cache.entity_index = index
+        return index
+
+    def get_tasks(self, project, entity):
+        """Get the Tasks of an entity sorted by content.
+
+        Cached and stale values are returned immediately. Waits for a running
+        prefetch only when nothing is cached yet.
+        """
+
+        cache = self._get_project(project)
+        with self._lock:
+            tasks = cache.tasks
+            fetched_at = cache.tasks_fetched_at
+
+        if tasks is None:
+            self._wait_for_refresh(self.refresh_tasks, project)
+            with self._lock:
+                tasks = cache.tasks
+            if tasks is None:
+                tasks = self.refresh_tasks(project)
+        elif self._expired(fetched_at):
+            self._refresh_in_background(self.refresh_tasks, project)
+        return tasks.get(get_entity_key(entity), [])
+
+    def prefetch(self, project):
+        """Fetch the entities and tasks of a project in the background unless
+        they are cached and fresh."""
+
+        cache = self._get_project(project)
+        with self._lock:
+            fetch_entities = cache.entities is None or self._expired(
+                cache.entities_fetched_at
+            )
+            fetch_tasks = cache.tasks is None or self._expired(cache.tasks_fetched_at)
+
+        if fetch_entities:
+            self._refresh_in_background(self.refresh_entities, project)
+        if fetch_tasks:
+            self._refresh_in_background(self.refresh_tasks, project)
+
+    def refresh_entities(self, project):
+        """Fetch the entities of a project from ShotGrid."""
+
+        entities = fetch_entities(self.get_shotgun(), project)
+        cache = self._get_project(project)
+        with self._lock:
+            cache.entities = entities
+            cache.entities_fetched_at = time.time()
+        self._write_snapshot(cache)
+        return entities
+
+    def refresh_tasks(self, project):
+        """Fetch the tasks of every entity in a project from ShotGrid.
+
+        Returns:
+            dict: Maps entity keys to Tasks sorted by content.
+        """
+
+        tasks = fetch_project_tasks(self.get_shotgun(), project)
+        cache = self._get_project(project)
+        with self._lock:
+            cache.tasks = tasks
+            cache.tasks_fetched_at = time.time()
+        self._write_snapshot(cache)
+        return tasks
+
+    def invalidate(self, project=None):
+        """Drop cached values of a project or of all projects.
+
+        Snapshots are kept but treated as expired.
+        """
+
+        with self._lock:
+            if project is None:
+                self._projects.clear()
+            else:
+                self._projects.pop(project["id"], None)
+
+    def _expired(self, fetched_at):
+        return time.time() - fetched_at > self.ttl
+
+    def _get_project(self, project):
+        with self._lock:
+            cache = self._projects.get(project["id"])
+            if cache is None:
+                cache = self._read_snapshot(project["id"])
+                cache = cache or ProjectCache(project["id"])
+                self._projects[project["id"]] = cache
+            return cache
+
+    def _refresh_in_background(self, func, *args):
+        key = (func.__name__, *(get_entity_key(arg) for arg in args))
+        with self._lock:
+            if key in self._refreshing:
+                return
+            done = self._refreshing[key] = threading.Event()
+
+        def refresh():
+            try:
+                func(*args)
+            except Exception as e:
+                print("review4d> Failed to refresh ShotGrid cache: %s" % e)
+            finally:
+                with self._lock:
+                    self._refreshing.pop(key, None)
+                done.set()
+
+        thread = threading.Thread(
+            target=refresh,
+            name="review4d.ShotGridCache.refresh",
+            daemon=True,
+        )
+        thread.start()
+
+    def _wait_for_refresh(self, func, *args, timeout=60):
+        key = (func.__name__, *(get_entity_key(arg) for arg in args))
+        with self._lock:
+            done = self._refreshing.get(key)
+        if done:
+            done.wait(timeout)
+
+    def _get_snapshot_path(self, project_id):
+        folder = self.snapshot_folder or review4d.get_cache_path("shotgrid")
+        return os.path.join(folder, "project_%s.json" % project_id)
+
+    def _read_snapshot(self, project_id):
+        if not self.snapshots:
+            return
+
+        path = self._get_snapshot_path(project_id)
+        try:
+            with open(path, "r") as f:
+                cache = ProjectCache.from_dict(json.load(f))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError) as e:
+            print("review4d> Failed to read ShotGrid snapshot %s: %s" % (path, e))
+            return
+
+        # Snapshots only speed up the first lookup, refresh them right away
+        cache.entities_fetched_at = 0.0
+        cache.tasks_fetched_at = 0.0
+        return cache
+
+    def _write_snapshot(self, cache):
+        if not self.snapshots:
+            return
+
+        path = self._get_snapshot_path(cache.project_id)
+        with self._lock:
+            data = json.dumps(cache.to_dict())
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = "%s.%s.tmp" % (path, threading.get_ident())
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print("review4d> Failed to write ShotGrid snapshot %s: %s" % (path, e))
+
+
+shotgrid_cache = ShotGridCache()
+
+
+def get_shotgrid_cache():
+    """Get the ShotGridCache shared by all dialogs."""
+
+    return shotgrid_cache
+
+
+def get_entity_key(entity):
+    if isinstance(entity, dict):
+        return "%s:%s" % (entity["type"], entity["id"])
+    return entity
+
+
+def fetch_entities(shotgun, project):
+    """Fetch the Assets and Shots of a project sorted by code."""
+
+    assets = shotgun.find(
+        "Asset",
+        filters=[["project", "is", project]],
+        fields=["code"],
+    )
+    shots = shotgun.find(
+        "Shot",
+        filters=[["project", "is", project]],
+        fields=["code"],
+    )
+    return sorted(assets + shots, key=lambda e: e["code"])
+
+
+def fetch_project_tasks(shotgun, project):
+    """Fetch the Tasks of every entity in a project.
+
+    find requests every page of the results so this is a single query no
+    matter how many entities the project has.
+
+    Returns:
+        dict: Maps entity keys to Tasks sorted by content.
+    """
+
+    tasks = shotgun.find(
+        "Task",
+        filters=[["project", "is", project]],
+        fields=["id", "content", "step", "entity"],
+    )
+
+    index = {}
+    for task in sorted(tasks, key=lambda e: e["content"]):
+        if task.get("entity"):
+            index.setdefault(get_entity_key(task["entity"]), []).append(task)
+    return index
+
+
+def create_version(shotgun, version_data):
+    """Get existing version or create a new one."""
+
+    version = shotgun.find_one(
+        "Version",
+        [
+            ["project", "is", version_data["project"]],
+            ["code", "is", version_data["code"]],
+            ["sg_task", "is", version_data["sg_task"]],
+            ["entity", "is", version_data["entity"]],
+        ],
+        ["id", "code", "sg_path_to_frames"],
+    )
+
+    if not version:
+        version = shotgun.create("Version", version_data)
+    else:
+        shotgun.update(
+            "Version",
+            version["id"],
+            version_data,
+        )
+
+    return version
+
+
+def get_context_item(items, context_item):
+    """Get the item matching a context entity or task from items by id.
+
+    Falls back to the first item, or None if there are no items.
+    """
+
+    if context_item and context_item["id"] in items:
+        return items[context_item["id"]]
+    return next(iter(items.values()), None)
+
+
+def get_upload_callbacks():
+    """Get callbacks that report uploads from the main thread."""
+
+    def on_progress(upload):
+        review4d.queue_command(
+            show_upload_progress, (upload,), key=("shotgrid_progress", id(upload))
+        )
+
+    return {
+        "on_progress": on_progress,
+        "on_finished": partial(review4d.execute_in_main_thread, show_upload_finished),
+    }
+
+
+def upsert_versions(shotgun, versions_data):
+    """Create or update Versions in a single batch request.
+
+    Existing Versions are found with one query and matched on project, code,
+    entity and task like create_version.
+
+    Returns:
+        list of Versions in the order of versions_data.
+    """
+
+    if not versions_data:
+        return []
+
+    projects = {d["project"]["id"]: d["project"] for d in versions_data}
+    existing = shotgun.find(
+        "Version",
+        [
+            ["project", "in", list(projects.values())],
+            ["code", "in", [d["code"] for d in versions_data]],
+        ],
+        ["id", "code", "sg_path_to_frames", "project", "entity", "sg_task"],
+    )
+    versions = {get_version_key(version): version for version in existing}
+
+    requests = []
+    for data in versions_data:
+        version = versions.get(get_version_key(data))
+        if version:
+            requests.append(
+                {
+                    "request_type": "update",
+                    "entity_type": "Version",
+                    "entity_id": version["id"],
+                    "data": data,
+                }
+            )
+        else:
+            requests.append(
+                {"request_type": "create", "entity_type": "Version", "data": data}
+            )
+    return shotgun.batch(requests)
+
+
+def get_render_paths():
+    """Get the render paths passed to the dialog by ShotGridPostRender."""
+
+    paths = CTX.get("render_paths") or [CTX.get("render_path", "")]
+    return [path for path in paths if path]
+
+
+def get_version_name(path):
+    """Get a Version name from a file path.
+
+    Render paths of multiple takes contain the take name, see
+    review4d.get_preview_name_from_context.
+    """
+
+    return os.path.basename(path).split(".")[0]
+
+
+def get_version_key(version):
+    return (
+        get_entity_key(version["project"]),
+        version["code"],
+        get_entity_key(version.get("entity")),
+        get_entity_key(version.get("sg_task")),
+    )
+
+
+def show_upload_progress(upload):
+    """Show the progress of an upload in the status bar. Main thread only."""
+
+    if upload.finished:
+        c4d.StatusClear()
+        return
+
+    if upload.status == UploadStatus.deferred:
+        c4d.StatusClear()
+        c4d.StatusSetText(
+            "ShotGrid upload {} deferred until ShotGrid is available".format(
+                upload.name
+            )
+        )
+        return
+
+    c4d.StatusSetText("ShotGrid {} {}".format(upload.status, upload.name))
+    c4d.StatusSetBar(int(upload.progress * 100))
+
+
+def show_upload_finished(upload):
+    """Report the result of an upload. Main thread only."""
+
+    if upload.skipped:
+        print("review4d> %s was already uploaded to ShotGrid." % upload.name)
+    elif upload.status == UploadStatus.done:
+        print("review4d> Uploaded %s to ShotGrid." % upload.name)
+    elif upload.status == UploadStatus.cancelled:
+        print("review4d> Cancelled ShotGrid upload %s." % upload.name)
+    elif upload.status == UploadStatus.deferred:
+        # Reported by show_upload_progress
+        return
+    else:
+        print("review4d> ShotGrid upload %s failed: %s" % (upload.name, upload.error))
+        c4d.gui.MessageDialog(
+            "Failed to upload {} to ShotGrid.\n\n{}".format(upload.name, upload.error)
+        )
+
+
 class ShotGridUploaderDialog(c4d.gui.GeDialog):
     # UI Constants
     USER_DATA_NAME = "c4dreview_sg_settings"
@@ -29,6 +1348,10 @@ class ShotGridUploaderDialog(c4d.gui.GeDialog):
     COMBO_ENTITY = 10003
     LABEL_TASK = 10004
     COMBO_TASK = 10005
+    LABEL_SEARCH = 10006
+    EDIT_SEARCH = 10007
+    ENTITY_LIMIT = 200
+    RECENT_LIMIT = 10
     GROUP_VERSION = 20001
     GROUP_BROWSE = 30001
     LABEL_FILE = 30002
@@ -40,30 +1363,51 @@ class ShotGridUploaderDialog(c4d.gui.GeDialog):
     EDIT_COMMENT = 20005
     GROUP_BUTTONS = 40001
     BUTTON_UPLOAD = 40002
+    LABEL_STATUS = 40003
+    BUTTON_CANCEL = 40004
+    GROUP_ITEMS = 50001
+    ITEM_IDS = 50100
+    TIMER_INTERVAL = 500
 
     def __init__(self, path):
         self.AddGadget(c4d.DIALOG_NOMENUBAR, 0)
         self.SetFilepath(path)
+        self.item_uploads = []
         self.state = {
             "entities": {},
             "tasks": {},
             "entity": None,
             "task": None,
+            "recent": [],
         }
 
     def SetFilepath(self, path):
+        self.SetFilepaths([path] if path else [])
+
+    def SetFilepaths(self, paths):
+        """Set the files to upload. Each file is uploaded to its own Version."""
+
+        path = paths[0] if paths else ""
+        self.file_paths = list(paths)
         self.file_path = path
         self.file_folder = os.path.dirname(path)
         self.file_name = os.path.basename(path)
+        self.item_uploads = []
+
+    @property
+    def multiple(self):
+        return len(self.file_paths) > 1
 
     def CreateLayout(self):
         self.SetTitle("Upload Preview to ShotGrid")
 
         if self.GroupBegin(
-            self.GROUP_CONTEXT, c4d.BFH_SCALEFIT, cols=2, rows=2, title="Context"
+            self.GROUP_CONTEXT, c4d.BFH_SCALEFIT, cols=2, rows=3, title="Context"
         ):
             self.GroupBorder(c4d.BORDER_IN)
             self.GroupBorderSpace(4, 4, 4, 4)
+            self.AddStaticText(self.LABEL_SEARCH, c4d.BFH_RIGHT, name="Search")
+            self.AddEditText(self.EDIT_SEARCH, c4d.BFH_SCALEFIT)
             self.AddStaticText(self.LABEL_ENTITY, c4d.BFH_RIGHT, name="Entity")
             self.AddComboBox(self.COMBO_ENTITY, c4d.BFH_SCALEFIT, allowfiltering=True)
             self.AddStaticText(self.LABEL_TASK, c4d.BFH_RIGHT, name="Task")
@@ -94,8 +1438,17 @@ class ShotGridUploaderDialog(c4d.gui.GeDialog):
             )
         self.GroupEnd()
 
-        if self.GroupBegin(self.GROUP_BUTTONS, c4d.BFH_RIGHT | c4d.BFV_BOTTOM, title=""):
+        if self.GroupBegin(self.GROUP_ITEMS, c4d.BFH_SCALEFIT, cols=2, title="Takes"):
+            self.GroupBorder(c4d.BORDER_IN)
+            self.GroupBorderSpace(4, 4, 4, 4)
+        self.GroupEnd()
+
+        if self.GroupBegin(
+            self.GROUP_BUTTONS, c4d.BFH_SCALEFIT | c4d.BFV_BOTTOM, cols=3, title=""
+        ):
             self.GroupBorderSpace(4, 10, 4, 4)
+            self.AddStaticText(self.LABEL_STATUS, c4d.BFH_SCALEFIT, name="")
+            self.AddButton(self.BUTTON_CANCEL, c4d.BFH_RIGHT, name="Cancel Uploads")
             self.AddButton(self.BUTTON_UPLOAD, c4d.BFH_RIGHT, name="Upload")
         self.GroupEnd()
 
@@ -111,19 +1464,61 @@ class ShotGridUploaderDialog(c4d.gui.GeDialog):
 
         self.SetString(self.EDIT_FILE, self.file_path)
         self.SetString(self.EDIT_NAME, self.file_name)
+        self.LayoutItems()
 
         self.LoadSettings()
 
-        for entity_id, entity in self.state["entities"].items():
-            self.AddChild(self.COMBO_ENTITY, entity_id, entity["code"])
-
-        self.SetInt32(self.COMBO_ENTITY, self.state["entity"]["id"])
+        self.FillEntities()
 
         for task_id, task in self.state["tasks"].items():
             self.AddChild(self.COMBO_TASK, task_id, task["content"])
 
         self.SetInt32(self.COMBO_TASK, self.state["task"]["id"])
 
+        self.RefreshUploadStatus()
+        self.SetTimer(self.TIMER_INTERVAL)
+
+    def Timer(self, msg):
+        self.RefreshUploadStatus()
+
+    def LayoutItems(self):
+        """Show a row for each file when uploading multiple takes."""
+
+        self.HideElement(self.GROUP_ITEMS, not self.multiple)
+        self.Enable(self.EDIT_FILE, not self.multiple)
+        self.Enable(self.EDIT_NAME, not self.multiple)
+        self.Enable(self.BUTTON_BROWSE, not self.multiple)
+        if self.multiple:
+            self.SetString(self.EDIT_FILE, self.file_folder)
+            self.SetString(self.EDIT_NAME, "{} Versions".format(len(self.file_paths)))
+
+        self.LayoutFlushGroup(self.GROUP_ITEMS)
+        if self.multiple:
+            for i, path in enumerate(self.file_paths):
+                name_id = self.ITEM_IDS + i * 2
+                name = get_version_name(path)
+                self.AddStaticText(name_id, c4d.BFH_SCALEFIT, name=name)
+                self.AddStaticText(name_id + 1, c4d.BFH_RIGHT, initw=120, name="")
+        self.LayoutChanged(self.GROUP_ITEMS)
+
+    def RefreshUploadStatus(self):
+        uploads = get_uploader().active
+        if uploads:
+            text = "Uploading {}: {}".format(
+                len(uploads),
+                ", ".join(upload.name for upload in uploads[:3]),
+            )
+        else:
+            text = ""
+        self.SetString(self.LABEL_STATUS, text)
+        self.Enable(self.BUTTON_CANCEL, bool(uploads))
+
+        for i, upload in enumerate(self.item_uploads):
+            text = upload.status
+            if not upload.finished and upload.status != UploadStatus.deferred:
+                text = "{} {}%".format(upload.status, int(upload.progress * 100))
+            self.SetString(self.ITEM_IDS + i * 2 + 1, text)
+
     def Command(self, id, msg):
         if review4d.messages_suppressed(self):
             return True
@@ -131,12 +1526,19 @@ class ShotGridUploaderDialog(c4d.gui.GeDialog):
         if id == self.BUTTON_UPLOAD:
             self.OnUploadClicked()
 
+        elif id == self.BUTTON_CANCEL:
+            get_uploader().cancel_all()
+            self.RefreshUploadStatus()
+
         elif id == self.BUTTON_BROWSE:
             self.OnBrowseClicked()
 
         elif id == self.EDIT_FILE:
             self.OnFileChanged(self.GetString(self.EDIT_FILE))
 
+        elif id == self.EDIT_SEARCH:
+            self.FillEntities(self.GetString(self.EDIT_SEARCH))
+
         elif id == self.COMBO_ENTITY:
             self.OnEntityChanged(self.GetInt32(self.COMBO_ENTITY))
 
@@ -158,6 +1560,7 @@ class ShotGridUploaderDialog(c4d.gui.GeDialog):
             "entity": self.state["entity"],
             "task": self.state["task"],
             "comment": self.GetString(self.EDIT_COMMENT),
+            "recent": self.state["recent"],
         }
 
     def SaveSettings(self):
@@ -190,18 +1593,19 @@ class ShotGridUploaderDialog(c4d.gui.GeDialog):
 
         if settings["entity"]:
             self.state["entity"] = settings["entity"]
-            tasks = self.shotgun.find(
-                "Task",
-                filters=[["entity", "is", self.state["entity"]]],
-                fields=["id", "content", "step"],
+            tasks = get_shotgrid_cache().get_tasks(
+                self.context.project, self.state["entity"]
             )
             self.state["tasks"] = {}
-            for task in sorted(tasks, key=lambda e: e["content"]):
+            for task in tasks:
                 self.state["tasks"][task["id"]] = task
 
         if settings["task"]:
             self.state["task"] = settings["task"]
 
+        if settings.get("recent"):
+            self.state["recent"] = settings["recent"]
+
         if settings["comment"]:
             self.SetString(self.EDIT_COMMENT, settings["comment"])
 
@@ -227,47 +1631,63 @@ class ShotGridUploaderDialog(c4d.gui.GeDialog):
         return self.engine.shotgun
 
     def LoadShotGridState(self):
-        """Load state from current ShotGrid context."""
-
-        assets = self.shotgun.find(
-            "Asset",
-            filters=[["project", "is", self.context.project]],
-            fields=["code"],
+        """Load state from current ShotGrid context.
+
+        Cached entities and tasks may predate the context's entity or task,
+        those are fetched from ShotGrid before falling back to the first one.
+        """
+
+        project = self.context.project
+        cache = get_shotgrid_cache()
+        cache.prefetch(project)
+        entities = cache.get_entities(project)
+        context_entity = self.context.entity
+        if context_entity and context_entity["id"] not in {e["id"] for e in entities}:
+            entities = cache.refresh_entities(project)
+        self.state["entities"] = {entity["id"]: entity for entity in entities}
+        self.state["entity"] = get_context_item(
+            self.state["entities"], context_entity
         )
-        shots = self.shotgun.find(
-            "Shot",
-            filters=[["project", "is", self.context.project]],
-            fields=["code"],
-        )
-        self.state["entities"] = {}
-        for entity in sorted(assets + shots, key=lambda e: e["code"]):
-            self.state["entities"][entity["id"]] = entity
 
-        if self.context.entity:
-            self.state["entity"] = self.state["entities"][self.context.entity["id"]]
-        else:
-            self.state["entity"] = list(self.state["entities"].values())[0]
+        tasks = []
+        if self.state["entity"]:
+            tasks = cache.get_tasks(project, self.state["entity"])
+            context_task = self.context.task
+            if context_task and context_task["id"] not in {t["id"] for t in tasks}:
+                cache.refresh_tasks(project)
+                tasks = cache.get_tasks(project, self.state["entity"])
+        self.state["tasks"] = {task["id"]: task for task in tasks}
+        self.state["task"] = get_context_item(self.state["tasks"], self.context.task)
+
+    def FillEntities(self, query=""):
+        """Fill the entity combo with the best matches for a query.
+
+        The selected entity, the context entity and recently used entities
+        are listed first when they match.
+        """
+
+        index = get_shotgrid_cache().get_entity_index(self.context.project)
+        current = self.state["entity"]
+        pinned = [e["id"] for e in (current, self.context.entity) if e]
+        entities = index.search(query, self.ENTITY_LIMIT, pinned + self.state["recent"])
+        if not entities:
+            return
 
-        tasks = self.shotgun.find(
-            "Task",
-            filters=[["entity", "is", self.state["entity"]]],
-            fields=["id", "content", "step"],
-        )
-        self.state["tasks"] = {}
-        for task in sorted(tasks, key=lambda e: e["content"]):
-            self.state["tasks"][task["id"]] = task
+        with review4d.suppress_messages(self):
+            self.FreeChildren(self.COMBO_ENTITY)
+            for entity in entities:
+                self.AddChild(self.COMBO_ENTITY, entity["id"], entity["code"])
 
-        if self.context.task:
-            self.state["task"] = self.state["tasks"][self.context.task["id"]]
+        if current and current["id"] in {e["id"] for e in entities}:
+            self.SetInt32(self.COMBO_ENTITY, current["id"])
         else:
-            self.state["task"] = list(self.state["tasks"].values())[0]
+            self.SetInt32(self.COMBO_ENTITY, entities[0]["id"])
+            self.OnEntityChanged(entities[0]["id"])
 
     def OnEntityChanged(self, entity_id):
         self.state["entity"] = self.state["entities"][entity_id]
-        tasks = self.shotgun.find(
-            "Task",
-            filters=[["entity", "is", self.state["entity"]]],
-            fields=["id", "content", "step"],
+        tasks = get_shotgrid_cache().get_tasks(
+            self.context.project, self.state["entity"]
         )
 
         with review4d.suppress_messages(self):
@@ -276,7 +1696,7 @@ class ShotGridUploaderDialog(c4d.gui.GeDialog):
 
             # Populate tasks from new entity selection
             self.state["tasks"] = {}
-            for task in sorted(tasks, key=lambda e: e["content"]):
+            for task in tasks:
                 self.state["tasks"][task["id"]] = task
                 self.AddChild(self.COMBO_TASK, task["id"], task["content"])
 
@@ -317,8 +1737,25 @@ class ShotGridUploaderDialog(c4d.gui.GeDialog):
             self.OnFileChanged(path)
 
     def OnUploadClicked(self):
+        entity_id = self.state["entity"]["id"]
+        recent = [i for i in self.state["recent"] if i != entity_id]
+        self.state["recent"] = [entity_id] + recent[: self.RECENT_LIMIT - 1]
         self.SaveSettings()
         values = self.GetValues()
+        if self.multiple:
+            # Keep the dialog open to show the status of each take
+            self.item_uploads = self.UploadVersions(
+                entity=values["entity"],
+                task=values["task"],
+                status="rev",
+                comment=values["comment"],
+                files=self.file_paths,
+            )
+            CTX["render_path"] = ""
+            CTX["render_paths"] = []
+            self.RefreshUploadStatus()
+            return
+
         self.UploadVersion(
             entity=values["entity"],
             task=values["task"],
@@ -328,37 +1765,54 @@ class ShotGridUploaderDialog(c4d.gui.GeDialog):
             name=values["name"],
         )
         CTX["render_path"] = ""
+        CTX["render_paths"] = []
         self.Close()
 
     def CreateVersion(self, version_data):
         """Get existing version or create a new one."""
 
-        version = self.shotgun.find_one(
-            "Version",
-            [
-                ["project", "is", version_data["project"]],
-                ["code", "is", version_data["code"]],
-                ["sg_task", "is", version_data["sg_task"]],
-                ["entity", "is", version_data["entity"]],
-            ],
-            ["id", "code", "sg_path_to_frames"],
-        )
+        return create_version(self.shotgun, version_data)
 
-        if not version:
-            version = self.shotgun.create("Version", version_data)
-        else:
-            self.shotgun.update(
-                "Version",
-                version["id"],
-                version_data,
-            )
+    def UploadVersion(self, entity, task, status, comment, file, name):
+        """Upload a version to ShotGrid in the background.
 
-        return version
+        Progress is shown in the status bar and errors are reported from the
+        main thread once the upload finishes. The upload is stored in the
+        upload queue so it resumes after a restart, and fails after
+        max_attempts failed requests.
 
-    def UploadVersion(self, entity, task, status, comment, file, name):
-        """Upload a version to ShotGrid!"""
+        Returns:
+            ShotGridUpload
+        """
+
+        resume_uploads()
+        version_data = self.GetVersionData(entity, task, status, comment, file, name)
+        return get_uploader().upload(version_data, file, **get_upload_callbacks())
+
+    def UploadVersions(self, entity, task, status, comment, files):
+        """Upload each file to its own Version in the background.
+
+        Versions are named after their files which are named after the take
+        they were rendered from.
+
+        Returns:
+            list of ShotGridUpload
+        """
+
+        items = [
+            (
+                self.GetVersionData(
+                    entity, task, status, comment, file, get_version_name(file)
+                ),
+                file,
+            )
+            for file in files
+        ]
+        resume_uploads()
+        return get_uploader().upload_many(items, **get_upload_callbacks())
 
-        version_data = {
+    def GetVersionData(self, entity, task, status, comment, file, name):
+        return {
             "project": self.context.project,
             "code": name.split(".")[0],
             "description": comment,
@@ -369,14 +1823,6 @@ class ShotGridUploaderDialog(c4d.gui.GeDialog):
             # Fields restricted by Artist permissions...
             # 'user': self.context.user,
         }
-        version = self.CreateVersion(version_data)
-        media = self.shotgun.upload(
-            "Version",
-            version["id"],
-            path=file,
-            field_name="sg_uploaded_movie",
-        )
-        return media
 
 
 class ShotGridPostRender(review4d.PostRender):
@@ -388,6 +1834,7 @@ class ShotGridPostRender(review4d.PostRender):
 
     def execute(self, render_paths):
         CTX["render_path"] = render_paths[0]
+        CTX["render_paths"] = list(render_paths)
         c4d.CallCommand(ShotGridUploaderDialogCommand.pluginid)
 
 
@@ -403,7 +1850,8 @@ class ShotGridUploaderDialogCommand(c4d.plugins.CommandData):
         if self.dialog is None:
             self.dialog = ShotGridUploaderDialog(CTX.get("render_path", ""))
 
-        self.dialog.SetFilepath(CTX.get("render_path", ""))
+        self.dialog.SetFilepaths(get_render_paths())
+        resume_uploads()
         return self.dialog.Open(
             dlgtype=c4d.DLG_TYPE_ASYNC,
             pluginid=self.pluginid,
@@ -415,7 +1863,7 @@ class ShotGridUploaderDialogCommand(c4d.plugins.CommandData):
         if self.dialog is None:
             self.dialog = ShotGridUploaderDialog(CTX.get("render_path", ""))
 
-        self.dialog.SetFilepath(CTX.get("render_path", ""))
+        self.dialog.SetFilepaths(get_render_paths())
         return self.dialog.Restore(
             pluginid=self.pluginid,
             secret=sec_ref,
@@ -435,6 +1883,32 @@ class ShotGridUploaderDialogCommand(c4d.plugins.CommandData):
         )
 
 
+def resume_uploads():
+    """Resume unfinished uploads of previous sessions.
+
+    Called when the dialog opens and before each upload instead of on
+    register, because there is usually no sgtk engine when plugins register.
+    Does nothing until an engine is running.
+    """
+
+    uploader = get_uploader()
+    if uploader.get_shotgun is get_engine_shotgun:
+        try:
+            get_engine_shotgun()
+        except (ImportError, ShotGridUnavailable):
+            return
+
+    try:
+        uploader.queue.purge()
+        uploads = uploader.load_pending(**get_upload_callbacks())
+    except sqlite3.Error as e:
+        print("review4d> Failed to read ShotGrid upload queue: %s" % e)
+        return
+
+    if uploads:
+        print("review4d> Resuming %d ShotGrid uploads." % len(uploads))
+
+
 def register():
     if SHOTGRID_AVAILABLE:
         review4d.register_plugin(ShotGridPostRender)
@@ -4,34 +4,46 @@ import sys
 
 import review4d
 
+__review4d__ = {
+    "PostRender": ["Show in File Browser"],
+}
+
 
 class ShowFile(review4d.PostRender):
     """Reveals the rendered file in the system file browser."""
 
     label = "Show in File Browser"
     enabled = False
+    # Not process affinity, explorer exits with 1 even when it succeeds.
+    affinity = review4d.ThreadAffinity.thread
 
     def is_available(self):
         return sys.platform in ["win32", "darwin", "linux2"]
 
     def execute(self, render_paths):
+        for command in self.get_commands(render_paths):
+            subprocess.run(command)
+
+    def get_commands(self, render_paths):
         if len(render_paths) == 1:
             file = render_paths[0]
             if sys.platform == "win32":
-                subprocess.run(["explorer", "/select,", file.replace("/", "\\")])
+                return [["explorer", "/select,", file.replace("/", "\\")]]
+            elif sys.platform == "darwin":
+                return [["open", "-R", file]]
+            else:
+                return [["xdg-open", os.path.dirname(file)]]
+
+        commands = []
+        folders = set([os.path.dirname(path) for path in render_paths])
+        for folder in folders:
+            if sys.platform == "win32":
+                commands.append(["explorer", folder.replace("/", "\\")])
             elif sys.platform == "darwin":
-                subprocess.run(["open", "-R", file])
+                commands.append(["open", "-R", folder])
             else:
-                subprocess.run(["xdg-open", os.path.dirname(file)])
-        else:
-            folders = set([os.path.dirname(path) for path in render_paths])
-            for folder in folders:
-                if sys.platform == "win32":
-                    subprocess.run(["explorer", folder.replace("/", "\\")])
-                elif sys.platform == "darwin":
-                    subprocess.run(["open", "-R", folder])
-                else:
-                    subprocess.run(["xdg-open", os.path.dirname(folder)])
+                commands.append(["xdg-open", os.path.dirname(folder)])
+        return commands
 
 
 def register():
@@ -1,12 +1,6 @@
+import importlib
+
 from .constants import *
-from .context import *
-from .paths import *
-from .plugins import *
-from .postrender import *
-from .presets import *
-from .queue import *
-from .render import *
-from .ui import *
 
 __author__ = "Brand New School, Dan Bradham"
 __email__ = "dan@brandnewschool.com"
@@ -14,6 +8,157 @@ __license__ = "MIT"
 __version__ = "0.1.6"
 version_info = tuple([int(i) for i in __version__.split(".")])
 
+# Public attributes are imported from their submodules on first access so
+# importing review4d doesn't import c4d or any submodule you don't use.
+# Keep this in sync with the __all__ list of each submodule.
+_lazy_attributes = {
+    "context": [
+        "clear_context_cache",
+        "collect_context",
+        "ContextCache",
+        "ContextCollector",
+        "DefaultContextCollector",
+        "get_context_collector",
+        "get_context_collectors",
+        "get_preview_name_from_context",
+    ],
+    "headless": [
+        "HeadlessRender",
+        "HeadlessRenderPool",
+        "HeadlessTask",
+        "HeadlessTaskStatus",
+        "split_frame_range",
+        "stitch_image_sequence",
+    ],
+    "paths": [
+        "desktop_path",
+        "get_cache_path",
+        "get_document_path",
+        "library_path",
+        "normalize",
+        "plugin_path",
+        "user_previews_path",
+        "resource_path",
+    ],
+    "plugins": [
+        "PluginError",
+        "PluginType",
+        "register_plugin",
+        "unregister_plugin",
+        "load_plugins",
+        "load_plugin_path",
+        "clear_plugin_cache",
+        "get_plugin_cache_stats",
+        "get_plugin_load_results",
+        "PluginLoadResult",
+        "get_registry_generation",
+        "read_plugin_manifest",
+        "write_plugin_index",
+    ],
+    "postrender": [
+        "PostRender",
+        "PostRenderExecutor",
+        "PostRenderStatus",
+        "PostRenderTask",
+        "ThreadAffinity",
+        "get_post_render_executor",
+        "get_post_renderer",
+        "get_available_post_renderers",
+        "get_post_renderers",
+        "run_post_renderer",
+    ],
+    "presets": [
+        "get_path_preset",
+        "get_path_presets",
+        "get_preset_path",
+        "PathPreset",
+        "PathPresetError",
+        "PresetPaths",
+        "resolve_all_presets",
+    ],
+    "queue": [
+        "CommandPriority",
+        "CommandQueue",
+        "dump_queue_stats",
+        "execute_in_main_thread",
+        "execute_queued_commands",
+        "get_queue_stats",
+        "queue_command",
+        "QueueStats",
+        "reset_queue_stats",
+        "submit_to_main_thread",
+        "submit_to_main_thread_async",
+    ],
+    "render": [
+        "await_render",
+        "create_render_settings",
+        "edit_render_settings_dialog",
+        "execute_after_render",
+        "expand_render_paths",
+        "get_document_sound",
+        "get_frame_range",
+        "get_render_monitor",
+        "get_render_scheduler",
+        "get_render_settings",
+        "iter_takes",
+        "render_chunked",
+        "render_headless",
+        "render_to_pictureviewer",
+        "RenderBatch",
+        "RenderJob",
+        "RenderJobStatus",
+        "RenderMonitor",
+        "RenderScheduler",
+        "save_document_copy",
+        "set_active_render_settings",
+        "Takes",
+    ],
+    "rendercache": [
+        "get_render_cache",
+        "get_take_fingerprint",
+        "RenderCache",
+    ],
+    "transfer": [
+        "copy_file_verified",
+        "FileTransfer",
+        "hash_file",
+        "Transfer",
+        "TransferError",
+        "TransferPool",
+        "TransferStatus",
+    ],
+    "ui": [
+        "suppress_messages",
+        "messages_suppressed",
+    ],
+}
+_attribute_modules = {
+    name: module for module, names in _lazy_attributes.items() for name in names
+}
+__all__ = [
+    "COMMAND_QUEUE_ID",
+    "RENDER_COMMAND_ID",
+    "show_render_dialog",
+    "show_shotgrid_uploader_dialog",
+    "version_info",
+    *_attribute_modules,
+]
+
+
+def __getattr__(name):
+    module_name = _attribute_modules.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module = importlib.import_module("." + module_name, __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_attribute_modules))
+
 
 def show_render_dialog():
     import c4d
@@ -1,10 +1,14 @@
 import os
 import re
+import threading
+from collections import OrderedDict
 
-from .plugins import PluginType, register_plugin
+from .plugins import PluginType, get_registry_generation, register_plugin
 
 __all__ = [
+    "clear_context_cache",
     "collect_context",
+    "ContextCache",
     "ContextCollector",
     "DefaultContextCollector",
     "get_context_collector",
@@ -14,7 +18,14 @@ __all__ = [
 
 
 class ContextCollector(PluginType):
-    """ContextCollector plugins extract context from a file path."""
+    """ContextCollector plugins extract context from a file path.
+
+    Set cacheable to False if the context your plugin collects depends on
+    anything other than the file path. For example the dialog context collector
+    reads the current values of the Render for Review dialog.
+    """
+
+    cacheable = True
 
     def execute(self, file, ctx):
         """Implement this method to extend the ctx. This method should
@@ -34,22 +45,122 @@ def get_context_collectors():
     return ContextCollector.list()
 
 
-def collect_context(file):
+class ContextCache:
+    """LRU cache of contexts collected by cacheable ContextCollectors.
+
+    Entries are keyed by file path, or by a tuple starting with the file path,
+    and the plugin registry generation, so the cache is invalidated whenever a
+    plugin is registered or unregistered.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.generation = get_registry_generation()
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _validate(self):
+        generation = get_registry_generation()
+        if generation != self.generation:
+            self._entries.clear()
+            self.generation = generation
+
+    def get(self, key):
+        """Get a copy of the cached context for key or None."""
+
+        with self._lock:
+            self._validate()
+            ctx = self._entries.get(key)
+            if ctx is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(ctx)
+
+    def set(self, key, ctx):
+        """Store a copy of the context collected for key."""
+
+        with self._lock:
+            self._validate()
+            self._entries[key] = dict(ctx)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+context_cache = ContextCache()
+
+
+def clear_context_cache():
+    """Clear all cached contexts."""
+
+    context_cache.clear()
+
+
+def collect_context(file, *, cache=True):
     """Collect context from a file path.
 
-    Executes all ContextCollector plugins on the given file path.
+    Executes all ContextCollector plugins on the given file path in order.
+    The context produced by each run of consecutive cacheable plugins is
+    cached by file path and the context the run received, so only plugins
+    with cacheable set to False run every time.
+
+    Arguments:
+        file (str): File path to collect context from.
+        cache (bool): Use the context cache. Defaults to True.
 
     Returns:
         dict containing keys and values extracted from the file path.
     """
 
+    plugins = ContextCollector.list()
+
     ctx = {}
-    for plugin in ContextCollector._registry:
-        ctx = plugin().execute(file, ctx)
+    index = 0
+    while index < len(plugins):
+        plugin = plugins[index]
+        if not cache or not plugin.cacheable:
+            ctx = plugin().execute(file, ctx)
+            index += 1
+            continue
+
+        end = index
+        while end < len(plugins) and plugins[end].cacheable:
+            end += 1
+
+        # The leading run only depends on the file path.
+        key = file if index == 0 else (file, index, _get_context_key(ctx))
+        cached = context_cache.get(key)
+        if cached is None:
+            for plugin in plugins[index:end]:
+                ctx = plugin().execute(file, ctx)
+            context_cache.set(key, ctx)
+        else:
+            ctx = cached
+        index = end
 
     return ctx
 
 
+def _get_context_key(ctx):
+    """Get a hashable key of the items of a context."""
+
+    return repr(sorted(ctx.items(), key=lambda item: str(item[0])))
+
+
 def get_preview_name_from_context(ctx):
     """Use a context to generate a preview name."""
 
@@ -0,0 +1,598 @@
+"""Render takes in headless c4dpy worker processes.
+
+The HeadlessRenderPool runs one worker process per HeadlessTask. Each worker
+is started as::
+
+    <executable> review4d/headless.py <task.json>
+
+The worker loads the document, activates the task's take and render
+settings and renders to the task's output path. It reports progress by
+printing lines prefixed with "review4d>" followed by a JSON object to stdout.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+__all__ = [
+    "HeadlessRender",
+    "HeadlessRenderPool",
+    "HeadlessTask",
+    "HeadlessTaskStatus",
+    "split_frame_range",
+    "stitch_image_sequence",
+]
+
+
+WORKER_SCRIPT = os.path.abspath(__file__)
+MESSAGE_PREFIX = "review4d>"
+SEGMENT_PREFIX = "frame_"
+SEGMENT_PADDING = 4
+
+
+class HeadlessTaskStatus:
+    """HeadlessTask status Enum."""
+
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+    cancelled = "cancelled"
+
+    finished = (done, failed, cancelled)
+
+
+class HeadlessTask:
+    """A render executed by a worker process.
+
+    Attributes:
+        document (str): Path to the c4d document to render.
+        render_settings (str): Name of the RenderData to render with.
+        take (str): Name of the take to render or None for the active take.
+        take_path (list): Child indices leading from the main take to the take
+            to render. Take names are not unique so workers find the take by
+            this path, see get_take_path.
+        path (str): Output file path.
+        frame_start, frame_end (int): Optional frame range to render.
+        image_format (str): Render an image sequence in this format instead
+            of the render settings format. Only "png" is supported.
+        status (str): One of the HeadlessTaskStatus values.
+        progress (float): Render progress from 0 to 1.
+        returncode (int): Exit code of the worker process.
+        error (str): Error reported by the worker or the process output.
+        attempts (int): Number of times the task was started.
+    """
+
+    def __init__(
+        self,
+        document,
+        render_settings,
+        take=None,
+        path=None,
+        frame_start=None,
+        frame_end=None,
+        image_format=None,
+        take_path=None,
+    ):
+        self.document = document
+        self.render_settings = render_settings
+        self.take = take
+        self.take_path = take_path
+        self.path = path
+        self.frame_start = frame_start
+        self.frame_end = frame_end
+        self.image_format = image_format
+        self.status = HeadlessTaskStatus.queued
+        self.progress = 0.0
+        self.returncode = None
+        self.error = None
+        self.attempts = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def __repr__(self):
+        return "<HeadlessTask:{}:{}>".format(self.take or self.path, self.status)
+
+    @property
+    def finished(self):
+        return self.status in HeadlessTaskStatus.finished
+
+    @property
+    def render_time(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_dict(self):
+        return {
+            "document": self.document,
+            "render_settings": self.render_settings,
+            "take": self.take,
+            "take_path": self.take_path,
+            "path": self.path,
+            "frame_start": self.frame_start,
+            "frame_end": self.frame_end,
+            "image_format": self.image_format,
+        }
+
+
+class HeadlessRender:
+    """A group of HeadlessTasks rendered by a HeadlessRenderPool.
+
+    Arguments:
+        tasks (list): HeadlessTasks to render.
+        on_progress (callable): Called with a task whenever its status or
+            progress changes. Called from a worker thread.
+        on_finished (callable): Called with this HeadlessRender once all
+            tasks are finished. Called from a worker thread.
+    """
+
+    def __init__(self, tasks, on_progress=None, on_finished=None):
+        self.tasks = list(tasks)
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.cancelled = False
+        self._processes = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def __repr__(self):
+        return "<HeadlessRender:{} tasks>".format(len(self.tasks))
+
+    @property
+    def finished(self):
+        return all(task.finished for task in self.tasks)
+
+    @property
+    def succeeded(self):
+        return all(task.status == HeadlessTaskStatus.done for task in self.tasks)
+
+    @property
+    def progress(self):
+        if not self.tasks:
+            return 1.0
+        return sum(task.progress for task in self.tasks) / len(self.tasks)
+
+    def wait(self, timeout=None):
+        """Block until all tasks are finished. Returns True if finished."""
+
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        """Cancel queued tasks and terminate running worker processes."""
+
+        with self._lock:
+            self.cancelled = True
+            processes = list(self._processes.values())
+
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+
+
+class HeadlessRenderPool:
+    """Renders HeadlessTasks in a pool of c4dpy worker processes.
+
+    Arguments:
+        executable (str or list): c4dpy executable or command prefix. Defaults
+            to the REVIEW4D_C4DPY environment variable or c4dpy on the PATH.
+        workers (int): Maximum number of concurrent worker processes.
+            Defaults to the number of cpus.
+        retries (int): Number of times a failed task is retried.
+    """
+
+    def __init__(self, executable=None, workers=None, retries=0):
+        self.executable = executable or get_default_executable()
+        self.workers = workers or os.cpu_count() or 1
+        self.retries = retries
+
+    def get_command(self, task_file):
+        executable = self.executable
+        if isinstance(executable, str):
+            executable = [executable]
+        return [*executable, WORKER_SCRIPT, task_file]
+
+    def render(self, tasks, on_progress=None, on_finished=None):
+        """Render tasks in the background.
+
+        Returns:
+            HeadlessRender
+        """
+
+        render = HeadlessRender(tasks, on_progress, on_finished)
+        thread = threading.Thread(
+            target=self._run,
+            args=(render,),
+            name="review4d.HeadlessRenderPool",
+            daemon=True,
+        )
+        thread.start()
+        return render
+
+    def _run(self, render):
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [
+                    (task, executor.submit(self._run_task, render, task))
+                    for task in render.tasks
+                ]
+            for task, future in futures:
+                error = future.exception()
+                if error is not None:
+                    task.finished_at = time.time()
+                    task.status = HeadlessTaskStatus.failed
+                    task.error = "%s: %s" % (type(error).__name__, error)
+                    _notify(render, task)
+        finally:
+            try:
+                if render.on_finished:
+                    render.on_finished(render)
+            except Exception as e:
+                print("review4d> Headless finished callback failed: %s" % e)
+            render._done.set()
+
+    def _run_task(self, render, task):
+        while True:
+            self._run_process(render, task)
+            if task.status != HeadlessTaskStatus.failed:
+                return
+            if task.attempts > self.retries or render.cancelled:
+                return
+
+    def _run_process(self, render, task):
+        if render.cancelled:
+            task.status = HeadlessTaskStatus.cancelled
+            _notify(render, task)
+            return
+
+        with tempfile.NamedTemporaryFile(
+            "w",
+            prefix="review4d_task_",
+            suffix=".json",
+            delete=False,
+        ) as f:
+            json.dump(task.to_dict(), f)
+            task_file = f.name
+
+        task.attempts += 1
+        task.status = HeadlessTaskStatus.running
+        task.progress = 0.0
+        task.error = None
+        task.started_at = time.time()
+        task.finished_at = None
+        _notify(render, task)
+
+        output = []
+        try:
+            process = subprocess.Popen(
+                self.get_command(task_file),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                text=True,
+            )
+            with render._lock:
+                render._processes[id(task)] = process
+                cancelled = render.cancelled
+            if cancelled:
+                process.terminate()
+
+            for line in process.stdout:
+                message = parse_message(line)
+                if message is None:
+                    output.append(line)
+                    continue
+                if "progress" in message:
+                    task.progress = float(message["progress"])
+                if "error" in message:
+                    task.error = message["error"]
+                _notify(render, task)
+
+            task.returncode = process.wait()
+        except OSError as e:
+            task.returncode = None
+            task.error = str(e)
+        finally:
+            with render._lock:
+                render._processes.pop(id(task), None)
+            os.remove(task_file)
+
+        task.finished_at = time.time()
+        if render.cancelled:
+            task.status = HeadlessTaskStatus.cancelled
+        elif task.returncode == 0 and not task.error:
+            task.status = HeadlessTaskStatus.done
+            task.progress = 1.0
+        else:
+            task.status = HeadlessTaskStatus.failed
+            task.error = task.error or "".join(output[-20:]).strip()
+        _notify(render, task)
+
+
+def split_frame_range(start, end, segment_size=None, segments=None):
+    """Split an inclusive frame range into contiguous segments.
+
+    Arguments:
+        start, end (int): First and last frame.
+        segment_size (int): Maximum number of frames per segment.
+        segments (int): Number of segments. Used if segment_size is None.
+
+    Returns:
+        list of (start, end) tuples.
+    """
+
+    count = end - start + 1
+    if count < 1:
+        raise ValueError("Invalid frame range %s-%s." % (start, end))
+
+    if segment_size is None:
+        segments = max(1, min(segments or 1, count))
+        segment_size = -(-count // segments)
+
+    if segment_size < 1:
+        raise ValueError("segment_size must be greater than 0.")
+
+    return [
+        (frame, min(frame + segment_size - 1, end))
+        for frame in range(start, end + 1, segment_size)
+    ]
+
+
+def get_segment_frame_path(folder, frame):
+    """Get the path c4d writes a frame to when rendering a segment."""
+
+    name = SEGMENT_PREFIX + str(frame).zfill(SEGMENT_PADDING) + ".png"
+    return os.path.join(folder, name)
+
+
+def get_missing_frames(folder, start, end):
+    """Get the frames of a segmented render that were not written."""
+
+    return [
+        frame
+        for frame in range(start, end + 1)
+        if not os.path.isfile(get_segment_frame_path(folder, frame))
+    ]
+
+
+def get_ffmpeg():
+    """Get the ffmpeg executable used to stitch segments."""
+
+    return os.getenv("REVIEW4D_FFMPEG") or shutil.which("ffmpeg") or "ffmpeg"
+
+
+def stitch_image_sequence(
+    folder, start, end, output, fps, ffmpeg=None, audio=None, audio_start=0.0
+):
+    """Encode the frames rendered by segment tasks into a single movie.
+
+    Arguments:
+        folder (str): Folder the segments were rendered to.
+        start, end (int): Frame range of the complete render.
+        output (str): Output movie path.
+        fps (float): Frame rate of the output movie.
+        ffmpeg (str or list): ffmpeg executable. Defaults to REVIEW4D_FFMPEG
+            or ffmpeg on the PATH.
+        audio (str): Sound file to include in the movie, trimmed to the frame
+            range.
+        audio_start (float): Document time in seconds the sound starts at.
+    """
+
+    missing = get_missing_frames(folder, start, end)
+    if missing:
+        raise RuntimeError(
+            "Can't stitch %s, %d frames are missing starting at frame %d."
+            % (output, len(missing), missing[0])
+        )
+
+    ffmpeg = ffmpeg or get_ffmpeg()
+    if isinstance(ffmpeg, str):
+        ffmpeg = [ffmpeg]
+
+    audio_args = []
+    if audio:
+        offset = start / fps - audio_start
+        if offset >= 0:
+            audio_args = ["-ss", str(offset), "-i", audio]
+        else:
+            audio_args = ["-itsoffset", str(-offset), "-i", audio]
+        audio_args += [
+            "-map",
+            "0:v",
+            "-map",
+            "1:a?",
+            "-c:a",
+            "aac",
+            "-t",
+            str((end - start + 1) / fps),
+        ]
+
+    pattern = "%s%%0%dd.png" % (SEGMENT_PREFIX, SEGMENT_PADDING)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    result = subprocess.run(
+        [
+            *ffmpeg,
+            "-y",
+            "-loglevel",
+            "error",
+            "-framerate",
+            str(fps),
+            "-start_number",
+            str(start),
+            "-i",
+            os.path.join(folder, pattern),
+            *audio_args,
+            "-frames:v",
+            str(end - start + 1),
+            "-c:v",
+            "libx264",
+            "-pix_fmt",
+            "yuv420p",
+            output,
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError("ffmpeg failed to stitch %s: %s" % (output, result.stdout))
+    return output
+
+
+def _notify(render, task):
+    if render.on_progress:
+        try:
+            render.on_progress(task)
+        except Exception as e:
+            print("review4d> Headless progress callback failed: %s" % e)
+
+
+def get_default_executable():
+    """Get the c4dpy executable used by worker processes."""
+
+    return os.getenv("REVIEW4D_C4DPY") or shutil.which("c4dpy") or "c4dpy"
+
+
+def format_message(**data):
+    return MESSAGE_PREFIX + json.dumps(data)
+
+
+def parse_message(line):
+    """Parse a message printed by a worker process or return None."""
+
+    line = line.strip()
+    if not line.startswith(MESSAGE_PREFIX):
+        return None
+    try:
+        return json.loads(line[len(MESSAGE_PREFIX):])
+    except ValueError:
+        return None
+
+
+def send_message(**data):
+    print(format_message(**data), flush=True)
+
+
+def get_take_path(take):
+    """Get the child indices leading from the main take to take."""
+
+    path = []
+    parent = take.GetUp()
+    while parent:
+        index = 0
+        pred = take.GetPred()
+        while pred:
+            index += 1
+            pred = pred.GetPred()
+        path.insert(0, index)
+        take, parent = parent, parent.GetUp()
+    return path
+
+
+def find_take_by_path(doc, path):
+    """Find a take by the child indices returned by get_take_path."""
+
+    take = doc.GetTakeData().GetMainTake()
+    for index in path:
+        take = take.GetDown()
+        for _ in range(index):
+            if take is None:
+                break
+            take = take.GetNext()
+        if take is None:
+            return None
+    return take
+
+
+def find_take(doc, name):
+    """Find a take by name in a document."""
+
+    import mxutils
+
+    take_data = doc.GetTakeData()
+    for take in mxutils.IterateTree(take_data.GetMainTake()):
+        if take.GetName() == name:
+            return take
+
+
+def run_worker(task_file):
+    """Render a HeadlessTask inside a c4dpy process."""
+
+    import c4d
+
+    with open(task_file, "r") as f:
+        task = json.load(f)
+
+    doc = c4d.documents.LoadDocument(
+        task["document"],
+        c4d.SCENEFILTER_OBJECTS | c4d.SCENEFILTER_MATERIALS,
+    )
+    if doc is None:
+        raise RuntimeError("Failed to load document: %s" % task["document"])
+
+    if task.get("take_path") is not None:
+        take = find_take_by_path(doc, task["take_path"])
+        if take is None or take.GetName() != task["take"]:
+            raise RuntimeError("Take not found: %s" % task["take"])
+        doc.GetTakeData().SetCurrentTake(take)
+    elif task["take"]:
+        take = find_take(doc, task["take"])
+        if take is None:
+            raise RuntimeError("Take not found: %s" % task["take"])
+        doc.GetTakeData().SetCurrentTake(take)
+
+    rd = doc.GetFirstRenderData()
+    while rd and rd.GetName() != task["render_settings"]:
+        rd = rd.GetNext()
+    if rd is None:
+        raise RuntimeError(
+            "Render Settings not found: %s" % task["render_settings"]
+        )
+
+    rd_data = rd.GetDataInstance().GetClone(c4d.COPYFLAGS_NONE)
+    rd_data[c4d.RDATA_SAVEIMAGE] = True
+    if task["path"]:
+        rd_data.SetFilename(c4d.RDATA_PATH, task["path"])
+    if task["frame_start"] is not None:
+        fps = doc.GetFps()
+        rd_data[c4d.RDATA_FRAMESEQUENCE] = c4d.RDATA_FRAMESEQUENCE_MANUAL
+        rd_data[c4d.RDATA_FRAMEFROM] = c4d.BaseTime(task["frame_start"], fps)
+        rd_data[c4d.RDATA_FRAMETO] = c4d.BaseTime(task["frame_end"], fps)
+    if task.get("image_format") == "png":
+        # Writes <path>0001.png, see get_segment_frame_path.
+        rd_data[c4d.RDATA_FORMAT] = c4d.FILTER_PNG
+        rd_data[c4d.RDATA_NAMEFORMAT] = c4d.RDATA_NAMEFORMAT_0
+
+    bitmap = c4d.bitmaps.MultipassBitmap(
+        int(rd_data[c4d.RDATA_XRES]),
+        int(rd_data[c4d.RDATA_YRES]),
+        c4d.COLORMODE_RGB,
+    )
+
+    def progress(value, progress_type):
+        send_message(progress=round(value, 3))
+
+    result = c4d.documents.RenderDocument(
+        doc,
+        rd_data,
+        bitmap,
+        c4d.RENDERFLAGS_EXTERNAL | c4d.RENDERFLAGS_NODOCUMENTCLONE,
+        prog=progress,
+    )
+    if result != c4d.RENDERRESULT_OK:
+        raise RuntimeError("RenderDocument failed with result %s" % result)
+
+
+if __name__ == "__main__":
+    try:
+        run_worker(sys.argv[-1])
+    except Exception as e:
+        send_message(error=str(e))
+        sys.exit(1)
+    send_message(progress=1.0)
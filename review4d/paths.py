@@ -1,9 +1,8 @@
 import os
 
-import c4d
-
 __all__ = [
     "desktop_path",
+    "get_cache_path",
     "get_document_path",
     "library_path",
     "normalize",
@@ -15,22 +14,47 @@ __all__ = [
 
 library_path = os.path.dirname(__file__)
 plugin_path = os.path.dirname(library_path)
-user_previews_path = c4d.storage.GeGetStartupWritePath() + "/prefs/pv"
 if "USERPROFILE" in os.environ:
     desktop_path = os.path.expandvars("$USERPROFILE/Desktop")
 else:
     desktop_path = os.path.expanduser("~/Desktop")
 
 
+def __getattr__(name):
+    # Paths requiring c4d are computed on first access and then cached.
+    if name == "user_previews_path":
+        import c4d
+
+        value = c4d.storage.GeGetStartupWritePath() + "/prefs/pv"
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def normalize(*paths):
     """Like os.path.join but returns an absolute path separated with /."""
 
     return os.path.abspath(os.path.join(*paths)).replace("\\", "/")
 
 
+def get_cache_path(*parts):
+    """Get a path in the local review4d cache directory.
+
+    Defaults to ~/.review4d/cache. Set REVIEW4D_CACHE to use another folder.
+    """
+
+    root = os.getenv("REVIEW4D_CACHE")
+    if not root:
+        root = os.path.join(os.path.expanduser("~"), ".review4d", "cache")
+    return normalize(root, *parts)
+
+
 def get_document_path(doc=None):
     """Get full path to a document. Defaults to active document."""
 
+    import c4d
+
     doc = doc or c4d.documents.GetActiveDocument()
     path, name = doc.GetDocumentPath(), doc.GetDocumentName()
     if path and name:
@@ -1,5 +1,18 @@
+import ast
+import bisect
+import functools
+import hashlib
+import importlib
 import importlib.util
+import json
+import marshal
 import os
+import pickle
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 __all__ = [
     "PluginError",
@@ -7,10 +20,52 @@ __all__ = [
     "register_plugin",
     "unregister_plugin",
     "load_plugins",
+    "load_plugin_path",
+    "clear_plugin_cache",
+    "get_plugin_cache_stats",
+    "get_plugin_load_results",
+    "PluginLoadResult",
+    "get_registry_generation",
+    "read_plugin_manifest",
+    "write_plugin_index",
 ]
 
 
+PLUGIN_INDEX_NAME = "review4d_plugins.json"
+PLUGIN_CACHE_VERSION = 1
 plugin_modules = []
+plugin_cache_stats = {"hits": 0, "misses": 0, "paths": {}}
+plugin_cache_lock = threading.Lock()
+plugin_load_results = []
+plugin_types = {}
+builtin_plugin_type_modules = {
+    "ContextCollector": "context",
+    "PathPreset": "presets",
+    "PostRender": "postrender",
+}
+registry_generation = 0
+
+
+class PluginIndex:
+    """Lookup tables maintained alongside a PluginType registry.
+
+    Attributes:
+        ids (dict): Maps plugin ids to plugins.
+        labels (dict): Maps labels to the first registered plugin in order.
+        orders (list): Order of each plugin in the registry, used to insert
+            new plugins without resorting the registry.
+        last_id (int): Id assigned to the most recently registered plugin.
+        pending (dict): Maps labels to lists of LazyPluginModules that
+            declared they provide a plugin with that label but have not been
+            loaded yet.
+    """
+
+    def __init__(self, base_id=0):
+        self.ids = {}
+        self.labels = {}
+        self.orders = []
+        self.last_id = base_id
+        self.pending = {}
 
 
 class PluginType:
@@ -20,39 +75,128 @@ class PluginType:
     order = 0
     _base_id = 0
     _registry = None
+    _index = None
 
     def __init_subclass__(cls):
         if cls._registry is None:
             cls._registry = []
+            cls._index = PluginIndex(cls._base_id)
+            plugin_types[cls.__name__] = cls
+
+    @classmethod
+    def is_registered(cls, plugin):
+        return cls._index.ids.get(getattr(plugin, "id", None)) is plugin
 
     @classmethod
     def register(cls, plugin):
-        if plugin in cls._registry:
+        if cls.is_registered(plugin):
             return
 
-        plugin.id = max([p.id for p in cls._registry] + [cls._base_id]) + 1
-        cls._registry.append(plugin)
-        cls._registry.sort(key=lambda plugin: plugin.order)
+        index = cls._index
+        index.last_id += 1
+        plugin.id = index.last_id
+        position = bisect.bisect_right(index.orders, plugin.order)
+        index.orders.insert(position, plugin.order)
+        cls._registry.insert(position, plugin)
+        index.ids[plugin.id] = plugin
+
+        existing = index.labels.get(plugin.label)
+        if existing is None or plugin.order < existing.order:
+            index.labels[plugin.label] = plugin
+
+        _increment_registry_generation()
 
     @classmethod
     def unregister(cls, plugin):
-        if plugin in cls._registry:
-            cls._registry.remove(plugin)
+        if not cls.is_registered(plugin):
+            return
+
+        index = cls._index
+        position = cls._registry.index(plugin)
+        del cls._registry[position]
+        del index.orders[position]
+        del index.ids[plugin.id]
+
+        if index.labels.get(plugin.label) is plugin:
+            del index.labels[plugin.label]
+            for other in cls._registry:
+                if other.label == plugin.label:
+                    index.labels[plugin.label] = other
+                    break
+
+        _increment_registry_generation()
+
+    @classmethod
+    def load_pending(cls, label=None):
+        """Load lazy plugin modules that provide plugins of this type.
+
+        Arguments:
+            label (str): Only load the modules providing this label. Defaults
+                to loading all pending modules.
+        """
+
+        pending = cls._index.pending
+        if label is None:
+            modules = []
+            for label_modules in list(pending.values()):
+                modules.extend(m for m in label_modules if m not in modules)
+        elif label in pending:
+            modules = list(pending[label])
+        else:
+            return
+
+        for module in modules:
+            module.load()
 
     @classmethod
     def get(cls, label_or_id):
-        for plugin in cls._registry:
-            if label_or_id in (plugin.id, plugin.label):
-                return plugin
+        index = cls._index
+        plugin = index.ids.get(label_or_id)
+        if plugin is None and isinstance(label_or_id, str):
+            plugin = index.labels.get(label_or_id)
+            if plugin is None and label_or_id in index.pending:
+                cls.load_pending(label_or_id)
+                plugin = index.labels.get(label_or_id)
+        elif plugin is None and index.pending:
+            # Ids are assigned on registration so we can't tell which pending
+            # module provides this id.
+            cls.load_pending()
+            plugin = index.ids.get(label_or_id)
+        return plugin
 
     @classmethod
     def list(cls):
+        if cls._index.pending:
+            cls.load_pending()
         return list(cls._registry)
 
     def __str__(self):
         return "<{}:{}:{}>".format(self.__class__.__name__, self.label, self.id)
 
 
+def get_plugin_type(type_name):
+    """Get a PluginType subclass by name, importing builtin types on demand."""
+
+    if type_name not in plugin_types and type_name in builtin_plugin_type_modules:
+        importlib.import_module(
+            "." + builtin_plugin_type_modules[type_name],
+            __package__,
+        )
+    return plugin_types.get(type_name)
+
+
+def _increment_registry_generation():
+    global registry_generation
+    registry_generation += 1
+
+
+def get_registry_generation():
+    """Get a counter that increments each time any plugin is registered or
+    unregistered. Useful for invalidating data derived from plugins."""
+
+    return registry_generation
+
+
 class PluginError(Exception):
     """Raised when a plugin fails to register or a plugin module fails to
     import."""
@@ -89,36 +233,657 @@ def unregister_plugin(plugin):
     plugin.unregister(plugin)
 
 
-def load_module(name, path):
-    """Load a python module by name and file path."""
+def load_module(name, path, code=None):
+    """Load a python module by name and file path.
+
+    Arguments:
+        name (str): Module name.
+        path (str): Path to module file.
+        code (code): Precompiled module code. When provided the module file
+            is not read.
+    """
 
     spec = importlib.util.spec_from_file_location(name, path)
     mod = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(mod)
+    if code is None:
+        spec.loader.exec_module(mod)
+    else:
+        exec(code, mod.__dict__)
     return mod
 
 
-def load_plugins():
-    """Load all plugins from REVIEW4D_PLUGINS paths."""
+def read_plugin_manifest(path):
+    """Read the __review4d__ manifest of a plugin module without importing it.
+
+    A manifest is a module level dict literal mapping plugin type names to the
+    labels of the plugins the module registers::
+
+        __review4d__ = {
+            "PathPreset": ["Animation", "Dailies"],
+        }
+
+    Returns:
+        dict or None if the module has no valid manifest.
+    """
+
+    with open(path, "rb") as f:
+        source = f.read()
+
+    return parse_plugin_manifest(source, path)
+
+
+def parse_plugin_manifest(source, path="<unknown>"):
+    """Extract the __review4d__ manifest from python source code."""
+
+    try:
+        tree = ast.parse(source, path)
+    except SyntaxError:
+        return None
+
+    return find_plugin_manifest(tree, path)
+
+
+def find_plugin_manifest(tree, path="<unknown>"):
+    """Extract the __review4d__ manifest from a parsed module."""
+
+    for node in tree.body:
+        if not isinstance(node, ast.Assign):
+            continue
+        for target in node.targets:
+            if isinstance(target, ast.Name) and target.id == "__review4d__":
+                try:
+                    manifest = ast.literal_eval(node.value)
+                except ValueError:
+                    print("review4d> Invalid plugin manifest in: %s" % path)
+                    return None
+                if validate_plugin_manifest(manifest, path):
+                    return manifest
+                return None
+
+
+def validate_plugin_manifest(manifest, path="<unknown>"):
+    """Return True if manifest maps known plugin types to lists of labels."""
+
+    if not isinstance(manifest, dict):
+        print("review4d> Plugin manifest must be a dict: %s" % path)
+        return False
+
+    for type_name, labels in manifest.items():
+        if get_plugin_type(type_name) is None:
+            print("review4d> Unknown plugin type %r in: %s" % (type_name, path))
+            return False
+        if not isinstance(labels, (list, tuple)):
+            print("review4d> Plugin manifest labels must be a list: %s" % path)
+            return False
+    return True
+
+
+def read_plugin_index(path):
+    """Read the plugin index file from a plugin directory.
+
+    Returns:
+        dict mapping module filenames to manifests or None if the directory
+        does not have an index.
+    """
+
+    index_path = os.path.join(path, PLUGIN_INDEX_NAME)
+    if not os.path.isfile(index_path):
+        return None
+
+    try:
+        with open(index_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print("review4d> Failed to read plugin index %s: %s" % (index_path, e))
+        return None
+
+
+def write_plugin_index(path):
+    """Write a plugin index for all plugin modules in a directory.
+
+    The index stores each module's manifest so load_plugins does not need to
+    read plugin modules to find out which plugins they provide. Rewrite the
+    index whenever plugin modules in the directory change.
+
+    Returns:
+        str: Path to the index file.
+    """
+
+    index = {}
+    for file in sorted(os.listdir(path)):
+        if file.endswith(".py"):
+            index[file] = read_plugin_manifest(os.path.join(path, file))
+
+    # Replace the index instead of writing in place so the directory mtime
+    # changes and local plugin caches are invalidated.
+    index_path = os.path.join(path, PLUGIN_INDEX_NAME)
+    with open(index_path + ".tmp", "w") as f:
+        json.dump(index, f, indent=4, sort_keys=True)
+    os.replace(index_path + ".tmp", index_path)
+    return index_path
+
+
+class PluginSource:
+    """A plugin module found in a plugin directory.
+
+    Attributes:
+        name (str): Module name.
+        path (str): Path to the module file.
+        manifest (dict): The module's __review4d__ manifest or None.
+        code (code): Compiled module code or None if not compiled.
+        size (int): Size of the module file when it was compiled.
+        mtime_ns (int): Modification time of the module file when it was
+            compiled.
+    """
+
+    def __init__(self, name, path, manifest=None, code=None, size=0, mtime_ns=0):
+        self.name = name
+        self.path = path
+        self.manifest = manifest
+        self.code = code
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.compile_seconds = 0.0
+        self.error = None
+
+    def __repr__(self):
+        return "<PluginSource:{}:{}>".format(self.name, self.path)
+
+    def compile(self):
+        """Read and compile the module, extracting its manifest.
+
+        Errors are stored in the error attribute instead of being raised so
+        that a broken module doesn't prevent other modules from loading.
+        """
+
+        start = time.perf_counter()
+        try:
+            with open(self.path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                source = f.read()
+
+            self.size = stat.st_size
+            self.mtime_ns = stat.st_mtime_ns
+            tree = ast.parse(source, self.path)
+            self.manifest = find_plugin_manifest(tree, self.path)
+            self.code = compile(tree, self.path, "exec", dont_inherit=True)
+        except Exception as e:
+            self.code = None
+            self.error = e
+        finally:
+            self.compile_seconds = time.perf_counter() - start
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "path": self.path,
+            "manifest": self.manifest,
+            "code": marshal.dumps(self.code) if self.code else None,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        if data["code"]:
+            data["code"] = marshal.loads(data["code"])
+        return cls(**data)
+
+
+class LazyPluginModule:
+    """A plugin module that is loaded the first time one of the plugins it
+    declares in its manifest is needed."""
+
+    def __init__(self, name, path, manifest, code=None):
+        self.name = name
+        self.path = path
+        self.manifest = manifest
+        self.code = code
+        self.module = None
+        self.loaded = False
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return "<LazyPluginModule:{}:{}>".format(self.name, self.path)
+
+    def defer(self):
+        """Add this module to the pending index of each declared type."""
+
+        for type_name, labels in self.manifest.items():
+            pending = get_plugin_type(type_name)._index.pending
+            for label in labels:
+                modules = pending.setdefault(label, [])
+                if self not in modules:
+                    modules.append(self)
+
+    def load(self):
+        """Load the module once. Returns None if the module failed to load.
+
+        Threads calling load concurrently wait for the first one to finish.
+        """
+
+        with self._lock:
+            if self.loaded:
+                return self.module
+            # Set first so lookups made while the module runs don't load it
+            # again.
+            self.loaded = True
+
+            for type_name, labels in self.manifest.items():
+                pending = get_plugin_type(type_name)._index.pending
+                for label in labels:
+                    modules = pending.get(label, [])
+                    if self in modules:
+                        modules.remove(self)
+                    if not modules:
+                        pending.pop(label, None)
+
+            source = PluginSource(self.name, self.path, self.manifest, self.code)
+            result = run_plugin_source(source)
+            self.module = result.module
+            return self.module
+
+
+class PluginLoadResult:
+    """Outcome of loading a plugin module.
+
+    Attributes:
+        name (str): Module name.
+        path (str): Path to the module file.
+        seconds (float): Time spent executing and registering the module.
+        compile_seconds (float): Time spent reading and compiling the module.
+        deferred (bool): True if the module was deferred until first use.
+        module (module): The loaded module or None.
+        error (Exception): The exception raised while loading or None.
+        traceback (str): Formatted traceback of the error.
+    """
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.seconds = 0.0
+        self.compile_seconds = 0.0
+        self.deferred = False
+        self.module = None
+        self.error = None
+        self.traceback = ""
+
+    def __repr__(self):
+        if self.error:
+            status = "failed"
+        elif self.deferred:
+            status = "deferred"
+        else:
+            status = "%.4fs" % self.seconds
+        return "<PluginLoadResult:{}:{}>".format(self.name, status)
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def get_plugin_load_results():
+    """Get a PluginLoadResult for every plugin module loaded or deferred."""
+
+    return list(plugin_load_results)
+
+
+def load_plugin_module(name, path, code=None):
+    """Load a plugin module and call its register function."""
+
+    module = load_module(name, path, code)
+    if hasattr(module, "register"):
+        module.register()
+
+    plugin_modules.append(module)
+    return module
+
+
+def run_plugin_source(source):
+    """Load a PluginSource, capturing timing and errors.
+
+    Returns:
+        PluginLoadResult
+    """
+
+    result = PluginLoadResult(source.name, source.path)
+    result.compile_seconds = source.compile_seconds
+    start = time.perf_counter()
+    try:
+        if source.error:
+            raise source.error
+        result.module = load_plugin_module(source.name, source.path, source.code)
+    except Exception as e:
+        result.error = e
+        result.traceback = "".join(
+            traceback.format_exception(type(e), e, e.__traceback__)
+        )
+        print("review4d> Failed to load plugin module: %s" % source.path)
+        print(result.traceback)
+    finally:
+        result.seconds = time.perf_counter() - start
+
+    plugin_load_results.append(result)
+    return result
+
+
+def defer_plugin_source(source):
+    """Defer loading a PluginSource until one of its plugins is needed.
+
+    Returns:
+        PluginLoadResult
+    """
+
+    LazyPluginModule(source.name, source.path, source.manifest, source.code).defer()
+    result = PluginLoadResult(source.name, source.path)
+    result.compile_seconds = source.compile_seconds
+    result.deferred = True
+    plugin_load_results.append(result)
+    return result
+
+
+def get_plugin_paths():
+    """Get the builtin plugin path and paths from REVIEW4D_PLUGINS."""
 
     plugin_paths = [os.path.join(os.path.dirname(__file__), "..", "plugins")]
     env_plugin_paths = os.getenv("REVIEW4D_PLUGINS")
     if env_plugin_paths:
         plugin_paths.extend(env_plugin_paths.split(os.pathsep))
+    return plugin_paths
 
-    for path in plugin_paths:
-        if not os.path.isdir(path):
-            print("review4d> Plugin path not found: %s" % path)
-            continue
 
-        for file in os.listdir(path):
-            if not file.endswith(".py"):
-                continue
+def plugin_cache_enabled():
+    """The plugin cache is enabled unless REVIEW4D_PLUGIN_CACHE is 0."""
+
+    return os.getenv("REVIEW4D_PLUGIN_CACHE", "1").lower() not in ("0", "false", "no")
+
+
+def get_plugin_cache_file(path):
+    """Get the local cache file used for a plugin directory."""
+
+    from .paths import get_cache_path
+
+    key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+    return get_cache_path("plugins", key + ".pickle")
+
+
+def get_plugin_cache_stats():
+    """Get plugin cache statistics.
+
+    Returns:
+        dict: Number of cache "hits" and "misses" and the result for each
+            plugin directory in "paths".
+    """
+
+    with plugin_cache_lock:
+        return {
+            "hits": plugin_cache_stats["hits"],
+            "misses": plugin_cache_stats["misses"],
+            "paths": dict(plugin_cache_stats["paths"]),
+        }
+
+
+def clear_plugin_cache():
+    """Remove all local plugin cache files."""
+
+    from .paths import get_cache_path
 
-            module_path = os.path.join(path, file)
-            module_name, _ = os.path.splitext(file)
-            module = load_module(module_name, module_path)
-            if hasattr(module, "register"):
-                module.register()
+    cache_dir = get_cache_path("plugins")
+    if not os.path.isdir(cache_dir):
+        return
+
+    for file in os.listdir(cache_dir):
+        if file.endswith(".pickle"):
+            os.remove(os.path.join(cache_dir, file))
+
+
+def read_plugin_cache(path, mtime_ns):
+    """Read cached PluginSources for a plugin directory.
+
+    Returns:
+        list of PluginSources or None if the cache is missing or stale.
+    """
+
+    cache_file = get_plugin_cache_file(path)
+    try:
+        with open(cache_file, "rb") as f:
+            data = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print("review4d> Failed to read plugin cache %s: %s" % (cache_file, e))
+        return None
+
+    if (
+        data.get("version") != PLUGIN_CACHE_VERSION
+        or data.get("magic") != importlib.util.MAGIC_NUMBER
+        or data.get("path") != os.path.abspath(path)
+        or data.get("mtime_ns") != mtime_ns
+    ):
+        return None
+
+    return [PluginSource.from_dict(source) for source in data["sources"]]
+
+
+def write_plugin_cache(path, mtime_ns, sources):
+    """Write PluginSources for a plugin directory to the local cache."""
+
+    cache_file = get_plugin_cache_file(path)
+    data = {
+        "version": PLUGIN_CACHE_VERSION,
+        "magic": importlib.util.MAGIC_NUMBER,
+        "python": sys.version,
+        "path": os.path.abspath(path),
+        "mtime_ns": mtime_ns,
+        "sources": [source.to_dict() for source in sources],
+    }
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file + ".tmp", "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(cache_file + ".tmp", cache_file)
+    except Exception as e:
+        print("review4d> Failed to write plugin cache %s: %s" % (cache_file, e))
+
+
+def scan_plugin_path(path, lazy=True, compile_sources=False, workers=None):
+    """List the plugin modules in a directory sorted by filename.
+
+    Arguments:
+        path (str): Plugin directory.
+        lazy (bool): Look up module manifests.
+        compile_sources (bool): Read and compile each module.
+        workers (int): Read and compile modules using a pool of threads.
+
+    Returns:
+        list of PluginSources.
+    """
+
+    index = read_plugin_index(path) if lazy or compile_sources else None
+
+    sources = []
+    for file in sorted(os.listdir(path)):
+        if not file.endswith(".py"):
+            continue
+
+        module_name, _ = os.path.splitext(file)
+        sources.append(PluginSource(module_name, os.path.join(path, file)))
+
+    if compile_sources:
+        if workers:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(PluginSource.compile, sources))
+        else:
+            for source in sources:
+                source.compile()
+
+    for source in sources:
+        file = os.path.basename(source.path)
+        if index is not None and file in index:
+            source.manifest = index[file]
+            if source.manifest and not validate_plugin_manifest(
+                source.manifest, source.path
+            ):
+                source.manifest = None
+        elif lazy and not compile_sources:
+            source.manifest = read_plugin_manifest(source.path)
+
+    return sources
+
+
+def discover_plugin_path(path, lazy=True, cache=True, workers=None):
+    """Discover the plugin modules in a directory.
+
+    When cache is True the modules' manifests and compiled code are stored
+    in a local cache file. The cache is validated against the directory's
+    mtime, so a cache hit costs a single stat of the plugin directory.
+    Adding, removing or replacing a module invalidates the cache. Editing a
+    module in place may not, use clear_plugin_cache or set the
+    REVIEW4D_PLUGIN_CACHE environment variable to 0 while developing plugins.
+
+    Arguments:
+        path (str): Plugin directory.
+        lazy (bool): Look up module manifests.
+        cache (bool): Use the local plugin cache.
+        workers (int): Read and compile modules using a pool of threads.
+
+    Returns:
+        list of PluginSources or None if the path does not exist.
+    """
+
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    if not cache:
+        return scan_plugin_path(
+            path,
+            lazy=lazy,
+            compile_sources=bool(workers),
+            workers=workers,
+        )
 
-            plugin_modules.append(module)
+    abspath = os.path.abspath(path)
+    sources = read_plugin_cache(path, mtime_ns)
+    with plugin_cache_lock:
+        if sources is None:
+            plugin_cache_stats["misses"] += 1
+            plugin_cache_stats["paths"][abspath] = "miss"
+        else:
+            plugin_cache_stats["hits"] += 1
+            plugin_cache_stats["paths"][abspath] = "hit"
+    if sources is not None:
+        return sources
+
+    sources = scan_plugin_path(
+        path,
+        lazy=lazy,
+        compile_sources=True,
+        workers=workers,
+    )
+    # Don't cache modules that failed to compile, they need to be reread.
+    if not any(source.error for source in sources):
+        write_plugin_cache(path, mtime_ns, sources)
+    return sources
+
+
+def load_plugins(lazy=True, cache=None, parallel=False, workers=8):
+    """Load all plugins from REVIEW4D_PLUGINS paths.
+
+    Modules with a __review4d__ manifest, or listed in a plugin directory's
+    review4d_plugins.json index, are not imported until one of the plugins
+    they declare is requested through PluginType.get or PluginType.list.
+
+    Plugin modules are registered in plugin path order and then by filename.
+    A module that fails to load is reported and skipped.
+
+    Arguments:
+        lazy (bool): Defer loading of modules with manifests. Defaults to True.
+        cache (bool): Use the local plugin cache. Defaults to True unless the
+            REVIEW4D_PLUGIN_CACHE environment variable is set to 0.
+        parallel (bool): Read and compile plugin modules using a pool of
+            threads. Modules are still executed and registered in the calling
+            thread. Defaults to False.
+        workers (int): Number of threads used when parallel is True.
+
+    Returns:
+        list of PluginLoadResults.
+    """
+
+    if cache is None:
+        cache = plugin_cache_enabled()
+
+    plugin_paths = get_plugin_paths()
+    discover = functools.partial(
+        discover_plugin_path,
+        lazy=lazy,
+        cache=cache,
+        workers=workers if parallel else None,
+    )
+    if parallel:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(discover, path) for path in plugin_paths]
+            discovered = [future.exception() or future.result() for future in futures]
+    else:
+        discovered = []
+        for path in plugin_paths:
+            try:
+                discovered.append(discover(path))
+            except Exception as e:
+                discovered.append(e)
+
+    results = []
+    for path, sources in zip(plugin_paths, discovered):
+        results.extend(register_plugin_sources(path, sources, lazy=lazy))
+    return results
+
+
+def load_plugin_path(path, lazy=True, cache=None):
+    """Load all plugin modules in a directory.
+
+    See load_plugins for details.
+
+    Returns:
+        list of PluginLoadResults.
+    """
+
+    if cache is None:
+        cache = plugin_cache_enabled()
+
+    try:
+        sources = discover_plugin_path(path, lazy=lazy, cache=cache)
+    except Exception as e:
+        sources = e
+    return register_plugin_sources(path, sources, lazy=lazy)
+
+
+def register_plugin_sources(path, sources, lazy=True):
+    """Load or defer the PluginSources discovered in a plugin directory.
+
+    Arguments:
+        path (str): Plugin directory.
+        sources (list): PluginSources, None if the directory was not found or
+            the Exception raised while discovering the directory.
+        lazy (bool): Defer loading of modules with manifests.
+
+    Returns:
+        list of PluginLoadResults.
+    """
+
+    if sources is None:
+        print("review4d> Plugin path not found: %s" % path)
+        return []
+
+    if isinstance(sources, Exception):
+        print("review4d> Failed to read plugin path %s: %s" % (path, sources))
+        return []
+
+    results = []
+    for source in sources:
+        if lazy and source.manifest and not source.error:
+            results.append(defer_plugin_source(source))
+        else:
+            results.append(run_plugin_source(source))
+    return results
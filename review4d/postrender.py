@@ -1,8 +1,18 @@
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from .plugins import PluginType
 from .queue import execute_in_main_thread
 
 __all__ = [
     "PostRender",
+    "PostRenderExecutor",
+    "PostRenderStatus",
+    "PostRenderTask",
+    "ThreadAffinity",
+    "get_post_render_executor",
     "get_post_renderer",
     "get_available_post_renderers",
     "get_post_renderers",
@@ -10,14 +20,42 @@ __all__ = [
 ]
 
 
+class ThreadAffinity:
+    """PostRender thread affinity Enum.
+
+    Attributes:
+        main: execute runs in the main thread. Required to use the UI or
+            the active document.
+        thread: execute runs in a worker thread.
+        process: the commands returned by get_commands run as subprocesses
+            from a worker thread.
+    """
+
+    main = "main"
+    thread = "thread"
+    process = "process"
+
+
 class PostRender(PluginType):
     """PostRender plugins are run after a preview render completes.
 
     You could use a PostRender plugin to open the preview render in another
     program like djv or upload the render to ShotGrid.
+
+    Attributes:
+        affinity (str): One of the ThreadAffinity values. Plugins that don't
+            touch the UI or the document should use thread or process so
+            they don't block Cinema 4D.
+        timeout (float): Seconds after which a thread or process plugin is
+            reported as timed out. Subprocesses are killed, threads can't be
+            stopped and are left to finish in the background. Ignored for
+            main affinity, a plugin blocking the main thread can't be
+            interrupted or reported until it returns.
     """
 
     enabled = False  # PostRender items will be unchecked in UI by default.
+    affinity = ThreadAffinity.main
+    timeout = None
     _base_id = 30001
 
     def is_available(self):
@@ -36,6 +74,199 @@ class PostRender(PluginType):
 
         return NotImplemented
 
+    def get_commands(self, render_path):
+        """Implement this method to return the commands run by plugins with
+        process affinity. Each command is a list of arguments."""
+
+        return []
+
+
+class PostRenderStatus:
+    """PostRenderTask status Enum."""
+
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+    timeout = "timeout"
+
+    finished = (done, failed, timeout)
+
+
+class PostRenderTask:
+    """A PostRender plugin executed by a PostRenderExecutor.
+
+    Attributes:
+        post_renderer (PostRender): The plugin instance.
+        args (tuple): Arguments passed to execute or get_commands.
+        status (str): One of the PostRenderStatus values.
+        error (str): Error raised by the plugin.
+    """
+
+    def __init__(self, post_renderer, args):
+        self.post_renderer = post_renderer
+        self.args = args
+        self.status = PostRenderStatus.queued
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+        self._timer = None
+
+    def __repr__(self):
+        return "<PostRenderTask:{}:{}>".format(self.post_renderer.label, self.status)
+
+    @property
+    def finished(self):
+        return self.status in PostRenderStatus.finished
+
+    def wait(self, timeout=None):
+        """Block until the plugin returns. Returns True if it returned."""
+
+        return self._done.wait(timeout)
+
+
+class PostRenderExecutor:
+    """Runs PostRender plugins according to their thread affinity.
+
+    Plugins with main affinity are queued to the main thread one by one.
+    The others run concurrently in a pool of worker threads. A plugin that
+    raises or times out is reported without affecting the others.
+
+    Arguments:
+        workers (int): Maximum number of plugins running in worker threads.
+    """
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="review4d.PostRender",
+                )
+            return self._executor
+
+    def shutdown(self, wait=True):
+        """Stop the worker threads once running plugins return."""
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+    def execute(self, post_renderers, args):
+        """Execute PostRender plugins.
+
+        Arguments:
+            post_renderers (list): PostRender classes or instances.
+            args (tuple): Arguments passed to each plugin.
+
+        Returns:
+            list of PostRenderTasks
+        """
+
+        tasks = []
+        for post_renderer in post_renderers:
+            if isinstance(post_renderer, type):
+                post_renderer = post_renderer()
+            task = PostRenderTask(post_renderer, args)
+            tasks.append(task)
+
+            if post_renderer.affinity == ThreadAffinity.main:
+                execute_in_main_thread(self._run, task)
+                continue
+
+            self._get_executor().submit(self._run, task)
+        return tasks
+
+    def _run(self, task):
+        post_renderer = task.post_renderer
+        with self._lock:
+            if task.finished:
+                task._done.set()
+                return
+            task.status = PostRenderStatus.running
+            task.started_at = time.time()
+
+        # Time spent queued in the pool doesn't count toward the timeout.
+        if post_renderer.affinity == ThreadAffinity.thread and (
+            post_renderer.timeout is not None
+        ):
+            task._timer = threading.Timer(
+                post_renderer.timeout, self._on_timeout, (task,)
+            )
+            task._timer.daemon = True
+            task._timer.start()
+
+        try:
+            if post_renderer.affinity == ThreadAffinity.process:
+                self._run_commands(task)
+            else:
+                post_renderer.execute(*task.args)
+        except subprocess.TimeoutExpired as e:
+            self._finish(task, PostRenderStatus.timeout, str(e))
+        except subprocess.CalledProcessError as e:
+            error = "Command %s exited with code %s." % (e.cmd, e.returncode)
+            self._finish(task, PostRenderStatus.failed, error)
+        except Exception as e:
+            self._finish(task, PostRenderStatus.failed, str(e))
+        else:
+            self._finish(task, PostRenderStatus.done)
+        if task._timer:
+            task._timer.cancel()
+        task._done.set()
+
+    def _run_commands(self, task):
+        timeout = task.post_renderer.timeout
+        deadline = time.time() + timeout if timeout is not None else None
+        for command in task.post_renderer.get_commands(*task.args):
+            subprocess.run(
+                command,
+                stdin=subprocess.DEVNULL,
+                check=True,
+                timeout=None if deadline is None else max(deadline - time.time(), 0),
+            )
+
+    def _on_timeout(self, task):
+        if not task.finished:
+            self._finish(
+                task,
+                PostRenderStatus.timeout,
+                "Timed out after %s seconds." % task.post_renderer.timeout,
+            )
+
+    def _finish(self, task, status, error=None):
+        with self._lock:
+            if task.finished:
+                # Timed out plugins keep running but stay reported as such.
+                return
+            task.status = status
+            task.error = error
+            task.finished_at = time.time()
+
+        if error:
+            print(
+                "review4d> PostRender %s %s: %s"
+                % (task.post_renderer.label, status, error)
+            )
+
+
+post_render_executor = None
+
+
+def get_post_render_executor():
+    """Get the PostRenderExecutor shared by all renders."""
+
+    global post_render_executor
+    if post_render_executor is None:
+        post_render_executor = PostRenderExecutor()
+    return post_render_executor
+
 
 def get_post_renderer(label_or_id):
     """Get a PostRender plugin by label or id."""
@@ -56,7 +287,11 @@ def get_available_post_renderers():
 
 
 def run_post_renderer(label_or_id, render_path):
-    """Execute a PostRender plugin."""
+    """Execute a PostRender plugin according to its thread affinity.
+
+    Returns:
+        PostRenderTask
+    """
 
-    post_renderer = get_post_renderer(label_or_id)()
-    execute_in_main_thread(post_renderer.execute, render_path)
+    post_renderer = get_post_renderer(label_or_id)
+    return get_post_render_executor().execute([post_renderer], (render_path,))[0]
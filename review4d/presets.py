@@ -8,6 +8,8 @@ __all__ = [
     "get_preset_path",
     "PathPreset",
     "PathPresetError",
+    "PresetPaths",
+    "resolve_all_presets",
 ]
 
 
@@ -54,6 +56,59 @@ def get_preset_path(preset_label_or_id, file):
     return preset().execute(ctx)
 
 
+class PresetPaths(dict):
+    """Maps PathPreset labels to the paths they generated for a file.
+
+    Presets that raised an exception are excluded and their exceptions are
+    stored by label in the errors dict.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.errors = {}
+        self.presets = {}
+        self._presets_by_path = {}
+
+    def add(self, preset, path):
+        self[preset.label] = path
+        self.presets[preset.label] = preset
+        if path:
+            self._presets_by_path.setdefault(path, preset)
+
+    def add_error(self, preset, error):
+        self.errors[preset.label] = error
+        self.presets[preset.label] = preset
+
+    def get_preset(self, path):
+        """Get the first PathPreset that generated path or None."""
+
+        return self._presets_by_path.get(path)
+
+
+def resolve_all_presets(file):
+    """Execute all PathPreset plugins using a single context.
+
+    Arguments:
+        file (str): Source file path to generate output file paths from.
+
+    Returns:
+        PresetPaths: Mapping of preset label to output file path.
+    """
+
+    from . import context
+
+    ctx = context.collect_context(file)
+    results = PresetPaths()
+    for preset in get_path_presets():
+        try:
+            path = preset().execute(dict(ctx))
+        except Exception as e:
+            results.add_error(preset, e)
+        else:
+            results.add(preset, path)
+    return results
+
+
 class UserPreviewsPreset(PathPreset):
     label = "User Previews"
     order = 1
@@ -1,32 +1,409 @@
+import bisect
+import heapq
+import itertools
+import json
+import os
+import sys
+import threading
+import time
 import traceback
-
-try:
-    from queue import Queue
-except ImportError:
-    from Queue import Queue
-
-import c4d
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
 
 from .constants import COMMAND_QUEUE_ID
 
 __all__ = [
+    "CommandPriority",
+    "CommandQueue",
+    "dump_queue_stats",
     "execute_in_main_thread",
     "execute_queued_commands",
+    "get_queue_stats",
+    "queue_command",
+    "QueueStats",
+    "reset_queue_stats",
+    "submit_to_main_thread",
+    "submit_to_main_thread_async",
 ]
 
 
-COMMAND_QUEUE = Queue()
+# Default time in seconds the main thread spends on queued commands per tick.
+TIME_BUDGET = 0.02
+
+# Commands running longer than this many seconds are logged as slow.
+SLOW_TASK_THRESHOLD = 0.05
+
+
+class CommandPriority:
+    """CommandQueue priority Enum. Lower values run first."""
+
+    high = 0
+    normal = 1
+    low = 2
+
+
+class Histogram:
+    """Count of durations in fixed millisecond buckets.
+
+    Attributes:
+        buckets (list): Upper bounds of each bucket in milliseconds. The
+            last bucket counts everything above the last bound.
+        counts (list): Number of durations in each bucket.
+    """
+
+    buckets = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def to_dict(self):
+        labels = ["<=%sms" % bound for bound in self.buckets]
+        labels.append(">%sms" % self.buckets[-1])
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "max_ms": self.max,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class QueueStats:
+    """Timings of the commands executed by a CommandQueue.
+
+    Attributes:
+        latency (Histogram): Time from queuing a command to starting it.
+        run_time (Histogram): Time spent running each command.
+        depth (int): Number of commands currently queued.
+        peak_depth (int): Highest number of commands queued at once.
+        slow_tasks (deque): The most recent commands that ran longer than
+            slow_threshold, with the callable and where it was queued from.
+    """
+
+    def __init__(self, slow_threshold=SLOW_TASK_THRESHOLD, max_slow_tasks=100):
+        self.slow_threshold = slow_threshold
+        self.slow_tasks = deque(maxlen=max_slow_tasks)
+        self.reset()
+
+    def reset(self):
+        self.latency = Histogram()
+        self.run_time = Histogram()
+        self.depth = 0
+        self.peak_depth = 0
+        self.slow_tasks.clear()
+        self.started_at = time.time()
+
+    def set_depth(self, depth):
+        self.depth = depth
+        self.peak_depth = max(self.peak_depth, depth)
+
+    def add(self, command, latency, run_time):
+        self.latency.add(latency)
+        self.run_time.add(run_time)
+        if run_time >= self.slow_threshold:
+            self.slow_tasks.append(
+                {
+                    "task": get_task_name(command[0], command[1]),
+                    "origin": command[5],
+                    "latency_ms": latency * 1000,
+                    "run_time_ms": run_time * 1000,
+                    "time": time.time(),
+                }
+            )
+
+    def to_dict(self):
+        return {
+            "since": self.started_at,
+            "depth": self.depth,
+            "peak_depth": self.peak_depth,
+            "latency": self.latency.to_dict(),
+            "run_time": self.run_time.to_dict(),
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "slow_tasks": list(self.slow_tasks),
+        }
+
+
+class CommandQueue:
+    """Priority queue of commands executed in the main thread.
+
+    Commands run in priority order, then in the order they were queued.
+    Commands queued with a key replace a pending command with the same key,
+    so idempotent UI refreshes only run once with the latest arguments.
+
+    Only one wakeup is sent to Cinema 4D per pending batch of commands. The
+    wakeup is sent again when a batch runs out of time before the queue is
+    empty.
+
+    Attributes:
+        stats (QueueStats): Latency, run time and depth of the queue. Guarded
+            by the queue's lock.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._keys = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._wakeup_pending = False
+        self.stats = QueueStats()
+
+    def __len__(self):
+        return self._size
+
+    def empty(self):
+        return len(self) == 0
+
+    def put(
+        self, task, args=(), kwargs=None, priority=CommandPriority.normal, key=None
+    ):
+        command = [task, args, kwargs or {}, key, time.perf_counter(), get_origin()]
+        with self._lock:
+            pending = self._keys.get(key) if key is not None else None
+            if pending and priority >= pending[0]:
+                # Keep the pending command's place in the queue and the time
+                # it was first queued.
+                command[4] = pending[2][4]
+                pending[2] = command
+                return
+
+            if pending:
+                command[4] = pending[2][4]
+                pending[2] = None
+                self._size -= 1
+
+            entry = [priority, next(self._counter), command]
+            if key is not None:
+                self._keys[key] = entry
+            heapq.heappush(self._heap, entry)
+            self._size += 1
+            self.stats.set_depth(self._size)
+            self._wake()
+
+    def get(self):
+        """Pop the next command. Returns None when the queue is empty."""
+
+        with self._lock:
+            while self._heap:
+                command = heapq.heappop(self._heap)[2]
+                if command is None:
+                    continue
+                self._size -= 1
+                self.stats.set_depth(self._size)
+                key = command[3]
+                if key is not None:
+                    del self._keys[key]
+                return command
+        return None
+
+    def execute(self, budget=TIME_BUDGET):
+        """Execute queued commands until the queue is empty or budget seconds
+        have passed. At least one command is executed per call.
+
+        Returns:
+            int: Number of commands executed.
+        """
+
+        with self._lock:
+            self._wakeup_pending = False
+
+        deadline = time.perf_counter() + budget if budget is not None else None
+        count = 0
+        while True:
+            command = self.get()
+            if command is None:
+                break
+
+            task, args, kwargs, _, queued_at, _ = command
+            started_at = time.perf_counter()
+            try:
+                task(*args, **kwargs)
+            except:
+                traceback.print_exc()
+            finished_at = time.perf_counter()
+            with self._lock:
+                self.stats.add(
+                    command, started_at - queued_at, finished_at - started_at
+                )
+            count += 1
+
+            if deadline is not None and finished_at >= deadline:
+                with self._lock:
+                    if self._size:
+                        self._wake()
+                break
+        return count
+
+    def _wake(self):
+        # Call with the lock held.
+        if self._wakeup_pending:
+            return
+
+        import c4d
+
+        self._wakeup_pending = True
+        c4d.SpecialEventAdd(COMMAND_QUEUE_ID)
+
+
+COMMAND_QUEUE = CommandQueue()
 
 
 def execute_in_main_thread(task, *args, **kwargs):
-    COMMAND_QUEUE.put((task, args, kwargs))
-    c4d.SpecialEventAdd(COMMAND_QUEUE_ID)
+    COMMAND_QUEUE.put(task, args, kwargs)
+
+
+def queue_command(
+    task, args=(), kwargs=None, priority=CommandPriority.normal, key=None
+):
+    """Call task in the main thread with a priority and an optional key.
+
+    Arguments:
+        task (callable): Function to call.
+        args (tuple): Positional arguments passed to task.
+        kwargs (dict): Keyword arguments passed to task.
+        priority (int): One of the CommandPriority values.
+        key (hashable): Replaces a pending command queued with the same key.
+
+    Examples:
+        queue_command(c4d.StatusSetBar, (50,), key="status_bar")
+    """
+
+    COMMAND_QUEUE.put(task, args, kwargs, priority=priority, key=key)
+
+
+def submit_to_main_thread(task, *args, **kwargs):
+    """Call task in the main thread and return a Future of its result.
+
+    Background threads can block on the result with a timeout, or add done
+    callbacks. The task is queued with high priority. Exceptions raised by
+    task are set on the Future instead of being printed. When called from the
+    main thread task runs immediately, waiting on a queued task there would
+    block the queue forever.
+
+    Examples:
+        future = submit_to_main_thread(doc.GetTakeData().GetCurrentTake)
+        take = future.result(timeout=10)
+
+    Returns:
+        concurrent.futures.Future
+    """
+
+    import c4d
+
+    future = Future()
+    if c4d.threading.GeIsMainThread():
+        run_future(future, task, args, kwargs)
+        return future
+
+    # A background thread may be blocked waiting on the result.
+    queue_command(
+        run_future, (future, task, args, kwargs), priority=CommandPriority.high
+    )
+    return future
+
+
+def submit_to_main_thread_async(task, *args, **kwargs):
+    """Like submit_to_main_thread but returns an asyncio Future.
+
+    Must be called from a thread running an asyncio event loop.
+
+    Examples:
+        take = await submit_to_main_thread_async(get_current_take)
+    """
+
+    import asyncio
+
+    return asyncio.wrap_future(submit_to_main_thread(task, *args, **kwargs))
+
+
+def run_future(future, task, args, kwargs):
+    if not future.set_running_or_notify_cancel():
+        return
+
+    try:
+        result = task(*args, **kwargs)
+    except BaseException as e:
+        future.set_exception(e)
+    else:
+        future.set_result(result)
+
+
+def execute_queued_commands(budget=TIME_BUDGET):
+    """Execute queued commands in the main thread.
+
+    Commands left when budget seconds have passed run in the next tick.
+    Pass None to execute every queued command.
+    """
+
+    return COMMAND_QUEUE.execute(budget)
+
+
+def get_queue_stats():
+    """Get the latency, run time and depth stats of the main thread queue.
+
+    Returns:
+        dict
+    """
+
+    with COMMAND_QUEUE._lock:
+        return COMMAND_QUEUE.stats.to_dict()
+
+
+def reset_queue_stats():
+    with COMMAND_QUEUE._lock:
+        COMMAND_QUEUE.stats.reset()
+        COMMAND_QUEUE.stats.set_depth(len(COMMAND_QUEUE))
+
+
+def dump_queue_stats(path=None):
+    """Write the main thread queue stats to a JSON file.
+
+    Arguments:
+        path (str): Defaults to queue_stats.json in the local review4d cache.
+
+    Returns:
+        str: Path to the JSON file.
+    """
+
+    if path is None:
+        from .paths import get_cache_path
+
+        path = get_cache_path("queue_stats.json")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(get_queue_stats(), f, indent=4)
+    return path
+
+
+def get_origin():
+    """Get the file, line and function that queued a command."""
+
+    frame = sys._getframe(1)
+    while frame and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if not frame:
+        return None
+
+    code = frame.f_code
+    return "%s:%s in %s" % (code.co_filename, frame.f_lineno, code.co_name)
 
 
-def execute_queued_commands():
-    while not COMMAND_QUEUE.empty():
-        task, args, kwargs = COMMAND_QUEUE.get()
-        try:
-            task(*args, **kwargs)
-        except:
-            traceback.print_exc()
+def get_task_name(task, args):
+    if task is run_future:
+        task = args[1]
+    while isinstance(task, partial):
+        task = task.func
+    module = getattr(task, "__module__", None)
+    name = getattr(task, "__qualname__", None) or repr(task)
+    return "%s.%s" % (module, name) if module else name
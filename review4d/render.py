@@ -1,19 +1,37 @@
+import os
+import shutil
 import threading
 import time
+import uuid
 from functools import partial
 
 import c4d
 import mxutils
 
+from .rendercache import get_render_cache, get_take_fingerprint
+from .transfer import TransferError, TransferPool
+
 __all__ = [
     "await_render",
     "create_render_settings",
     "edit_render_settings_dialog",
     "execute_after_render",
     "expand_render_paths",
+    "get_document_sound",
+    "get_frame_range",
+    "get_render_monitor",
+    "get_render_scheduler",
     "get_render_settings",
     "iter_takes",
+    "render_chunked",
+    "render_headless",
     "render_to_pictureviewer",
+    "RenderBatch",
+    "RenderJob",
+    "RenderJobStatus",
+    "RenderMonitor",
+    "RenderScheduler",
+    "save_document_copy",
     "set_active_render_settings",
     "Takes",
 ]
@@ -109,20 +127,115 @@ def create_render_settings(name, *, doc=None, **settings):
     return rd
 
 
+def is_rendering():
+    """Return True while c4d is rendering to the picture viewer."""
+
+    return bool(c4d.CheckIsRunning(c4d.CHECKISRUNNING_EXTERNALRENDERING))
+
+
+class RenderMonitor:
+    """Executes callbacks in the main thread when external rendering completes.
+
+    A single background thread polls c4d for all waiters. Polling starts at
+    min_interval when a waiter is added and backs off to max_interval the
+    longer a render runs. Call wake to poll immediately, the Review4d command
+    queue does this whenever c4d sends a core message.
+    """
+
+    min_interval = 0.02
+    max_interval = 1.0
+    backoff = 1.5
+
+    def __init__(self):
+        self._waiters = []
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._interval = self.min_interval
+        self._added = False
+        self._thread = None
+
+    @property
+    def waiting(self):
+        return bool(self._waiters)
+
+    def add_waiter(self, callback):
+        """Execute callback in the main thread after rendering completes."""
+
+        with self._lock:
+            self._waiters.append(callback)
+            self._interval = self.min_interval
+            self._added = True
+            # Wake an idle thread so it starts polling at min_interval.
+            self._event.set()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="review4d.RenderMonitor",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def wake(self):
+        """Check the render status now instead of waiting for the next poll."""
+
+        if self._waiters:
+            self._event.set()
+
+    def _run(self):
+        from .queue import execute_in_main_thread
+
+        while True:
+            with self._lock:
+                timeout = self._interval if self._waiters else None
+
+            self._event.wait(timeout)
+            self._event.clear()
+
+            with self._lock:
+                if not self._waiters:
+                    continue
+                if self._added:
+                    # Give a render that was just started time to begin.
+                    self._added = False
+                    continue
+
+            if is_rendering():
+                with self._lock:
+                    interval = self._interval * self.backoff
+                    self._interval = min(interval, self.max_interval)
+                continue
+
+            with self._lock:
+                waiters, self._waiters = self._waiters, []
+                self._interval = self.min_interval
+
+            for callback in waiters:
+                execute_in_main_thread(callback)
+
+
+render_monitor = RenderMonitor()
+
+
+def get_render_monitor():
+    """Get the RenderMonitor shared by all renders."""
+
+    return render_monitor
+
+
 def await_render():
     """Wait for external rendering to complete."""
 
-    while c4d.CheckIsRunning(c4d.CHECKISRUNNING_EXTERNALRENDERING):
-        time.sleep(2)
+    interval = RenderMonitor.min_interval
+    while is_rendering():
+        time.sleep(interval)
+        interval = min(interval * RenderMonitor.backoff, RenderMonitor.max_interval)
 
 
 def execute_after_render(callback):
-    """Execute a callback after external rendering is completed."""
-
-    from .queue import execute_in_main_thread
+    """Execute a callback in the main thread after external rendering is
+    completed."""
 
-    await_render()
-    execute_in_main_thread(callback)
+    render_monitor.add_waiter(callback)
 
 
 class Takes:
@@ -137,53 +250,489 @@ class Takes:
         return value in [Takes.active, Takes.all, Takes.marked]
 
 
-def render_to_pictureviewer(render_settings, takes=Takes.active, callback=None, *, doc=None):
-    """Call the Render To PictureViewer command."""
+class RenderJobStatus:
+    """RenderJob status Enum."""
+
+    queued = "queued"
+    running = "running"
+    transferring = "transferring"
+    done = "done"
+    failed = "failed"
+    cancelled = "cancelled"
+
+    finished = (done, failed, cancelled)
+
+
+class RenderJob:
+    """A render of one Take using a set of Render Settings.
+
+    Attributes:
+        render_settings (str): Name of the RenderData to render with.
+        take (BaseTake): Take to render or None to render the active Take.
+        doc (BaseDocument): Document to render.
+        status (str): One of the RenderJobStatus values.
+        error (Exception): Exception raised while starting the render.
+        queued_at, started_at, finished_at (float): Timestamps of each stage.
+        batch (RenderBatch): The batch this job belongs to.
+        path (str): Expanded output path, used to skip unchanged renders.
+        fingerprint (str): Fingerprint of the take computed before rendering.
+        cached (bool): True if the render was skipped because the output is
+            up to date.
+        stage_folder (str): Local folder the job rendered to when staging.
+        transfer (Transfer): Copy of the staged output to its destination.
+    """
 
-    doc = doc or c4d.documents.GetActiveDocument()
+    def __init__(
+        self, render_settings, take=None, *, doc=None, batch=None, path=None
+    ):
+        self.render_settings = render_settings
+        self.take = take
+        self.doc = doc or c4d.documents.GetActiveDocument()
+        self.batch = batch
+        self.path = path
+        self.fingerprint = None
+        self.cached = False
+        self.stage_folder = None
+        self.transfer = None
+        self._stage_render_data = None
+        self.status = RenderJobStatus.queued
+        self.error = None
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def __repr__(self):
+        return "<RenderJob:{}:{}>".format(self.name, self.status)
+
+    @property
+    def name(self):
+        doc_name = self.doc.GetDocumentName() if self.doc.IsAlive() else ""
+        if self.take is None:
+            return doc_name
+        return "{}:{}".format(doc_name, self.take.GetName())
+
+    @property
+    def finished(self):
+        return self.status in RenderJobStatus.finished
+
+    @property
+    def wait_time(self):
+        """Seconds spent in the queue."""
+
+        return (self.started_at or time.time()) - self.queued_at
+
+    @property
+    def render_time(self):
+        """Seconds spent rendering."""
+
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "render_settings": self.render_settings,
+            "status": self.status,
+            "cached": self.cached,
+            "error": str(self.error) if self.error else None,
+            "wait_time": self.wait_time,
+            "render_time": self.render_time,
+        }
+
+
+class RenderBatch:
+    """A group of RenderJobs submitted together.
+
+    The callback is executed after the last job finishes if none of the jobs
+    failed or were cancelled. Then the document's active Take is restored.
+
+    When use_cache is True, jobs whose output is up to date in the RenderCache
+    are finished without rendering. When stage is True, jobs render to local
+    scratch and are finished once their output is copied to its destination.
+
+    Jobs are cancelled through the scheduler the batch was submitted to,
+    defaults to the global RenderScheduler.
+    """
 
-    # Validate parameters
-    if get_render_settings(render_settings) is None:
-        raise ValueError(f"Render Settings named '{render_settings}' do not exist.")
+    def __init__(
+        self,
+        render_settings,
+        callback=None,
+        restore_take=None,
+        *,
+        doc=None,
+        use_cache=False,
+        stage=False,
+        scheduler=None,
+    ):
+        self.scheduler = scheduler or render_scheduler
+        self.render_settings = render_settings
+        self.jobs = []
+        self.callback = callback
+        self.restore_take = restore_take
+        self.doc = doc
+        self.use_cache = use_cache
+        self.stage = stage
+
+    def __repr__(self):
+        return "<RenderBatch:{} jobs>".format(len(self.jobs))
+
+    @property
+    def finished(self):
+        return all(job.finished for job in self.jobs)
+
+    @property
+    def succeeded(self):
+        return all(job.status == RenderJobStatus.done for job in self.jobs)
+
+    def cancel(self):
+        for job in self.jobs:
+            self.scheduler.cancel(job)
+
+
+class RenderScheduler:
+    """Renders RenderJobs one after another in the picture viewer.
+
+    Jobs may be submitted for multiple documents and from multiple dialogs,
+    they are rendered in the order they were queued. Queued jobs can be
+    reordered or cancelled. A running render can't be cancelled.
+
+    The scheduler must be used from the main thread.
+    """
 
-    if not Takes.is_valid(takes):
-        raise ValueError(f"Got '{takes}' for takes expected one of [1, 2, 3] or [Takes.active, Takes.all, Takes.marked].")
+    def __init__(self, monitor=None, cache=None, transfer_pool=None):
+        self.monitor = monitor or render_monitor
+        self.cache = cache
+        self.transfer_pool = transfer_pool or TransferPool()
+        self.history = []
+        self.queue = []
+        self.current = None
+        self.paused = False
+
+    def submit(
+        self,
+        render_settings,
+        takes=Takes.active,
+        callback=None,
+        *,
+        doc=None,
+        use_cache=False,
+        stage=False,
+    ):
+        """Queue a RenderJob for each Take to render.
+
+        Arguments:
+            use_cache (bool): Skip Takes whose output is up to date.
+            stage (bool): Render to local scratch then copy the output to
+                its destination in the background.
+
+        Returns:
+            RenderBatch
+        """
+
+        doc = doc or c4d.documents.GetActiveDocument()
+        paths = []
+        if use_cache or stage:
+            rd = get_render_settings(render_settings, doc=doc)
+            paths = expand_render_paths(
+                rd[c4d.RDATA_PATH], render_settings, takes, doc=doc
+            )
 
-    # Render to pictureviewer
-    if takes == Takes.active:
-        c4d.CallCommand(12099)
-        if callback:
-            # Start thread to wait for render to finish then execute callback
-            thread = threading.Thread(
-                target=execute_after_render,
-                args=(callback,),
+        if takes == Takes.active:
+            batch = RenderBatch(
+                render_settings,
+                callback,
+                doc=doc,
+                use_cache=use_cache,
+                stage=stage,
+                scheduler=self,
             )
-            thread.start()
-        return
+            path = paths[0] if paths else None
+            job = RenderJob(render_settings, doc=doc, batch=batch, path=path)
+            batch.jobs.append(job)
+        else:
+            restore_take = get_active_take(doc=doc)
+            batch = RenderBatch(
+                render_settings,
+                callback,
+                restore_take,
+                doc=doc,
+                use_cache=use_cache,
+                stage=stage,
+                scheduler=self,
+            )
+            for i, take in enumerate(iter_takes(marked=takes == Takes.marked, doc=doc)):
+                path = paths[i] if i < len(paths) else None
+                job = RenderJob(render_settings, take, doc=doc, batch=batch, path=path)
+                batch.jobs.append(job)
 
-    # Build pipeline to render all takes sequentially.
-    # We start with the final callback, and create
-    # render_take partials in reverse order.
-    # This allows us to await each render before finally
-    # executing the original callback functions.
-    pipeline = partial(
-        execute_funcs,
-        callback,
-        partial(set_take, render_settings, get_active_take(doc=doc)),
-    )
-    for take in list(iter_takes(marked=takes == Takes.marked, doc=doc))[::-1]:
-        pipeline = partial(render_take, render_settings, take, callback=pipeline, doc=doc)
+        for job in batch.jobs:
+            self.enqueue(job)
+
+        if not batch.jobs:
+            self._finish_batch(batch)
+
+        return batch
+
+    def enqueue(self, job):
+        """Add a RenderJob to the end of the queue."""
+
+        self.queue.append(job)
+        self.history.append(job)
+        self._start_next()
+        return job
+
+    def move(self, job, index):
+        """Move a queued RenderJob to a new position in the queue."""
+
+        self.queue.remove(job)
+        self.queue.insert(index, job)
+
+    def cancel(self, job):
+        """Cancel a queued RenderJob."""
+
+        if job in self.queue:
+            self.queue.remove(job)
+            self._finish_job(job, RenderJobStatus.cancelled)
+
+    def cancel_all(self):
+        for job in list(self.queue):
+            self.cancel(job)
+
+    def pause(self):
+        """Stop starting new jobs. The running job will finish."""
+
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        self._start_next()
+
+    def status(self):
+        """Get a list of dicts describing all jobs submitted to this scheduler."""
+
+        return [job.to_dict() for job in self.history]
+
+    def clear_history(self):
+        self.history = [job for job in self.history if not job.finished]
+
+    def _start_next(self):
+        if self.current or self.paused:
+            return
+
+        while self.queue:
+            job = self.queue.pop(0)
+            if not job.doc.IsAlive():
+                job.error = RuntimeError("Document was closed.")
+                self._finish_job(job, RenderJobStatus.failed)
+                continue
+
+            try:
+                started = self._start_job(job)
+            except Exception as e:
+                job.error = e
+                self._finish_job(job, RenderJobStatus.failed)
+                continue
+
+            if not started:
+                self._finish_job(job, RenderJobStatus.done)
+                continue
+            return
+
+        c4d.StatusClear()
+
+    def _start_job(self, job):
+        if get_render_settings(job.render_settings, doc=job.doc) is None:
+            raise ValueError(
+                f"Render Settings named '{job.render_settings}' do not exist."
+            )
+
+        if c4d.documents.GetActiveDocument() != job.doc:
+            c4d.documents.SetActiveDocument(job.doc)
+
+        if job.take is None:
+            set_active_render_settings(job.render_settings, doc=job.doc)
+        else:
+            set_take(job.render_settings, job.take, doc=job.doc)
+
+        if job.batch and job.batch.use_cache and job.path:
+            cache = self.cache or get_render_cache()
+            try:
+                job.fingerprint = get_take_fingerprint(
+                    job.render_settings, job.take, job.path, doc=job.doc
+                )
+            except Exception as e:
+                print("review4d> Failed to fingerprint %s: %s" % (job.name, e))
+                job.fingerprint = None
+            if job.fingerprint and cache.is_current(job.path, job.fingerprint):
+                job.cached = True
+                print("review4d> Skipping unchanged render %s" % job.name)
+                return False
+
+        try:
+            if job.batch and job.batch.stage and job.path:
+                self._stage_job(job)
+
+            c4d.StatusSetText(
+                "Review4d rendering {} ({} queued)".format(job.name, len(self.queue))
+            )
+            self.current = job
+            job.status = RenderJobStatus.running
+            job.started_at = time.time()
+            c4d.CallCommand(12099)
+            self.monitor.add_waiter(partial(self._on_render_finished, job))
+        except BaseException:
+            self.current = None
+            if job.stage_folder:
+                self._unstage_job(job)
+                shutil.rmtree(job.stage_folder, ignore_errors=True)
+            raise
+        return True
+
+    def _stage_job(self, job):
+        """Render the job to a local scratch folder.
+
+        The job's render settings are cloned, pointed at the scratch folder
+        and made active until the render finishes. The user's render settings
+        are never modified.
+        """
+
+        from .paths import get_cache_path
+
+        rd = get_render_settings(job.render_settings, doc=job.doc)
+        job.stage_folder = get_cache_path("staging", uuid.uuid4().hex)
+        os.makedirs(job.stage_folder, exist_ok=True)
+        stage_path = os.path.join(job.stage_folder, os.path.basename(job.path))
+
+        stage_rd = rd.GetClone(c4d.COPYFLAGS_NONE)
+        stage_rd.SetName("%s (staging)" % rd.GetName())
+        stage_rd.GetDataInstance().SetFilename(c4d.RDATA_PATH, stage_path)
+        stage_rd.InsertAfter(rd)
+        job.doc.SetActiveRenderData(stage_rd)
+        job._stage_render_data = stage_rd
+
+    def _unstage_job(self, job):
+        """Remove the staging render settings and reactivate the job's."""
+
+        stage_rd, job._stage_render_data = job._stage_render_data, None
+        if stage_rd is not None and stage_rd.IsAlive():
+            stage_rd.Remove()
+        set_active_render_settings(job.render_settings, doc=job.doc)
+
+    def _on_render_finished(self, job):
+        self.current = None
+        if job.stage_folder:
+            if job.doc.IsAlive():
+                self._unstage_job(job)
+            self._transfer_job(job)
+        else:
+            if job.fingerprint:
+                (self.cache or get_render_cache()).record(job.path, job.fingerprint)
+            self._finish_job(job, RenderJobStatus.done)
+        self._start_next()
+
+    def _transfer_job(self, job):
+        """Copy the staged output of a job to its destination."""
+
+        from .queue import execute_in_main_thread
+
+        folder = os.path.dirname(job.path)
+        files = [
+            (os.path.join(job.stage_folder, name), os.path.join(folder, name))
+            for name in sorted(os.listdir(job.stage_folder))
+        ]
+        if not files:
+            job.error = RuntimeError("Render did not write any files.")
+            self._finish_job(job, RenderJobStatus.failed)
+            return
+
+        job.status = RenderJobStatus.transferring
+        job.transfer = self.transfer_pool.transfer(
+            files,
+            on_finished=lambda t: execute_in_main_thread(
+                self._on_transfer_finished, job
+            ),
+        )
+
+    def _on_transfer_finished(self, job):
+        if not job.transfer.succeeded:
+            job.error = TransferError(
+                "Staged render kept in %s. %s"
+                % (job.stage_folder, "; ".join(job.transfer.errors))
+            )
+            self._finish_job(job, RenderJobStatus.failed)
+            return
+
+        shutil.rmtree(job.stage_folder, ignore_errors=True)
+        if job.fingerprint:
+            (self.cache or get_render_cache()).record(job.path, job.fingerprint)
+        self._finish_job(job, RenderJobStatus.done)
+
+    def _finish_job(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+        if job.error:
+            print("review4d> Render failed %s: %s" % (job.name, job.error))
+        if job.batch and job.batch.finished:
+            self._finish_batch(job.batch)
+
+    def _finish_batch(self, batch):
+        try:
+            if batch.callback and batch.succeeded:
+                batch.callback()
+        finally:
+            if batch.restore_take is not None and batch.doc.IsAlive():
+                set_take(batch.render_settings, batch.restore_take, doc=batch.doc)
+
+
+render_scheduler = RenderScheduler()
+
+
+def get_render_scheduler():
+    """Get the RenderScheduler shared by all renders."""
 
-    # Execute pipeline
-    pipeline()
+    return render_scheduler
 
 
-def execute_funcs(*tasks):
-    """Execute a bunch of functions sequentially."""
+def render_to_pictureviewer(
+    render_settings,
+    takes=Takes.active,
+    callback=None,
+    *,
+    doc=None,
+    use_cache=False,
+    stage=False,
+):
+    """Call the Render To PictureViewer command.
 
-    for task in tasks:
-        if task is not None:
-            task()
+    Renders are queued in the shared RenderScheduler. If another render is in
+    progress this render starts after it finishes.
+
+    When use_cache is True, Takes that have not changed since their output was
+    last rendered are skipped. The callback is still executed so post
+    renderers receive every render path.
+
+    When stage is True, each Take renders to a local scratch folder and is
+    copied to its destination in the background while the next Take renders.
+    The callback is executed after every copy is verified and in place.
+
+    Returns:
+        RenderBatch
+    """
+
+    doc = doc or c4d.documents.GetActiveDocument()
+
+    # Validate parameters
+    if get_render_settings(render_settings, doc=doc) is None:
+        raise ValueError(f"Render Settings named '{render_settings}' do not exist.")
+
+    if not Takes.is_valid(takes):
+        raise ValueError(f"Got '{takes}' for takes expected one of [1, 2, 3] or [Takes.active, Takes.all, Takes.marked].")
+
+    return render_scheduler.submit(
+        render_settings, takes, callback, doc=doc, use_cache=use_cache, stage=stage
+    )
 
 
 def get_active_take(doc=None):
@@ -202,7 +751,7 @@ def set_take(render_settings, take, *, doc=None):
     data.SetCurrentTake(take)
     c4d.EventAdd()
 
-    set_active_render_settings(render_settings)
+    set_active_render_settings(render_settings, doc=doc)
 
 
 def render_take(render_settings, take, *, callback=None, doc=None):
@@ -215,11 +764,7 @@ def render_take(render_settings, take, *, callback=None, doc=None):
     set_take(render_settings, take, doc=doc)
     c4d.CallCommand(12099)
     if callback:
-        thread = threading.Thread(
-            target=execute_after_render,
-            args=(callback,),
-        )
-        thread.start()
+        execute_after_render(callback)
 
 
 def iter_takes(marked=False, *, doc=None):
@@ -260,3 +805,324 @@ def expand_render_paths(path, render_settings, takes=Takes.active, *, doc=None):
             filename = c4d.modules.tokensystem.StringConvertTokens(path, take_rpd)
             paths.append(filename)
     return paths
+
+
+def save_document_copy(doc=None):
+    """Save a copy of a document for worker processes to load.
+
+    The copy is saved next to the document so relative asset paths resolve.
+    Unsaved documents are saved to the local review4d cache.
+
+    Returns:
+        str: Path to the copy.
+    """
+
+    from .paths import get_cache_path
+
+    doc = doc or c4d.documents.GetActiveDocument()
+    folder = doc.GetDocumentPath() or get_cache_path("documents")
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, ".review4d_{}.c4d".format(uuid.uuid4().hex[:8]))
+
+    clone = doc.GetClone(c4d.COPYFLAGS_DOCUMENT)
+    if not c4d.documents.SaveDocument(
+        clone,
+        path,
+        c4d.SAVEDOCUMENTFLAGS_DONTADDTORECENTLIST,
+        c4d.FORMAT_C4DEXPORT,
+    ):
+        raise RuntimeError("Failed to save document copy to %s" % path)
+    return path
+
+
+def make_headless_progress_callback(tasks, on_progress=None):
+    """Make a HeadlessRender progress callback that updates the status bar
+    and forwards tasks to on_progress in the main thread."""
+
+    from .queue import queue_command
+
+    status = {"percent": -1}
+
+    def progress(task):
+        percent = int(sum(t.progress for t in tasks) / len(tasks) * 100)
+        if percent != status["percent"]:
+            status["percent"] = percent
+            queue_command(c4d.StatusSetBar, (percent,), key="status_bar")
+        if on_progress:
+            queue_command(on_progress, (task,), key=(on_progress, task))
+
+    return progress
+
+
+def render_headless(
+    render_settings,
+    takes=Takes.active,
+    callback=None,
+    *,
+    doc=None,
+    workers=None,
+    executable=None,
+    on_progress=None,
+):
+    """Render takes concurrently in headless c4dpy worker processes.
+
+    A copy of the document is saved for the workers to load, so unsaved
+    changes are included. Each take renders to the path returned by
+    expand_render_paths.
+
+    Arguments:
+        render_settings (str): Name of the RenderData to render with.
+        takes (int): One of the Takes values.
+        callback (callable): Executed in the main thread after all takes
+            rendered successfully.
+        doc (BaseDocument): Document to render. Defaults to active document.
+        workers (int): Number of worker processes. Defaults to cpu count.
+        executable (str): c4dpy executable. See HeadlessRenderPool.
+        on_progress (callable): Called in the main thread with each
+            HeadlessTask whenever its status or progress changes.
+
+    Returns:
+        HeadlessRender
+    """
+
+    from .headless import HeadlessRenderPool, HeadlessTask, get_take_path
+    from .queue import execute_in_main_thread
+
+    doc = doc or c4d.documents.GetActiveDocument()
+    rd = get_render_settings(render_settings, doc=doc)
+    if rd is None:
+        raise ValueError(f"Render Settings named '{render_settings}' do not exist.")
+
+    if not Takes.is_valid(takes):
+        raise ValueError(f"Got '{takes}' for takes expected one of [1, 2, 3].")
+
+    render_paths = expand_render_paths(
+        rd[c4d.RDATA_PATH],
+        render_settings,
+        takes,
+        doc=doc,
+    )
+    if takes == Takes.active:
+        take_ids = [(None, None)]
+    else:
+        marked = takes == Takes.marked
+        take_ids = [
+            (take.GetName(), get_take_path(take))
+            for take in iter_takes(marked, doc=doc)
+        ]
+
+    document = save_document_copy(doc)
+    tasks = [
+        HeadlessTask(document, render_settings, take, path, take_path=take_path)
+        for (take, take_path), path in zip(take_ids, render_paths)
+    ]
+    progress = make_headless_progress_callback(tasks, on_progress)
+
+    def finished(render):
+        try:
+            os.remove(document)
+        except OSError:
+            pass
+
+        execute_in_main_thread(c4d.StatusClear)
+        for task in render.tasks:
+            if task.status == "failed":
+                print("review4d> Headless render failed %s: %s" % (task, task.error))
+
+        if callback and render.succeeded:
+            execute_in_main_thread(callback)
+
+    pool = HeadlessRenderPool(executable, workers)
+    return pool.render(tasks, progress, finished)
+
+
+def get_frame_range(render_settings, take=None, *, doc=None):
+    """Get the first and last frame rendered by a set of Render Settings.
+
+    Arguments:
+        render_settings (str): Name of the RenderData.
+        take (BaseTake): Take whose overrides apply. The take is activated
+            while the frame range is read. Defaults to the current take.
+
+    Returns:
+        tuple: (start, end) frames.
+    """
+
+    doc = doc or c4d.documents.GetActiveDocument()
+    if take is not None:
+        take_data = mxutils.CheckType(doc.GetTakeData())
+        current = take_data.GetCurrentTake()
+        if take != current:
+            take_data.SetCurrentTake(take)
+            try:
+                return get_frame_range(render_settings, doc=doc)
+            finally:
+                take_data.SetCurrentTake(current)
+
+    rd = get_render_settings(render_settings, doc=doc)
+    fps = doc.GetFps()
+    sequence = rd[c4d.RDATA_FRAMESEQUENCE]
+    if sequence == c4d.RDATA_FRAMESEQUENCE_CURRENTFRAME:
+        frame = doc.GetTime().GetFrame(fps)
+        return frame, frame
+    if sequence == c4d.RDATA_FRAMESEQUENCE_ALLFRAMES:
+        return doc.GetMinTime().GetFrame(fps), doc.GetMaxTime().GetFrame(fps)
+    if sequence == c4d.RDATA_FRAMESEQUENCE_PREVIEWFRAMES:
+        return doc.GetLoopMinTime().GetFrame(fps), doc.GetLoopMaxTime().GetFrame(fps)
+    return rd[c4d.RDATA_FRAMEFROM].GetFrame(fps), rd[c4d.RDATA_FRAMETO].GetFrame(fps)
+
+
+def get_document_sound(*, doc=None):
+    """Get the sound file of the first enabled sound track in a document.
+
+    Returns:
+        tuple: (path, start) with the start time in seconds or None.
+    """
+
+    doc = doc or c4d.documents.GetActiveDocument()
+    for op in mxutils.IterateTree(doc.GetFirstObject(), True):
+        for track in op.GetCTracks():
+            if track.GetType() != c4d.CTsound or not track[c4d.CID_SOUND_ONOFF]:
+                continue
+            path = track[c4d.CID_SOUND_NAME]
+            if not path:
+                continue
+            if not os.path.isabs(path):
+                path = os.path.join(doc.GetDocumentPath(), path)
+            return path, track[c4d.CID_SOUND_START].Get()
+
+
+def render_chunked(
+    render_settings,
+    takes=Takes.active,
+    callback=None,
+    *,
+    doc=None,
+    segment_size=None,
+    workers=None,
+    retries=1,
+    executable=None,
+    ffmpeg=None,
+    on_progress=None,
+):
+    """Render frame range segments in parallel and stitch them into movies.
+
+    Each take's frame range is split into segments that are rendered as png
+    sequences by headless c4dpy workers. Failed segments are retried on their
+    own. When all segments of a take are rendered they are encoded with
+    ffmpeg to the path returned by expand_render_paths, with the sound of the
+    document's first sound track.
+
+    Arguments:
+        render_settings (str): Name of the RenderData to render with.
+        takes (int): One of the Takes values.
+        callback (callable): Executed in the main thread after all takes were
+            rendered and stitched successfully.
+        doc (BaseDocument): Document to render. Defaults to active document.
+        segment_size (int): Frames per segment. Defaults to splitting the
+            frame range evenly between workers.
+        workers (int): Number of worker processes. Defaults to cpu count.
+        retries (int): Number of times a failed segment is retried.
+        executable (str): c4dpy executable. See HeadlessRenderPool.
+        ffmpeg (str): ffmpeg executable. See stitch_image_sequence.
+        on_progress (callable): Called in the main thread with each
+            HeadlessTask whenever its status or progress changes.
+
+    Returns:
+        HeadlessRender
+    """
+
+    from .headless import (
+        HeadlessRenderPool,
+        HeadlessTask,
+        get_take_path,
+        split_frame_range,
+        stitch_image_sequence,
+    )
+    from .paths import get_cache_path
+    from .queue import execute_in_main_thread
+
+    doc = doc or c4d.documents.GetActiveDocument()
+    rd = get_render_settings(render_settings, doc=doc)
+    if rd is None:
+        raise ValueError(f"Render Settings named '{render_settings}' do not exist.")
+
+    if not Takes.is_valid(takes):
+        raise ValueError(f"Got '{takes}' for takes expected one of [1, 2, 3].")
+
+    pool = HeadlessRenderPool(executable, workers, retries)
+    fps = rd[c4d.RDATA_FRAMERATE]
+    sound = get_document_sound(doc=doc) or (None, 0.0)
+
+    render_paths = expand_render_paths(
+        rd[c4d.RDATA_PATH],
+        render_settings,
+        takes,
+        doc=doc,
+    )
+    if takes == Takes.active:
+        take_ids = [(None, None, get_frame_range(render_settings, doc=doc))]
+    else:
+        marked = takes == Takes.marked
+        take_ids = [
+            (
+                take.GetName(),
+                get_take_path(take),
+                get_frame_range(render_settings, take, doc=doc),
+            )
+            for take in iter_takes(marked, doc=doc)
+        ]
+
+    document = save_document_copy(doc)
+    outputs = []
+    tasks = []
+    for (take, take_path, (start, end)), path in zip(take_ids, render_paths):
+        folder = get_cache_path("segments", uuid.uuid4().hex)
+        os.makedirs(folder)
+        outputs.append((folder, path, start, end))
+        segments = split_frame_range(start, end, segment_size, segments=pool.workers)
+        for segment_start, segment_end in segments:
+            tasks.append(
+                HeadlessTask(
+                    document,
+                    render_settings,
+                    take,
+                    path=os.path.join(folder, "frame_"),
+                    frame_start=segment_start,
+                    frame_end=segment_end,
+                    image_format="png",
+                    take_path=take_path,
+                )
+            )
+
+    progress = make_headless_progress_callback(tasks, on_progress)
+
+    def finished(render):
+        # Called in a pool thread so stitching doesn't block the main thread.
+        succeeded = render.succeeded
+        try:
+            for folder, path, start, end in outputs:
+                if succeeded:
+                    try:
+                        stitch_image_sequence(
+                            folder, start, end, path, fps, ffmpeg, *sound
+                        )
+                    except Exception as e:
+                        print("review4d> %s" % e)
+                        succeeded = False
+                shutil.rmtree(folder, ignore_errors=True)
+        finally:
+            try:
+                os.remove(document)
+            except OSError:
+                pass
+
+        execute_in_main_thread(c4d.StatusClear)
+        for task in render.tasks:
+            if task.status == "failed":
+                print("review4d> Segment render failed %s: %s" % (task, task.error))
+
+        if callback and succeeded:
+            execute_in_main_thread(callback)
+
+    return pool.render(tasks, progress, finished)
@@ -0,0 +1,360 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+__all__ = [
+    "get_render_cache",
+    "get_take_fingerprint",
+    "RenderCache",
+]
+
+
+class RenderCache:
+    """Index of rendered outputs and the fingerprints they were rendered from.
+
+    An output is current when its fingerprint matches the recorded one and the
+    output file still has the size and mtime recorded after it rendered.
+
+    Arguments:
+        path (str): Path to the index file. Defaults to render_index.json in
+            the local review4d cache.
+        max_entries (int): Oldest entries are dropped beyond this size.
+    """
+
+    def __init__(self, path=None, max_entries=2000):
+        if path is None:
+            from .paths import get_cache_path
+
+            path = get_cache_path("render_index.json")
+
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print("review4d> Failed to read render cache %s: %s" % (self.path, e))
+            return {}
+
+    def _write(self):
+        entries = self.entries
+        if len(entries) > self.max_entries:
+            newest = sorted(
+                entries.items(),
+                key=lambda item: item[1]["rendered_at"],
+                reverse=True,
+            )
+            entries = self._entries = dict(newest[: self.max_entries])
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(entries, f)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            print("review4d> Failed to write render cache %s: %s" % (self.path, e))
+
+    def is_current(self, output_path, fingerprint):
+        """Return True if output_path was rendered from fingerprint and has not
+        changed since."""
+
+        with self._lock:
+            entry = self.entries.get(normalize_key(output_path))
+
+        if not entry or entry["fingerprint"] != fingerprint:
+            return False
+
+        try:
+            stat = os.stat(output_path)
+        except OSError:
+            return False
+
+        return stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]
+
+    def record(self, output_path, fingerprint):
+        """Record that output_path was rendered from fingerprint."""
+
+        try:
+            stat = os.stat(output_path)
+        except OSError:
+            return False
+
+        with self._lock:
+            self.entries[normalize_key(output_path)] = {
+                "fingerprint": fingerprint,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "rendered_at": time.time(),
+            }
+            self._write()
+        return True
+
+    def discard(self, output_path):
+        with self._lock:
+            if self.entries.pop(normalize_key(output_path), None):
+                self._write()
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._write()
+
+
+def normalize_key(path):
+    return os.path.normcase(os.path.abspath(path)).replace("\\", "/")
+
+
+render_cache = None
+
+
+def get_render_cache():
+    """Get the RenderCache shared by all renders."""
+
+    global render_cache
+    if render_cache is None:
+        render_cache = RenderCache()
+    return render_cache
+
+
+class Unfingerprintable(Exception):
+    """Raised for scene data that can't be fingerprinted reliably."""
+
+
+class Digest:
+    """Accumulates values into a sha1 digest."""
+
+    def __init__(self):
+        self._digest = hashlib.sha1()
+
+    def update(self, *values):
+        self._digest.update(repr(values).encode("utf-8"))
+
+    def update_bytes(self, data):
+        self._digest.update(data)
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+
+def get_take_fingerprint(render_settings, take=None, output_path="", *, doc=None):
+    """Compute a fingerprint of everything that affects a take's render.
+
+    The take must be active. The fingerprint hashes the parameters, matrices
+    and animation of the document's objects, tags, materials and shaders as
+    evaluated with the take active, point and polygon geometry, variable tag
+    data, the size and mtime of external assets, the take's overrides, the
+    render settings and their video posts, and the output path.
+
+    Dirty counters are not used because they are not persistent across
+    sessions and switching takes dirties every overridden object.
+
+    Returns:
+        str: Hex digest or None if the document contains data that can't be
+            fingerprinted, like Xpresso or node materials. Those renders are
+            never skipped.
+    """
+
+    import c4d
+
+    from .render import get_render_settings
+
+    doc = doc or c4d.documents.GetActiveDocument()
+    digest = Digest()
+
+    try:
+        digest.update("output", output_path)
+        digest.update(
+            "fps", doc.GetFps(), doc.GetMinTime().Get(), doc.GetMaxTime().Get()
+        )
+
+        rd = get_render_settings(render_settings, doc=doc)
+        digest.update("render_settings", render_settings)
+        hash_node(rd, digest, doc)
+        for video_post in iter_nodes(rd.GetFirstVideoPost()):
+            hash_node(video_post, digest, doc)
+
+        if take is not None:
+            digest.update("take", take.GetName())
+            for override in take.GetOverrides():
+                node = override.GetSceneNode()
+                digest.update("override", node.GetName() if node else None)
+                for desc_id in override.GetAllOverrideDescID():
+                    value = override.GetParameter(desc_id, c4d.DESCFLAGS_GET_NONE)
+                    digest.update(str(desc_id), hashable(value, doc))
+
+        for material in iter_nodes(doc.GetFirstMaterial()):
+            is_node_based = getattr(material, "IsNodeBased", None)
+            if is_node_based and is_node_based():
+                raise Unfingerprintable("node material %s" % material.GetName())
+            hash_node(material, digest, doc)
+
+        geometry_tag_types = get_geometry_tag_types()
+        for op in iter_nodes(doc.GetFirstObject()):
+            hash_node(op, digest, doc)
+            digest.update("matrix", repr(op.GetMg()))
+            hash_geometry(op, digest)
+            for tag in op.GetTags():
+                if tag.GetType() == c4d.Texpresso:
+                    raise Unfingerprintable("Xpresso tag on %s" % op.GetName())
+                hash_node(tag, digest, doc)
+                if isinstance(tag, c4d.VariableTag) and (
+                    tag.GetType() not in geometry_tag_types
+                ):
+                    data = tag.GetLowlevelDataAddressR()
+                    if data is not None:
+                        digest.update_bytes(bytes(data))
+
+        hash_assets(doc, digest, output_path)
+    except Unfingerprintable as e:
+        print("review4d> Render can't be skipped, found %s." % e)
+        return None
+
+    return digest.hexdigest()
+
+
+def iter_nodes(node):
+    """Depth first iteration over a node and its siblings."""
+
+    while node:
+        yield node
+        yield from iter_nodes(node.GetDown())
+        node = node.GetNext()
+
+
+def hash_node(node, digest, doc):
+    """Feed a node's type, name, parameters, animation and shaders to digest."""
+
+    digest.update(node.GetType(), node.GetName())
+    hash_container(node.GetDataInstance(), digest, doc)
+    for track in node.GetCTracks():
+        digest.update("track", str(track.GetDescriptionID()))
+        curve = track.GetCurve()
+        for index in range(curve.GetKeyCount()):
+            key = curve.GetKey(index)
+            digest.update(key.GetTime().Get(), key.GetValue(), key.GetGeData())
+
+    for shader in iter_nodes(node.GetFirstShader()):
+        digest.update("shader")
+        hash_node(shader, digest, doc)
+
+
+def hash_container(container, digest, doc):
+    if container is None:
+        return
+
+    for key, value in container:
+        digest.update(key, hashable(value, doc))
+
+
+def hash_geometry(op, digest):
+    """Feed the points, polygons and spline segments of an object to digest.
+
+    The raw data of the object's point, polygon and segment tags is hashed
+    instead of converting every point.
+    """
+
+    for tag_type in get_geometry_tag_types():
+        tag = op.GetTag(tag_type)
+        data = tag.GetLowlevelDataAddressR() if tag else None
+        if data is not None:
+            digest.update("geometry", tag_type)
+            digest.update_bytes(bytes(data))
+
+
+def get_geometry_tag_types():
+    """Get the types of the hidden tags storing an object's geometry."""
+
+    import c4d
+
+    return (c4d.Tpoint, c4d.Tpolygon, c4d.Tsegment)
+
+
+def hash_assets(doc, digest, output_path=""):
+    """Feed the size and mtime of the document's external assets to digest."""
+
+    import c4d
+
+    assets = []
+    c4d.documents.GetAllAssetsNew(doc, False, "", c4d.ASSETDATA_FLAG_NONE, assets)
+    output_key = normalize_key(output_path) if output_path else None
+    for asset in sorted(assets, key=lambda asset: asset.get("filename") or ""):
+        path = asset.get("filename") or ""
+        if path and not os.path.isabs(path):
+            path = os.path.join(doc.GetDocumentPath(), path)
+        if output_key and path and normalize_key(path) == output_key:
+            # The output changes with every render.
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            digest.update("asset", path, None)
+        else:
+            digest.update("asset", path, stat.st_size, stat.st_mtime_ns)
+
+
+def hashable(value, doc=None):
+    """Convert a parameter value to a stable representation.
+
+    Raises:
+        Unfingerprintable: For value types without a stable representation.
+    """
+
+    import c4d
+
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    if isinstance(value, (c4d.Vector, c4d.Matrix, c4d.DescID)):
+        return repr(value)
+    if isinstance(value, c4d.BaseTime):
+        return value.Get()
+    if isinstance(value, c4d.BaseContainer):
+        return [(key, hashable(item, doc)) for key, item in value]
+    if isinstance(value, c4d.BaseList2D):
+        return (value.GetType(), value.GetName())
+    if isinstance(value, c4d.SplineData):
+        return repr(value.GetKnots())
+    if isinstance(value, c4d.Gradient):
+        knots = [value.GetKnot(index) for index in range(value.GetKnotCount())]
+        return repr((knots, value.GetData(c4d.GRADIENT_INTERPOLATION)))
+    if isinstance(value, c4d.InExcludeData):
+        return [
+            (hashable(value.ObjectFromIndex(doc, index), doc), value.GetFlags(index))
+            for index in range(value.GetObjectCount())
+        ]
+    if isinstance(value, c4d.FieldList):
+        layers = []
+        for layer in iter_nodes(value.GetLayersRoot().GetFirst()):
+            linked = layer.GetLinkedObject(doc)
+            layers.append(
+                (
+                    layer.GetType(),
+                    layer.GetName(),
+                    hashable(layer.GetDataInstance(), doc),
+                    hashable(linked, doc),
+                )
+            )
+        return layers
+    if isinstance(value, c4d.PriorityData):
+        return [
+            value.GetPriorityValue(key)
+            for key in (
+                c4d.PRIORITYVALUE_MODE,
+                c4d.PRIORITYVALUE_PRIORITY,
+                c4d.PRIORITYVALUE_CAMERADEPENDENT,
+            )
+        ]
+    raise Unfingerprintable("a %s parameter" % type(value).__name__)
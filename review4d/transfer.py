@@ -0,0 +1,261 @@
+"""Copy rendered files from local scratch to their destination.
+
+Renders are written to a local scratch folder so slow network shares don't
+stall the render. A TransferPool then copies them to their destination in
+background threads. Each file is copied next to its destination under a
+temporary name, verified by size and checksum and then moved into place with
+os.replace so readers never see a partial file.
+"""
+import hashlib
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+__all__ = [
+    "copy_file_verified",
+    "FileTransfer",
+    "hash_file",
+    "Transfer",
+    "TransferError",
+    "TransferPool",
+    "TransferStatus",
+]
+
+
+CHUNK_SIZE = 8 * 1024 * 1024
+PARTIAL_SUFFIX = ".review4d-partial"
+
+
+class TransferError(Exception):
+    pass
+
+
+class TransferStatus:
+    """FileTransfer status Enum."""
+
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+    cancelled = "cancelled"
+
+    finished = (done, failed, cancelled)
+
+
+class FileTransfer:
+    """A file to copy to a destination.
+
+    Attributes:
+        src (str): Source file path.
+        dst (str): Destination file path.
+        status (str): One of the TransferStatus values.
+        size (int): Size of the source file in bytes.
+        checksum (str): Hex digest of the source file once copied.
+        error (str): Error raised while copying.
+        attempts (int): Number of times the copy was started.
+    """
+
+    def __init__(self, src, dst):
+        self.src = src
+        self.dst = dst
+        self.status = TransferStatus.queued
+        self.size = None
+        self.checksum = None
+        self.error = None
+        self.attempts = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def __repr__(self):
+        return "<FileTransfer:{}:{}>".format(self.dst, self.status)
+
+    @property
+    def finished(self):
+        return self.status in TransferStatus.finished
+
+    @property
+    def transfer_time(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class Transfer:
+    """A group of FileTransfers copied by a TransferPool.
+
+    Arguments:
+        files (list): FileTransfers to copy.
+        on_finished (callable): Called with this Transfer once all files are
+            finished. Called from a worker thread.
+    """
+
+    def __init__(self, files, on_finished=None):
+        self.files = list(files)
+        self.on_finished = on_finished
+        self.cancelled = False
+        self._done = threading.Event()
+
+    def __repr__(self):
+        return "<Transfer:{} files>".format(len(self.files))
+
+    @property
+    def finished(self):
+        return all(f.finished for f in self.files)
+
+    @property
+    def succeeded(self):
+        return all(f.status == TransferStatus.done for f in self.files)
+
+    @property
+    def errors(self):
+        return [f.error for f in self.files if f.error]
+
+    def wait(self, timeout=None):
+        """Block until all files are finished. Returns True if finished."""
+
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        """Cancel files that have not started copying."""
+
+        self.cancelled = True
+
+
+class TransferPool:
+    """Copies files to their destinations in background threads.
+
+    Arguments:
+        workers (int): Maximum number of concurrent copies.
+        retries (int): Number of times a failed copy is retried.
+        verify (bool): Compare the checksum of the copied file to the source.
+    """
+
+    def __init__(self, workers=2, retries=2, verify=True):
+        self.workers = workers
+        self.retries = retries
+        self.verify = verify
+
+    def transfer(self, files, on_finished=None):
+        """Copy files in the background.
+
+        Arguments:
+            files (list): FileTransfers or (src, dst) tuples.
+
+        Returns:
+            Transfer
+        """
+
+        files = [f if isinstance(f, FileTransfer) else FileTransfer(*f) for f in files]
+        transfer = Transfer(files, on_finished)
+        thread = threading.Thread(
+            target=self._run,
+            args=(transfer,),
+            name="review4d.TransferPool",
+            daemon=True,
+        )
+        thread.start()
+        return transfer
+
+    def _run(self, transfer):
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for file in transfer.files:
+                    executor.submit(self._run_file, transfer, file)
+        finally:
+            try:
+                if transfer.on_finished:
+                    transfer.on_finished(transfer)
+            except Exception as e:
+                print("review4d> Transfer finished callback failed: %s" % e)
+            transfer._done.set()
+
+    def _run_file(self, transfer, file):
+        while True:
+            if transfer.cancelled:
+                file.status = TransferStatus.cancelled
+                return
+
+            file.attempts += 1
+            file.status = TransferStatus.running
+            file.error = None
+            file.started_at = time.time()
+            try:
+                file.size, file.checksum = copy_file_verified(
+                    file.src, file.dst, verify=self.verify
+                )
+            except (OSError, TransferError) as e:
+                file.error = str(e)
+                file.finished_at = time.time()
+                if file.attempts > self.retries:
+                    file.status = TransferStatus.failed
+                    print("review4d> Transfer failed %s: %s" % (file.dst, e))
+                    return
+                time.sleep(min(2 ** (file.attempts - 1), 30))
+                continue
+
+            file.finished_at = time.time()
+            file.status = TransferStatus.done
+            return
+
+
+def hash_file(path, algorithm="sha1", chunk_size=CHUNK_SIZE):
+    """Compute the hex digest of a file reading it in fixed size chunks."""
+
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+
+def copy_file_verified(src, dst, verify=True):
+    """Copy src to dst atomically.
+
+    The file is copied next to dst under a temporary name using the fastest
+    copy available to shutil (sendfile on Linux, fcopyfile on macOS and large
+    buffered copies elsewhere). The copy is checked against the size and
+    checksum of src, then renamed to dst.
+
+    Returns:
+        tuple: (size, checksum) of the copied file. checksum is None when
+            verify is False.
+    """
+
+    src_stat = os.stat(src)
+    partial = dst + PARTIAL_SUFFIX
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+
+    try:
+        shutil.copyfile(src, partial)
+        with open(partial, "r+b") as f:
+            os.fsync(f.fileno())
+
+        size = os.path.getsize(partial)
+        if size != src_stat.st_size:
+            raise TransferError(
+                "Size mismatch copying %s: %s != %s." % (src, size, src_stat.st_size)
+            )
+
+        checksum = None
+        if verify:
+            checksum = hash_file(src)
+            if hash_file(partial) != checksum:
+                raise TransferError("Checksum mismatch copying %s." % src)
+
+        shutil.copystat(src, partial)
+        os.replace(partial, dst)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+
+    return size, checksum
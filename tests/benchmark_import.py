@@ -0,0 +1,52 @@
+"""Compare the cost of importing review4d lazily and eagerly.
+
+Each measurement runs in a fresh interpreter. Run with c4dpy to include the
+c4d dependent submodules in the eager measurement.
+
+    c4dpy tests/benchmark_import.py
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 10
+SNIPPETS = {
+    "import review4d": "import review4d",
+    "import review4d.context": "import review4d.context",
+    "eager (all attributes)": (
+        "import review4d\n"
+        "for name in review4d._attribute_modules:\n"
+        "    getattr(review4d, name)\n"
+    ),
+}
+TIMER = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "{}\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def measure(snippet):
+    timings = []
+    for _ in range(RUNS):
+        result = subprocess.run(
+            [sys.executable, "-c", TIMER.format(snippet)],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            return None
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return min(timings)
+
+
+if __name__ == "__main__":
+    for label, snippet in SNIPPETS.items():
+        seconds = measure(snippet)
+        if seconds is None:
+            print("%-26s failed (requires c4d?)" % label)
+        else:
+            print("%-26s %8.2f ms" % (label, seconds * 1000))
@@ -52,3 +52,118 @@ class TestBuiltinContextCollectors(unittest.TestCase):
         result = review4d.collect_context(file)
         for key in expected.keys():
             self.assertEqual(result.get(key), expected[key])
+
+
+class TestContextCache(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        calls = self.calls
+
+        class CountingCollector(review4d.ContextCollector):
+            order = 50
+
+            def execute(self, file, ctx):
+                calls.append(file)
+                ctx['counted'] = True
+                return ctx
+
+        class ImpureCollector(review4d.ContextCollector):
+            cacheable = False
+            order = 60
+
+            def execute(self, file, ctx):
+                ctx['impure'] = len(calls)
+                return ctx
+
+        self.plugins = [CountingCollector, ImpureCollector]
+        for plugin in self.plugins:
+            review4d.register_plugin(plugin)
+        review4d.clear_context_cache()
+
+    def tearDown(self):
+        for plugin in self.plugins:
+            review4d.unregister_plugin(plugin)
+        review4d.clear_context_cache()
+
+    def test_cached_collectors_run_once(self):
+        '''Cacheable collectors run once per file path.'''
+
+        file = '/Project/work/c4d/Project_v001.c4d'
+        first = review4d.collect_context(file)
+        second = review4d.collect_context(file)
+        self.assertEqual(self.calls, [file])
+        self.assertEqual(first, second)
+
+    def test_uncacheable_collectors_always_run(self):
+        '''Collectors with cacheable=False run on every call.'''
+
+        file = '/Project/work/c4d/Project_v001.c4d'
+        review4d.collect_context(file)
+        self.calls.append('external')
+        result = review4d.collect_context(file)
+        self.assertEqual(result['impure'], 2)
+
+    def test_collectors_after_uncacheable_collectors(self):
+        '''Cacheable collectors after an uncacheable one receive its values
+        and are cached by the context they receive.'''
+
+        received = []
+
+        class LateCollector(review4d.ContextCollector):
+            order = 70
+
+            def execute(self, file, ctx):
+                received.append(ctx['impure'])
+                ctx['late'] = ctx['impure'] * 10
+                return ctx
+
+        review4d.register_plugin(LateCollector)
+        self.plugins.append(LateCollector)
+
+        file = '/Project/work/c4d/Project_v001.c4d'
+        self.assertEqual(review4d.collect_context(file)['late'], 10)
+        self.assertEqual(review4d.collect_context(file)['late'], 10)
+        self.calls.append('external')
+        self.assertEqual(review4d.collect_context(file)['late'], 20)
+        self.assertEqual(received, [1, 2])
+
+    def test_cache_returns_copies(self):
+        '''Mutating a collected context does not modify the cache.'''
+
+        file = '/Project/work/c4d/Project_v001.c4d'
+        review4d.collect_context(file)['basename'] = 'Modified'
+        result = review4d.collect_context(file)
+        self.assertEqual(result['basename'], 'Project')
+
+    def test_registration_invalidates_cache(self):
+        '''Registering a plugin invalidates cached contexts.'''
+
+        file = '/Project/work/c4d/Project_v001.c4d'
+        review4d.collect_context(file)
+
+        class ExtraCollector(review4d.ContextCollector):
+            def execute(self, file, ctx):
+                ctx['extra'] = True
+                return ctx
+
+        review4d.register_plugin(ExtraCollector)
+        try:
+            result = review4d.collect_context(file)
+        finally:
+            review4d.unregister_plugin(ExtraCollector)
+
+        self.assertTrue(result['extra'])
+        self.assertEqual(len(self.calls), 2)
+
+    def test_cache_eviction(self):
+        '''ContextCache evicts least recently used entries.'''
+
+        cache = review4d.ContextCache(maxsize=2)
+        cache.set('a', {'file': 'a'})
+        cache.set('b', {'file': 'b'})
+        cache.get('a')
+        cache.set('c', {'file': 'c'})
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), {'file': 'a'})
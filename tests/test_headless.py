@@ -0,0 +1,223 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import review4d
+
+STUB_WORKER = '''
+import json
+import sys
+
+with open(sys.argv[-1], "r") as f:
+    task = json.load(f)
+
+if task["take"] == "Broken":
+    print("Something went wrong")
+    sys.exit(1)
+
+for progress in (0.25, 0.5, 1.0):
+    print("review4d>" + json.dumps({"progress": progress}), flush=True)
+
+with open(task["path"], "w") as f:
+    json.dump(task, f)
+'''
+
+
+class TestHeadlessRenderPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.stub = os.path.join(self.tempdir.name, 'stub_worker.py')
+        with open(self.stub, 'w') as f:
+            f.write(STUB_WORKER)
+        self.pool = review4d.HeadlessRenderPool(
+            executable=[sys.executable, self.stub],
+            workers=2,
+        )
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def make_task(self, take):
+        return review4d.HeadlessTask(
+            document='/project/shot.c4d',
+            render_settings='Review Settings',
+            take=take,
+            path=os.path.join(self.tempdir.name, take + '.mp4'),
+        )
+
+    def test_render_tasks(self):
+        '''Tasks render in worker processes and report progress.'''
+
+        tasks = [self.make_task(take) for take in ('Main', 'A', 'B')]
+        progress = []
+        finished = []
+        render = self.pool.render(
+            tasks,
+            on_progress=lambda task: progress.append((task.take, task.progress)),
+            on_finished=finished.append,
+        )
+        self.assertTrue(render.wait(30))
+
+        self.assertTrue(render.succeeded)
+        self.assertEqual(finished, [render])
+        self.assertIn(('A', 0.5), progress)
+        for task in tasks:
+            self.assertEqual(task.status, 'done')
+            with open(task.path, 'r') as f:
+                self.assertEqual(json.load(f)['take'], task.take)
+
+    def test_failed_task(self):
+        '''A failing worker fails its task without affecting others.'''
+
+        self.pool.retries = 1
+        tasks = [self.make_task('Broken'), self.make_task('Main')]
+        render = self.pool.render(tasks)
+        self.assertTrue(render.wait(30))
+
+        self.assertFalse(render.succeeded)
+        self.assertEqual(tasks[0].status, 'failed')
+        self.assertEqual(tasks[0].attempts, 2)
+        self.assertIn('Something went wrong', tasks[0].error)
+        self.assertEqual(tasks[1].status, 'done')
+
+    def test_task_error(self):
+        '''Errors raised while running a task fail the task.'''
+
+        tasks = [self.make_task('Main')]
+        with mock.patch.object(
+            self.pool, 'get_command', side_effect=ValueError('Bad command')
+        ):
+            render = self.pool.render(tasks)
+            self.assertTrue(render.wait(30))
+
+        self.assertFalse(render.succeeded)
+        self.assertEqual(tasks[0].status, 'failed')
+        self.assertEqual(tasks[0].error, 'ValueError: Bad command')
+
+
+STUB_FFMPEG = '''
+import sys
+
+with open(sys.argv[-1], "w") as f:
+    f.write(" ".join(sys.argv[1:]))
+'''
+
+
+class TestSegments(unittest.TestCase):
+
+    def test_split_frame_range(self):
+        '''Frame ranges split into contiguous segments.'''
+
+        self.assertEqual(
+            review4d.split_frame_range(0, 9, segment_size=4),
+            [(0, 3), (4, 7), (8, 9)],
+        )
+        self.assertEqual(
+            review4d.split_frame_range(1, 10, segments=3),
+            [(1, 4), (5, 8), (9, 10)],
+        )
+        self.assertEqual(review4d.split_frame_range(5, 5, segments=4), [(5, 5)])
+        with self.assertRaises(ValueError):
+            review4d.split_frame_range(10, 1)
+
+    def test_stitch_image_sequence(self):
+        '''Segments are stitched once every frame is rendered.'''
+
+        from review4d import headless
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            stub = os.path.join(tempdir, 'stub_ffmpeg.py')
+            with open(stub, 'w') as f:
+                f.write(STUB_FFMPEG)
+
+            frames = os.path.join(tempdir, 'frames')
+            os.makedirs(frames)
+            for frame in (1, 2, 4):
+                with open(headless.get_segment_frame_path(frames, frame), 'w'):
+                    pass
+
+            output = os.path.join(tempdir, 'out', 'movie.mp4')
+            ffmpeg = [sys.executable, stub]
+            with self.assertRaises(RuntimeError):
+                review4d.stitch_image_sequence(frames, 1, 4, output, 24, ffmpeg)
+
+            with open(headless.get_segment_frame_path(frames, 3), 'w'):
+                pass
+            review4d.stitch_image_sequence(frames, 1, 4, output, 24, ffmpeg)
+            with open(output, 'r') as f:
+                args = f.read()
+            self.assertIn('-start_number 1', args)
+            self.assertIn('frame_%04d.png', args)
+
+            review4d.stitch_image_sequence(
+                frames, 1, 4, output, 24, ffmpeg, '/sound/track.wav', 0.0
+            )
+            with open(output, 'r') as f:
+                args = f.read()
+            self.assertIn('-ss 0.041666666666666664 -i /sound/track.wav', args)
+            self.assertIn('-map 1:a?', args)
+
+
+class FakeTake:
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.children = []
+        if parent:
+            parent.children.append(self)
+
+    def GetName(self):
+        return self.name
+
+    def GetUp(self):
+        return self.parent
+
+    def GetDown(self):
+        return self.children[0] if self.children else None
+
+    def _sibling(self, offset):
+        if not self.parent:
+            return None
+        siblings = self.parent.children
+        index = siblings.index(self) + offset
+        return siblings[index] if 0 <= index < len(siblings) else None
+
+    def GetNext(self):
+        return self._sibling(1)
+
+    def GetPred(self):
+        return self._sibling(-1)
+
+
+class TestTakePath(unittest.TestCase):
+
+    def test_duplicate_take_names(self):
+        '''Takes with the same name are found by their path.'''
+
+        from review4d import headless
+
+        main = FakeTake('Main')
+        first = FakeTake('Shot', main)
+        group = FakeTake('Group', main)
+        second = FakeTake('Shot', group)
+        doc = mock.Mock()
+        doc.GetTakeData().GetMainTake.return_value = main
+
+        self.assertEqual(headless.get_take_path(main), [])
+        self.assertEqual(headless.get_take_path(first), [0])
+        self.assertEqual(headless.get_take_path(second), [1, 0])
+        for take in (main, first, second):
+            path = headless.get_take_path(take)
+            self.assertIs(headless.find_take_by_path(doc, path), take)
+        self.assertIsNone(headless.find_take_by_path(doc, [1, 3]))
+
+    def test_task_json(self):
+        '''The take path is written to the task file.'''
+
+        task = review4d.HeadlessTask('/shot.c4d', 'Review', 'Shot', take_path=[1, 0])
+        self.assertEqual(task.to_dict()['take_path'], [1, 0])
@@ -1,3 +1,6 @@
+import os
+import subprocess
+import sys
 import unittest
 
 
@@ -8,3 +11,35 @@ class TestImport(unittest.TestCase):
             import review4d
         except ImportError:
             self.fail('Failed to import review4d.')
+
+    def test_lazy_import(self):
+        '''Submodules are imported on first attribute access.'''
+
+        code = (
+            'import sys\n'
+            'import review4d\n'
+            'assert "review4d.render" not in sys.modules\n'
+            'assert "review4d.context" not in sys.modules\n'
+            'review4d.collect_context\n'
+            'assert "review4d.context" in sys.modules\n'
+            'assert "review4d.render" not in sys.modules\n'
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=root,
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_lazy_attributes_match_submodules(self):
+        '''Lazy attributes match the __all__ list of each submodule.'''
+
+        import importlib
+
+        import review4d
+
+        for module_name, names in review4d._lazy_attributes.items():
+            module = importlib.import_module('review4d.' + module_name)
+            self.assertEqual(sorted(names), sorted(module.__all__))
@@ -0,0 +1,298 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import review4d
+
+
+class TestPluginRegistry(unittest.TestCase):
+
+    def setUp(self):
+        class TestPluginType(review4d.PluginType):
+            _base_id = 100
+
+        self.plugin_type = TestPluginType
+
+    def make_plugin(self, label, order=0):
+        return type(label.replace(' ', ''), (self.plugin_type,), {
+            'label': label,
+            'order': order,
+        })
+
+    def test_register_keeps_order(self):
+        '''Registered plugins are listed by order then registration.'''
+
+        first = self.make_plugin('First', order=10)
+        second = self.make_plugin('Second', order=-10)
+        third = self.make_plugin('Third', order=10)
+        fourth = self.make_plugin('Fourth', order=0)
+        for plugin in (first, second, third, fourth):
+            review4d.register_plugin(plugin)
+
+        self.assertEqual(
+            self.plugin_type.list(),
+            [second, fourth, first, third],
+        )
+        self.assertEqual([first.id, second.id, third.id], [101, 102, 103])
+
+    def test_get_by_label_and_id(self):
+        '''Plugins can be retrieved by label or id.'''
+
+        plugin = self.make_plugin('Plugin')
+        review4d.register_plugin(plugin)
+        self.assertIs(self.plugin_type.get('Plugin'), plugin)
+        self.assertIs(self.plugin_type.get(plugin.id), plugin)
+        self.assertIsNone(self.plugin_type.get('Missing'))
+
+    def test_duplicate_labels(self):
+        '''Lookup by label returns the first plugin in order.'''
+
+        late = self.make_plugin('Plugin', order=5)
+        early = self.make_plugin('Plugin', order=1)
+        review4d.register_plugin(late)
+        review4d.register_plugin(early)
+        self.assertIs(self.plugin_type.get('Plugin'), early)
+
+        review4d.unregister_plugin(early)
+        self.assertIs(self.plugin_type.get('Plugin'), late)
+
+    def test_unregister(self):
+        '''Unregistered plugins are removed from all lookups.'''
+
+        plugin = self.make_plugin('Plugin')
+        review4d.register_plugin(plugin)
+        review4d.register_plugin(plugin)
+        self.assertEqual(self.plugin_type.list(), [plugin])
+
+        review4d.unregister_plugin(plugin)
+        self.assertEqual(self.plugin_type.list(), [])
+        self.assertIsNone(self.plugin_type.get('Plugin'))
+        self.assertIsNone(self.plugin_type.get(plugin.id))
+
+
+LAZY_MODULE = '''
+import review4d
+
+__review4d__ = {
+    'PathPreset': ['Lazy Preset'],
+}
+
+LOADED = True
+
+
+class LazyPreset(review4d.PathPreset):
+    label = 'Lazy Preset'
+
+    def execute(self, ctx):
+        return '/lazy.mp4'
+
+
+def register():
+    review4d.register_plugin(LazyPreset)
+'''
+
+
+class TestLazyPluginLoading(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.module_path = os.path.join(self.tempdir.name, 'lazy_preset.py')
+        with open(self.module_path, 'w') as f:
+            f.write(LAZY_MODULE)
+
+    def tearDown(self):
+        plugin = review4d.PathPreset.get('Lazy Preset')
+        if plugin:
+            review4d.unregister_plugin(plugin)
+        self.tempdir.cleanup()
+
+    def loaded_modules(self):
+        return [
+            module for module in review4d.plugins.plugin_modules
+            if getattr(module, '__file__', None) == self.module_path
+        ]
+
+    def test_read_plugin_manifest(self):
+        '''Manifests are read without importing the module.'''
+
+        manifest = review4d.read_plugin_manifest(self.module_path)
+        self.assertEqual(manifest, {'PathPreset': ['Lazy Preset']})
+        self.assertEqual(self.loaded_modules(), [])
+
+    def test_lazy_module_loads_on_lookup(self):
+        '''Lazy modules load when one of their plugins is requested.'''
+
+        review4d.load_plugin_path(self.tempdir.name, cache=False)
+        self.assertEqual(self.loaded_modules(), [])
+
+        plugin = review4d.PathPreset.get('Lazy Preset')
+        self.assertEqual(plugin.label, 'Lazy Preset')
+        self.assertEqual(len(self.loaded_modules()), 1)
+        self.assertNotIn('Lazy Preset', review4d.PathPreset._index.pending)
+
+    def test_concurrent_lazy_loads(self):
+        '''A lazy module is loaded once when several threads request it.'''
+
+        review4d.load_plugin_path(self.tempdir.name, cache=False)
+        lazy_module = review4d.PathPreset._index.pending['Lazy Preset'][0]
+        run_plugin_source = review4d.plugins.run_plugin_source
+        barrier = threading.Barrier(4, timeout=5)
+
+        def slow_run_plugin_source(source):
+            time.sleep(0.1)
+            return run_plugin_source(source)
+
+        def load():
+            barrier.wait()
+            lazy_module.load()
+
+        with mock.patch.object(
+            review4d.plugins, 'run_plugin_source', side_effect=slow_run_plugin_source
+        ) as run:
+            threads = [threading.Thread(target=load) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(len(self.loaded_modules()), 1)
+        self.assertEqual(review4d.PathPreset.get('Lazy Preset').label, 'Lazy Preset')
+
+    def test_shared_label(self):
+        '''Every lazy module declaring a label loads when it is requested.'''
+
+        other_path = os.path.join(self.tempdir.name, 'other_preset.py')
+        with open(other_path, 'w') as f:
+            f.write(LAZY_MODULE)
+            f.write('\n\nLazyPreset.order = -1\n')
+
+        review4d.load_plugin_path(self.tempdir.name, cache=False)
+        self.assertEqual(len(review4d.PathPreset._index.pending['Lazy Preset']), 2)
+
+        plugin = review4d.PathPreset.get('Lazy Preset')
+        self.assertEqual(plugin.order, -1)
+        self.assertEqual(len(self.loaded_modules()), 1)
+        self.assertNotIn('Lazy Preset', review4d.PathPreset._index.pending)
+        review4d.unregister_plugin(plugin)
+
+    def test_plugin_index(self):
+        '''Plugin index files provide manifests for a plugin directory.'''
+
+        index_path = review4d.write_plugin_index(self.tempdir.name)
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+        self.assertEqual(index, {'lazy_preset.py': {'PathPreset': ['Lazy Preset']}})
+
+        review4d.load_plugin_path(self.tempdir.name, cache=False)
+        self.assertEqual(self.loaded_modules(), [])
+        labels = [plugin.label for plugin in review4d.PathPreset.list()]
+        self.assertIn('Lazy Preset', labels)
+        self.assertEqual(len(self.loaded_modules()), 1)
+
+
+class TestPluginCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.plugin_dir = os.path.join(self.tempdir.name, 'plugins')
+        os.makedirs(self.plugin_dir)
+        with open(os.path.join(self.plugin_dir, 'lazy_preset.py'), 'w') as f:
+            f.write(LAZY_MODULE)
+        self.env = os.environ.get('REVIEW4D_CACHE')
+        os.environ['REVIEW4D_CACHE'] = os.path.join(self.tempdir.name, 'cache')
+
+    def tearDown(self):
+        if self.env is None:
+            os.environ.pop('REVIEW4D_CACHE', None)
+        else:
+            os.environ['REVIEW4D_CACHE'] = self.env
+        plugin = review4d.PathPreset.get('Lazy Preset')
+        if plugin:
+            review4d.unregister_plugin(plugin)
+        self.tempdir.cleanup()
+
+    def test_cache_hit_and_miss(self):
+        '''Plugin directories are served from the cache until they change.'''
+
+        path = os.path.abspath(self.plugin_dir)
+        review4d.plugins.discover_plugin_path(self.plugin_dir)
+        self.assertEqual(review4d.get_plugin_cache_stats()['paths'][path], 'miss')
+
+        sources = review4d.plugins.discover_plugin_path(self.plugin_dir)
+        self.assertEqual(review4d.get_plugin_cache_stats()['paths'][path], 'hit')
+        self.assertEqual(len(sources), 1)
+        self.assertEqual(sources[0].manifest, {'PathPreset': ['Lazy Preset']})
+        self.assertIsNotNone(sources[0].code)
+
+        # Adding a module changes the directory mtime and invalidates the cache
+        new_module = os.path.join(self.plugin_dir, 'new_module.py')
+        with open(new_module, 'w') as f:
+            f.write('VALUE = 1\n')
+        stat = os.stat(self.plugin_dir)
+        os.utime(self.plugin_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+        sources = review4d.plugins.discover_plugin_path(self.plugin_dir)
+        self.assertEqual(review4d.get_plugin_cache_stats()['paths'][path], 'miss')
+        self.assertEqual(len(sources), 2)
+
+    def test_load_from_cache(self):
+        '''Plugins load from cached code.'''
+
+        review4d.plugins.discover_plugin_path(self.plugin_dir)
+        review4d.load_plugin_path(self.plugin_dir, cache=True)
+        self.assertEqual(review4d.get_path_preset('Lazy Preset').label, 'Lazy Preset')
+
+
+class TestParallelPluginLoading(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdirs = [tempfile.TemporaryDirectory() for _ in range(2)]
+        self.paths = [tempdir.name for tempdir in self.tempdirs]
+        review4d.plugins.load_order = []
+        template = (
+            'import review4d\n'
+            'def register():\n'
+            '    review4d.plugins.load_order.append(__name__)\n'
+        )
+        for path, names in zip(self.paths, [['b_mod', 'a_mod'], ['c_mod']]):
+            for name in names:
+                with open(os.path.join(path, name + '.py'), 'w') as f:
+                    f.write(template)
+        with open(os.path.join(self.paths[0], 'broken.py'), 'w') as f:
+            f.write('raise RuntimeError("broken plugin")\n')
+
+    def tearDown(self):
+        del review4d.plugins.load_order
+        for tempdir in self.tempdirs:
+            tempdir.cleanup()
+
+    def load(self, parallel):
+        with mock.patch.object(
+            review4d.plugins,
+            'get_plugin_paths',
+            return_value=self.paths,
+        ):
+            return review4d.load_plugins(cache=False, parallel=parallel, workers=4)
+
+    def test_parallel_load_order_and_errors(self):
+        '''Parallel loading registers in path then filename order.'''
+
+        for parallel in (False, True):
+            del review4d.plugins.load_order[:]
+            results = self.load(parallel)
+            self.assertEqual(
+                review4d.plugins.load_order,
+                ['a_mod', 'b_mod', 'c_mod'],
+            )
+            self.assertEqual(
+                [result.name for result in results],
+                ['a_mod', 'b_mod', 'broken', 'c_mod'],
+            )
+            failed = [result for result in results if not result.ok]
+            self.assertEqual([result.name for result in failed], ['broken'])
+            self.assertIn('broken plugin', failed[0].traceback)
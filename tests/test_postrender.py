@@ -0,0 +1,151 @@
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+import review4d
+from review4d import postrender
+
+
+class TestPostRenderExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = review4d.PostRenderExecutor(workers=4)
+        self.addCleanup(self.executor.shutdown, wait=False)
+
+    def make_post_renderer(self, execute=None, **attrs):
+        attrs.setdefault("label", "Test")
+        attrs.setdefault("affinity", review4d.ThreadAffinity.thread)
+        if execute:
+            attrs["execute"] = lambda self, *args: execute(*args)
+        return type("TestPostRender", (review4d.PostRender,), attrs)
+
+    def run_post_renderers(self, *post_renderers):
+        tasks = self.executor.execute(post_renderers, (["render.mp4"],))
+        for task in tasks:
+            self.assertTrue(task.wait(5))
+        return tasks
+
+    def test_concurrent(self):
+        """Thread plugins run concurrently in worker threads."""
+
+        barrier = threading.Barrier(2, timeout=5)
+        calls = []
+
+        def execute(render_paths):
+            barrier.wait()
+            calls.append((render_paths, threading.current_thread().name))
+
+        tasks = self.run_post_renderers(
+            self.make_post_renderer(execute),
+            self.make_post_renderer(execute),
+        )
+        self.assertEqual([t.status for t in tasks], ["done", "done"])
+        self.assertEqual(len(calls), 2)
+        for render_paths, thread_name in calls:
+            self.assertEqual(render_paths, ["render.mp4"])
+            self.assertTrue(thread_name.startswith("review4d.PostRender"))
+
+    def test_errors_are_isolated(self):
+        """A failing plugin doesn't affect the others."""
+
+        def fail(render_paths):
+            raise RuntimeError("Broken")
+
+        with mock.patch("builtins.print") as print_:
+            failed, done = self.run_post_renderers(
+                self.make_post_renderer(fail),
+                self.make_post_renderer(lambda render_paths: None),
+            )
+        self.assertEqual(failed.status, review4d.PostRenderStatus.failed)
+        self.assertEqual(failed.error, "Broken")
+        print_.assert_called_once()
+        self.assertEqual(done.status, review4d.PostRenderStatus.done)
+
+    def test_thread_timeout(self):
+        """Thread plugins running past their timeout are reported."""
+
+        release = threading.Event()
+        post_renderer = self.make_post_renderer(
+            lambda render_paths: release.wait(5),
+            timeout=0.05,
+        )
+        with mock.patch("builtins.print"):
+            task = self.executor.execute([post_renderer], (["render.mp4"],))[0]
+            self.assertFalse(task.wait(0.5))
+            self.assertEqual(task.status, review4d.PostRenderStatus.timeout)
+
+            release.set()
+            self.assertTrue(task.wait(5))
+        self.assertEqual(task.status, review4d.PostRenderStatus.timeout)
+
+    def test_timeout_starts_with_plugin(self):
+        """Time spent queued in the pool doesn't count toward the timeout."""
+
+        self.executor = review4d.PostRenderExecutor(workers=1)
+        self.addCleanup(self.executor.shutdown, wait=False)
+        tasks = self.run_post_renderers(
+            self.make_post_renderer(lambda render_paths: time.sleep(0.3)),
+            self.make_post_renderer(lambda render_paths: None, timeout=0.2),
+        )
+        self.assertEqual([t.status for t in tasks], ["done", "done"])
+        self.assertIsNotNone(tasks[1].started_at)
+
+    def test_process_failed(self):
+        """Commands exiting with an error code fail the plugin."""
+
+        post_renderer = self.make_post_renderer(
+            affinity=review4d.ThreadAffinity.process,
+            get_commands=lambda self, render_paths: [
+                [sys.executable, "-c", "import sys; sys.exit(3)"]
+            ],
+        )
+        with mock.patch("builtins.print"):
+            task = self.run_post_renderers(post_renderer)[0]
+
+        self.assertEqual(task.status, review4d.PostRenderStatus.failed)
+        self.assertIn("exited with code 3", task.error)
+
+    def test_process(self):
+        """Process plugins run their commands as subprocesses."""
+
+        def get_commands(self, render_paths):
+            code = "import time; time.sleep(%s)"
+            return [[sys.executable, "-c", code % seconds] for seconds in self.sleep]
+
+        quick = self.make_post_renderer(
+            affinity=review4d.ThreadAffinity.process,
+            get_commands=get_commands,
+            sleep=[0, 0],
+        )
+        slow = self.make_post_renderer(
+            affinity=review4d.ThreadAffinity.process,
+            get_commands=get_commands,
+            sleep=[10],
+            timeout=0.5,
+        )
+        with mock.patch("builtins.print"):
+            quick_task, slow_task = self.run_post_renderers(quick, slow)
+
+        self.assertEqual(quick_task.status, review4d.PostRenderStatus.done)
+        self.assertEqual(slow_task.status, review4d.PostRenderStatus.timeout)
+
+    def test_main(self):
+        """Main thread plugins are queued to the main thread."""
+
+        calls = []
+        post_renderer = self.make_post_renderer(
+            calls.append,
+            affinity=review4d.ThreadAffinity.main,
+        )
+        with mock.patch.object(postrender, "execute_in_main_thread") as queue:
+            task = self.executor.execute([post_renderer], (["render.mp4"],))[0]
+
+        self.assertEqual(task.status, review4d.PostRenderStatus.queued)
+        queue.assert_called_once_with(self.executor._run, task)
+        self.assertIsNone(self.executor._executor)
+
+        queue.call_args[0][0](task)
+        self.assertEqual(calls, [["render.mp4"]])
+        self.assertEqual(task.status, review4d.PostRenderStatus.done)
@@ -106,3 +106,40 @@ class TestBuiltinPathPresets(unittest.TestCase):
             review4d.Takes.marked,
         )
         self.assertEqual(result, expected)
+
+    def test_resolve_all_presets(self):
+        """Resolve all presets and look up presets by path."""
+
+        self.set_document_path("/some/long/filepath.c4d")
+        file = review4d.normalize(self.get_document_path(), self.get_document_name())
+        results = review4d.resolve_all_presets(file)
+
+        for preset in review4d.get_path_presets():
+            if preset.label in results.errors:
+                continue
+            expected = review4d.get_preset_path(preset.label, file)
+            self.assertEqual(results[preset.label], expected)
+
+        desktop_path = results["Desktop"]
+        self.assertEqual(results.get_preset(desktop_path).label, "Desktop")
+        self.assertIsNone(results.get_preset("/not/a/preset/path.mp4"))
+        self.assertIsNone(results["Custom"])
+
+    def test_resolve_all_presets_captures_errors(self):
+        """Errors raised by a preset are captured per preset."""
+
+        class FailingPreset(review4d.PathPreset):
+            label = "Failing"
+
+            def execute(self, ctx):
+                raise review4d.PathPresetError("Missing context.")
+
+        review4d.register_plugin(FailingPreset)
+        try:
+            results = review4d.resolve_all_presets("/any/old/path.c4d")
+        finally:
+            review4d.unregister_plugin(FailingPreset)
+
+        self.assertNotIn("Failing", results)
+        self.assertIsInstance(results.errors["Failing"], review4d.PathPresetError)
+        self.assertIn("Desktop", results)
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from concurrent import futures
+from unittest import mock
+
+import c4d
+
+import review4d
+from review4d import queue
+
+
+class TestSubmitToMainThread(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(c4d, "SpecialEventAdd")
+        self.special_event_add = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(queue.execute_queued_commands)
+
+    def submit_from_thread(self, task, *args, **kwargs):
+        futures = []
+        thread = threading.Thread(
+            target=lambda: futures.append(
+                review4d.submit_to_main_thread(task, *args, **kwargs)
+            )
+        )
+        thread.start()
+        thread.join()
+        return futures[0]
+
+    def test_result(self):
+        """Future resolves to the task's result once the queue is executed."""
+
+        future = self.submit_from_thread(lambda a, b=0: a + b, 1, b=2)
+        self.assertFalse(future.done())
+        self.special_event_add.assert_called_with(review4d.COMMAND_QUEUE_ID)
+
+        review4d.execute_queued_commands()
+        self.assertEqual(future.result(timeout=1), 3)
+
+    def test_exception(self):
+        """Exceptions raised by the task are set on the Future."""
+
+        def task():
+            raise ValueError("Broken")
+
+        future = self.submit_from_thread(task)
+        review4d.execute_queued_commands()
+        with self.assertRaises(ValueError):
+            future.result(timeout=1)
+
+    def test_timeout(self):
+        """Waiting on a task that has not run yet times out."""
+
+        future = self.submit_from_thread(lambda: None)
+        with self.assertRaises(futures.TimeoutError):
+            future.result(timeout=0.01)
+
+    def test_cancelled(self):
+        """Cancelled Futures are skipped."""
+
+        task = mock.Mock()
+        future = self.submit_from_thread(task)
+        self.assertTrue(future.cancel())
+        review4d.execute_queued_commands()
+        task.assert_not_called()
+
+    def test_main_thread(self):
+        """Tasks submitted from the main thread run immediately."""
+
+        with mock.patch.object(c4d.threading, "GeIsMainThread", return_value=True):
+            future = review4d.submit_to_main_thread(lambda: "main")
+
+        self.assertEqual(future.result(timeout=0), "main")
+        self.special_event_add.assert_not_called()
+
+    def test_async(self):
+        """submit_to_main_thread_async can be awaited."""
+
+        async def main():
+            awaitable = review4d.submit_to_main_thread_async(lambda: "async")
+            asyncio.get_running_loop().call_soon(review4d.execute_queued_commands)
+            return await asyncio.wait_for(awaitable, 1)
+
+        with mock.patch.object(c4d.threading, "GeIsMainThread", return_value=False):
+            self.assertEqual(asyncio.run(main()), "async")
+
+
+class TestCommandQueue(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(c4d, "SpecialEventAdd")
+        self.special_event_add = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.queue = review4d.CommandQueue()
+        self.calls = []
+
+    def test_priority(self):
+        """Commands run by priority, then in the order they were queued."""
+
+        low, high = queue.CommandPriority.low, queue.CommandPriority.high
+        self.queue.put(self.calls.append, ("low",), priority=low)
+        self.queue.put(self.calls.append, ("first",))
+        self.queue.put(self.calls.append, ("high",), priority=high)
+        self.queue.put(self.calls.append, ("second",))
+
+        self.assertEqual(self.queue.execute(budget=None), 4)
+        self.assertEqual(self.calls, ["high", "first", "second", "low"])
+        self.assertTrue(self.queue.empty())
+
+    def test_coalesced_wakeups(self):
+        """One wakeup is sent per pending batch of commands."""
+
+        for i in range(10):
+            self.queue.put(self.calls.append, (i,))
+        self.assertEqual(self.special_event_add.call_count, 1)
+
+        self.queue.execute()
+        self.queue.put(self.calls.append, (10,))
+        self.assertEqual(self.special_event_add.call_count, 2)
+
+    def test_time_budget(self):
+        """Commands left when the budget is spent are rescheduled."""
+
+        for i in range(3):
+            self.queue.put(self.calls.append, (i,))
+
+        with mock.patch.object(queue.time, "perf_counter", side_effect=range(100)):
+            self.assertEqual(self.queue.execute(budget=1), 1)
+        self.assertEqual(self.calls, [0])
+        self.assertEqual(len(self.queue), 2)
+        self.assertEqual(self.special_event_add.call_count, 2)
+
+        self.queue.execute(budget=None)
+        self.assertEqual(self.calls, [0, 1, 2])
+
+    def test_keys(self):
+        """Commands with a key replace pending commands with the same key."""
+
+        self.queue.put(self.calls.append, ("first",))
+        self.queue.put(self.calls.append, (10,), key="progress")
+        self.queue.put(self.calls.append, ("second",))
+        self.queue.put(self.calls.append, (50,), key="progress")
+        self.assertEqual(len(self.queue), 3)
+
+        self.queue.execute(budget=None)
+        self.assertEqual(self.calls, ["first", 50, "second"])
+
+        self.queue.put(self.calls.append, (100,), key="progress")
+        self.queue.execute(budget=None)
+        self.assertEqual(self.calls[-1], 100)
+
+    def test_errors(self):
+        """A failing command does not stop the queue."""
+
+        self.queue.put(lambda: 1 / 0)
+        self.queue.put(self.calls.append, ("after",))
+        with mock.patch("traceback.print_exc"):
+            self.queue.execute(budget=None)
+        self.assertEqual(self.calls, ["after"])
+
+
+class TestQueueStats(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(c4d, "SpecialEventAdd")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.queue = review4d.CommandQueue()
+
+    def test_depth(self):
+        """Current and peak depth are tracked."""
+
+        for i in range(3):
+            self.queue.put(len, ((i,),))
+        self.assertEqual(self.queue.stats.depth, 3)
+
+        self.queue.execute(budget=None)
+        self.assertEqual(self.queue.stats.depth, 0)
+        self.assertEqual(self.queue.stats.peak_depth, 3)
+
+    def test_timings(self):
+        """Latency and run time are recorded and slow tasks are logged."""
+
+        clock = iter([0.0, 0.5, 0.6, 0.6, 0.7, 1.0])
+        with mock.patch.object(queue.time, "perf_counter", lambda: next(clock)):
+            self.queue.put(len, ("fast",))
+            self.queue.put(sorted, ("slow",))
+            self.queue.execute(budget=None)
+
+        stats = self.queue.stats.to_dict()
+        self.assertEqual(stats["latency"]["count"], 2)
+        self.assertAlmostEqual(stats["latency"]["max_ms"], 600)
+        self.assertEqual(stats["run_time"]["buckets"][">5000ms"], 0)
+        self.assertEqual(stats["run_time"]["buckets"]["<=500ms"], 1)
+
+        slow = stats["slow_tasks"]
+        self.assertEqual(len(slow), 1)
+        self.assertEqual(slow[0]["task"], "builtins.sorted")
+        self.assertAlmostEqual(slow[0]["run_time_ms"], 300)
+        self.assertIn("test_queue.py", slow[0]["origin"])
+
+    def test_submitted_task_name(self):
+        """Slow tasks submitted for a Future are named after the task."""
+
+        def query():
+            pass
+
+        self.queue.stats.slow_threshold = 0
+        with mock.patch.object(c4d.threading, "GeIsMainThread", return_value=False):
+            with mock.patch.object(queue, "COMMAND_QUEUE", self.queue):
+                review4d.submit_to_main_thread(query)
+        self.queue.execute()
+
+        task = self.queue.stats.slow_tasks[0]["task"]
+        self.assertTrue(task.endswith("test_submitted_task_name.<locals>.query"))
+
+    def test_dump(self):
+        """Stats are written to a JSON file."""
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = review4d.dump_queue_stats(os.path.join(tmp, "stats.json"))
+            with open(path, "r") as f:
+                stats = json.load(f)
+
+        self.assertEqual(set(stats), set(review4d.get_queue_stats()))
@@ -0,0 +1,299 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import c4d
+
+import review4d
+from review4d import render, rendercache
+
+
+class TestRenderMonitor(unittest.TestCase):
+
+    def test_waiters_called_after_render(self):
+        """Waiters are dispatched once rendering stops."""
+
+        states = iter([True, True, False])
+        calls = []
+        done = threading.Event()
+
+        def waiter(name):
+            calls.append(name)
+            if len(calls) == 2:
+                done.set()
+
+        monitor = review4d.RenderMonitor()
+        with mock.patch.object(render, "is_rendering", lambda: next(states, False)):
+            with mock.patch("review4d.queue.execute_in_main_thread", waiter):
+                monitor.add_waiter("first")
+                monitor.add_waiter("second")
+                self.assertTrue(done.wait(5))
+
+        self.assertEqual(calls, ["first", "second"])
+        self.assertFalse(monitor.waiting)
+
+    def test_idle_monitor_notices_new_waiters(self):
+        """Waiters added to an idle monitor are dispatched without a wake."""
+
+        calls = []
+        dispatched = threading.Event()
+
+        def waiter(name):
+            calls.append(name)
+            dispatched.set()
+
+        monitor = review4d.RenderMonitor()
+        with mock.patch.object(render, "is_rendering", lambda: False):
+            with mock.patch("review4d.queue.execute_in_main_thread", waiter):
+                monitor.add_waiter("first")
+                self.assertTrue(dispatched.wait(5))
+                dispatched.clear()
+
+                # The monitor thread is now blocked without a timeout.
+                monitor.add_waiter("second")
+                self.assertTrue(dispatched.wait(1))
+
+        self.assertEqual(calls, ["first", "second"])
+
+
+class FakeMonitor:
+
+    def __init__(self):
+        self.waiters = []
+
+    def add_waiter(self, callback):
+        self.waiters.append(callback)
+
+    def finish_render(self):
+        self.waiters.pop(0)()
+
+
+class TestRenderScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.doc = c4d.documents.BaseDocument()
+        c4d.documents.InsertBaseDocument(self.doc)
+        c4d.documents.SetActiveDocument(self.doc)
+        self.render_settings = "temp"
+        review4d.create_render_settings(self.render_settings, doc=self.doc)
+
+        take_data = self.doc.GetTakeData()
+        self.main_take = take_data.GetMainTake()
+        self.take = take_data.AddTake("Other", self.main_take, self.main_take)
+
+        self.monitor = FakeMonitor()
+        self.scheduler = review4d.RenderScheduler(self.monitor)
+        patcher = mock.patch.object(render.c4d, "CallCommand")
+        self.call_command = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        c4d.documents.KillDocument(self.doc)
+        self.doc = None
+
+    def test_render_all_takes(self):
+        """Jobs render one after another then the batch callback runs."""
+
+        callback = mock.Mock()
+        batch = self.scheduler.submit(
+            self.render_settings,
+            review4d.Takes.all,
+            callback,
+            doc=self.doc,
+        )
+        statuses = [job.status for job in batch.jobs]
+        self.assertEqual(statuses, ["running", "queued"])
+        self.assertEqual(self.call_command.call_count, 1)
+
+        self.monitor.finish_render()
+        statuses = [job.status for job in batch.jobs]
+        self.assertEqual(statuses, ["done", "running"])
+        callback.assert_not_called()
+
+        self.monitor.finish_render()
+        self.assertTrue(batch.succeeded)
+        callback.assert_called_once()
+        self.assertEqual(self.call_command.call_count, 2)
+        current_take = self.doc.GetTakeData().GetCurrentTake()
+        self.assertEqual(current_take, self.main_take)
+
+    def test_cancel_queued_job(self):
+        """Cancelled jobs are skipped and the batch callback is not run."""
+
+        callback = mock.Mock()
+        batch = self.scheduler.submit(
+            self.render_settings,
+            review4d.Takes.all,
+            callback,
+            doc=self.doc,
+        )
+        self.scheduler.cancel(batch.jobs[1])
+        self.monitor.finish_render()
+
+        statuses = [job.status for job in batch.jobs]
+        self.assertEqual(statuses, ["done", "cancelled"])
+        self.assertEqual(self.call_command.call_count, 1)
+        callback.assert_not_called()
+
+    def test_cancel_batch(self):
+        """Batches cancel their jobs in the scheduler they were submitted to."""
+
+        batch = self.scheduler.submit(
+            self.render_settings,
+            review4d.Takes.all,
+            doc=self.doc,
+        )
+        batch.cancel()
+        self.monitor.finish_render()
+
+        statuses = [job.status for job in batch.jobs]
+        self.assertEqual(statuses, ["done", "cancelled"])
+        self.assertEqual(self.scheduler.queue, [])
+
+    def test_skip_unchanged_render(self):
+        """A second render of an unchanged document is skipped."""
+
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        path = os.path.join(tempdir.name, "review.mp4")
+        review4d.create_render_settings(self.render_settings, path=path, doc=self.doc)
+        cache = review4d.RenderCache(os.path.join(tempdir.name, "index.json"))
+        self.scheduler.cache = cache
+
+        batch = self.scheduler.submit(
+            self.render_settings, doc=self.doc, use_cache=True
+        )
+        with open(path, "w") as f:
+            f.write("movie")
+        self.monitor.finish_render()
+        self.assertFalse(batch.jobs[0].cached)
+        self.assertEqual(self.call_command.call_count, 1)
+
+        callback = mock.Mock()
+        batch = self.scheduler.submit(
+            self.render_settings, callback=callback, doc=self.doc, use_cache=True
+        )
+        self.assertTrue(batch.jobs[0].cached)
+        self.assertTrue(batch.succeeded)
+        callback.assert_called_once()
+        self.assertEqual(self.call_command.call_count, 1)
+
+    def test_staged_render(self):
+        """Staged renders finish after their output is copied into place."""
+
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        path = os.path.join(tempdir.name, "review", "review.mp4")
+        review4d.create_render_settings(self.render_settings, path=path, doc=self.doc)
+        self.scheduler.transfer_pool = review4d.TransferPool(retries=0)
+
+        finished = threading.Event()
+        callback = mock.Mock(side_effect=lambda: finished.set())
+        with mock.patch("review4d.queue.execute_in_main_thread", lambda f, *a: f(*a)):
+            batch = self.scheduler.submit(
+                self.render_settings, callback=callback, doc=self.doc, stage=True
+            )
+            job = batch.jobs[0]
+            rd = review4d.get_render_settings(self.render_settings, doc=self.doc)
+            active_rd = self.doc.GetActiveRenderData()
+            self.assertEqual(rd[c4d.RDATA_PATH], path)
+            self.assertTrue(active_rd[c4d.RDATA_PATH].startswith(job.stage_folder))
+
+            with open(os.path.join(job.stage_folder, "review.mp4"), "w") as f:
+                f.write("movie")
+            self.monitor.finish_render()
+            self.assertEqual(self.doc.GetActiveRenderData(), rd)
+            self.assertFalse(active_rd.IsAlive())
+            self.assertTrue(finished.wait(10))
+
+        self.assertEqual(job.status, "done")
+        self.assertTrue(os.path.isfile(path))
+        self.assertFalse(os.path.exists(job.stage_folder))
+
+    def test_staged_render_fails_to_start(self):
+        """The render settings are restored if a staged render fails to start."""
+
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        path = os.path.join(tempdir.name, "review", "review.mp4")
+        review4d.create_render_settings(self.render_settings, path=path, doc=self.doc)
+        rd = review4d.get_render_settings(self.render_settings, doc=self.doc)
+        render_data = rendercache.iter_nodes(self.doc.GetFirstRenderData())
+        render_data_count = len(list(render_data))
+
+        self.call_command.side_effect = RuntimeError("Render failed")
+        with mock.patch("builtins.print"):
+            batch = self.scheduler.submit(
+                self.render_settings, doc=self.doc, stage=True
+            )
+
+        self.assertEqual(batch.jobs[0].status, "failed")
+        self.assertEqual(rd[c4d.RDATA_PATH], path)
+        self.assertEqual(self.doc.GetActiveRenderData(), rd)
+        self.assertEqual(
+            len(list(rendercache.iter_nodes(self.doc.GetFirstRenderData()))),
+            render_data_count,
+        )
+
+
+class TestTakeFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.doc = c4d.documents.BaseDocument()
+        self.render_settings = "temp"
+        review4d.create_render_settings(self.render_settings, doc=self.doc)
+
+    def tearDown(self):
+        c4d.documents.KillDocument(self.doc)
+        self.doc = None
+
+    def fingerprint(self):
+        return review4d.get_take_fingerprint(self.render_settings, doc=self.doc)
+
+    def test_geometry(self):
+        """Moving a point changes the fingerprint."""
+
+        op = c4d.PolygonObject(4, 1)
+        corners = ((0, 0), (1, 0), (1, 1), (0, 1))
+        op.SetAllPoints([c4d.Vector(x, 0, z) for x, z in corners])
+        op.SetPolygon(0, c4d.CPolygon(0, 1, 2, 3))
+        self.doc.InsertObject(op)
+        before = self.fingerprint()
+
+        op.SetPoint(2, c4d.Vector(2, 0, 2))
+        self.assertNotEqual(self.fingerprint(), before)
+
+    def test_shaders(self):
+        """Changing a texture path in a material's shader tree changes the
+        fingerprint."""
+
+        material = c4d.BaseMaterial(c4d.Mmaterial)
+        shader = c4d.BaseShader(c4d.Xbitmap)
+        shader[c4d.BITMAPSHADER_FILENAME] = "first.png"
+        material.InsertShader(shader)
+        material[c4d.MATERIAL_COLOR_SHADER] = shader
+        self.doc.InsertMaterial(material)
+        before = self.fingerprint()
+
+        shader[c4d.BITMAPSHADER_FILENAME] = "second.png"
+        self.assertNotEqual(self.fingerprint(), before)
+
+    def test_spline_data(self):
+        """Editing SplineData changes its hashable representation."""
+
+        spline = c4d.SplineData()
+        spline.MakeLinearSplineLinear(2)
+        before = rendercache.hashable(spline)
+        spline.InsertKnot(0.5, 1.0)
+        self.assertNotEqual(rendercache.hashable(spline), before)
+
+    def test_unfingerprintable(self):
+        """Documents with Xpresso are never skipped."""
+
+        op = c4d.BaseObject(c4d.Onull)
+        op.MakeTag(c4d.Texpresso)
+        self.doc.InsertObject(op)
+        with mock.patch("builtins.print"):
+            self.assertIsNone(self.fingerprint())
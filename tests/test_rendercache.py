@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+import review4d
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.index = os.path.join(self.tempdir.name, "render_index.json")
+        self.output = os.path.join(self.tempdir.name, "review.mp4")
+        with open(self.output, "w") as f:
+            f.write("movie")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_record_and_match(self):
+        """Recorded outputs are current until their fingerprint changes."""
+
+        cache = review4d.RenderCache(self.index)
+        self.assertFalse(cache.is_current(self.output, "a"))
+        self.assertTrue(cache.record(self.output, "a"))
+        self.assertTrue(cache.is_current(self.output, "a"))
+        self.assertFalse(cache.is_current(self.output, "b"))
+
+        # The index persists across instances
+        cache = review4d.RenderCache(self.index)
+        self.assertTrue(cache.is_current(self.output, "a"))
+
+    def test_modified_or_missing_output(self):
+        """Outputs changed or removed after rendering are not current."""
+
+        cache = review4d.RenderCache(self.index)
+        cache.record(self.output, "a")
+        with open(self.output, "a") as f:
+            f.write(" edited")
+        self.assertFalse(cache.is_current(self.output, "a"))
+
+        cache.record(self.output, "a")
+        os.remove(self.output)
+        self.assertFalse(cache.is_current(self.output, "a"))
+        self.assertFalse(cache.record(self.output, "a"))
+
+    def test_max_entries(self):
+        """The oldest entries are dropped when the index is full."""
+
+        cache = review4d.RenderCache(self.index, max_entries=2)
+        for name in ("a", "b", "c"):
+            path = os.path.join(self.tempdir.name, name)
+            with open(path, "w") as f:
+                f.write(name)
+            cache.record(path, name)
+
+        self.assertEqual(len(cache.entries), 2)
+        self.assertFalse(cache.is_current(os.path.join(self.tempdir.name, "a"), "a"))
+
@@ -0,0 +1,577 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import review4d
+from review4d.plugins import load_module
+
+shotgrid = load_module(
+    "review4d_shotgrid",
+    os.path.join(review4d.plugin_path, "plugins", "shotgrid.py"),
+)
+
+
+class FakeShotgun:
+    """Minimal in memory stand in for a shotgun_api3.Shotgun connection."""
+
+    def __init__(self):
+        self.entities = {}
+        self.uploads = []
+        self.calls = []
+        self.upload_error = None
+        self.upload_failures = 0
+        self.upload_started = threading.Event()
+        self.upload_release = None
+        self._next_id = 1000
+
+    def _same(self, a, b):
+        if isinstance(a, dict) and isinstance(b, dict):
+            return (a["type"], a["id"]) == (b["type"], b["id"])
+        return a == b
+
+    def _matches(self, entity, filters):
+        for field, operator, value in filters:
+            values = value if operator == "in" else [value]
+            if not any(self._same(entity.get(field), v) for v in values):
+                return False
+        return True
+
+    def find(self, entity_type, filters, fields=None):
+        self.calls.append("find")
+        return [
+            dict(entity)
+            for entity in self.entities.values()
+            if entity["type"] == entity_type and self._matches(entity, filters)
+        ]
+
+    def find_one(self, entity_type, filters, fields=None):
+        self.calls.append("find_one")
+        for entity in self.entities.values():
+            if entity["type"] == entity_type and self._matches(entity, filters):
+                return dict(entity)
+
+    def create(self, entity_type, data):
+        self.calls.append("create")
+        self._next_id += 1
+        entity = dict(data, type=entity_type, id=self._next_id)
+        self.entities[entity["id"]] = entity
+        return dict(entity)
+
+    def update(self, entity_type, entity_id, data):
+        self.calls.append("update")
+        self.entities[entity_id].update(data)
+        return dict(self.entities[entity_id])
+
+    def batch(self, requests):
+        calls = list(self.calls)
+        results = []
+        for request in requests:
+            if request["request_type"] == "create":
+                entity = self.create(request["entity_type"], request["data"])
+            else:
+                entity = self.update(
+                    request["entity_type"], request["entity_id"], request["data"]
+                )
+            results.append(entity)
+        self.calls = calls + ["batch"]
+        return results
+
+    def upload(self, entity_type, entity_id, path, field_name=None):
+        self.calls.append("upload")
+        self.upload_started.set()
+        if self.upload_release:
+            self.upload_release.wait(5)
+        if self.upload_error:
+            raise self.upload_error
+        if self.upload_failures:
+            self.upload_failures -= 1
+            raise ConnectionError("Upload failed")
+        self.uploads.append((entity_type, entity_id, path, field_name))
+        return len(self.uploads)
+
+
+def make_version_data(code="shot_010_anim_v001"):
+    return {
+        "project": {"type": "Project", "id": 1},
+        "code": code,
+        "description": "",
+        "sg_status_list": "rev",
+        "sg_path_to_frames": "/renders/%s.mp4" % code,
+        "entity": {"type": "Shot", "id": 10},
+        "sg_task": {"type": "Task", "id": 100},
+    }
+
+
+class TestShotGridUploader(unittest.TestCase):
+
+    def setUp(self):
+        self.shotgun = FakeShotgun()
+        self.uploader = shotgrid.ShotGridUploader(
+            lambda: self.shotgun, max_attempts=1
+        )
+
+    def test_upload_in_background(self):
+        """Uploads create a Version and upload media without blocking."""
+
+        self.shotgun.upload_release = threading.Event()
+        progress = []
+        finished = []
+        upload = self.uploader.upload(
+            make_version_data(),
+            "/renders/shot_010_anim_v001.mp4",
+            on_progress=lambda u: progress.append(u.status),
+            on_finished=finished.append,
+        )
+        self.assertTrue(self.shotgun.upload_started.wait(5))
+        self.assertFalse(upload.finished)
+        self.assertEqual(self.uploader.active, [upload])
+
+        self.shotgun.upload_release.set()
+        self.assertTrue(upload.wait(5))
+        self.assertEqual(upload.status, "done")
+        self.assertEqual(finished, [upload])
+        self.assertEqual(progress, ["creating", "uploading", "done"])
+        self.assertEqual(self.shotgun.calls, ["find", "batch", "upload"])
+        self.assertEqual(self.shotgun.uploads[0][1], upload.version["id"])
+
+    def test_existing_version_is_updated(self):
+        shotgun = self.shotgun
+        version = shotgun.create("Version", make_version_data())
+        upload = self.uploader.upload(make_version_data(), "/renders/a.mp4")
+        self.assertTrue(upload.wait(5))
+        self.assertEqual(upload.version["id"], version["id"])
+        self.assertEqual(shotgun.calls, ["create", "find", "batch", "upload"])
+        self.assertEqual(len(shotgun.find("Version", [])), 1)
+
+    def test_upload_many(self):
+        """Versions are upserted in one batch and uploaded concurrently."""
+
+        existing = self.shotgun.create("Version", make_version_data("b"))
+        self.shotgun.calls.clear()
+        uploads = self.uploader.upload_many(
+            [(make_version_data(code), "/renders/%s.mp4" % code) for code in "abc"]
+        )
+        for upload in uploads:
+            self.assertTrue(upload.wait(5))
+
+        self.assertEqual([u.status for u in uploads], ["done"] * 3)
+        self.assertEqual(uploads[1].version["id"], existing["id"])
+        self.assertEqual(self.shotgun.calls[:2], ["find", "batch"])
+        self.assertEqual(self.shotgun.calls[2:], ["upload"] * 3)
+
+    def test_upload_error(self):
+        """Errors are captured on the upload instead of raised."""
+
+        self.shotgun.upload_error = RuntimeError("Connection reset")
+        upload = self.uploader.upload(make_version_data(), "/renders/a.mp4")
+        self.assertTrue(upload.wait(5))
+        self.assertEqual(upload.status, "failed")
+        self.assertIn("Connection reset", upload.error)
+
+    def test_cancel(self):
+        """Cancelled uploads stop before their next request."""
+
+        self.shotgun.upload_release = threading.Event()
+        self.uploader.workers = 1
+        first = self.uploader.upload(make_version_data("a"), "/renders/a.mp4")
+        second = self.uploader.upload(make_version_data("b"), "/renders/b.mp4")
+        self.assertTrue(self.shotgun.upload_started.wait(5))
+        self.uploader.cancel_all()
+        self.shotgun.upload_release.set()
+
+        self.assertTrue(second.wait(5))
+        self.assertEqual(first.status, "done")
+        self.assertEqual(second.status, "cancelled")
+        self.assertEqual(len(self.shotgun.uploads), 1)
+
+
+class TestUploadQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.queue = shotgrid.UploadQueue(os.path.join(self.tempdir.name, "q.sqlite"))
+        self.shotgun = FakeShotgun()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def make_uploader(self, **kwargs):
+        return shotgrid.ShotGridUploader(
+            lambda: self.shotgun, queue=self.queue, backoff=0.01, **kwargs
+        )
+
+    def test_retry_with_backoff(self):
+        """Failed uploads are retried without creating the Version again."""
+
+        self.shotgun.upload_failures = 2
+        progress = []
+        upload = self.make_uploader().upload(
+            make_version_data(),
+            "/renders/a.mp4",
+            on_progress=lambda u: progress.append(u.status),
+        )
+        self.assertTrue(upload.wait(5))
+        self.assertEqual(upload.status, "done")
+        self.assertEqual(upload.attempts, 3)
+        self.assertEqual(progress.count("waiting"), 2)
+        self.assertEqual(self.shotgun.calls.count("batch"), 1)
+        self.assertEqual(self.queue.claim_pending(), [])
+
+    def test_give_up_after_max_attempts(self):
+        self.shotgun.upload_error = ConnectionError("Offline")
+        upload = self.make_uploader(max_attempts=2).upload(
+            make_version_data(), "/renders/a.mp4"
+        )
+        self.assertTrue(upload.wait(5))
+        self.assertEqual(upload.status, "failed")
+        self.assertEqual(upload.attempts, 2)
+
+    def test_resume_pending_uploads(self):
+        """Uploads unfinished in a previous session are resumed."""
+
+        # Simulate a session that stopped after creating the Version
+        upload = shotgrid.ShotGridUpload(make_version_data(), "/renders/a.mp4")
+        self.queue.add(upload)
+        upload.version = self.shotgun.create("Version", make_version_data())
+        upload.status = "uploading"
+        self.queue.update(upload)
+        self.shotgun.calls.clear()
+
+        uploader = self.make_uploader()
+        resumed = uploader.load_pending()
+        self.assertEqual([u.id for u in resumed], [upload.id])
+        self.assertTrue(resumed[0].wait(5))
+        self.assertEqual(resumed[0].status, "done")
+        self.assertEqual(self.shotgun.calls, ["upload"])
+        self.assertEqual(uploader.load_pending(), [])
+
+    def test_defer_without_engine(self):
+        """Uploads wait in the queue while no ShotGrid engine is running."""
+
+        def get_shotgun():
+            raise shotgrid.ShotGridUnavailable("No ShotGrid engine is running.")
+
+        uploader = shotgrid.ShotGridUploader(
+            get_shotgun, queue=self.queue, max_attempts=1
+        )
+        finished = []
+        with mock.patch("builtins.print"):
+            upload = uploader.upload(
+                make_version_data(), "/renders/a.mp4", on_finished=finished.append
+            )
+            self.assertTrue(upload.wait(5))
+        self.assertEqual(upload.status, "deferred")
+        self.assertEqual(upload.attempts, 0)
+        self.assertEqual(finished, [upload])
+        self.assertEqual(uploader.active, [])
+
+        resumed = self.make_uploader().load_pending()
+        self.assertEqual([u.id for u in resumed], [upload.id])
+        self.assertTrue(resumed[0].wait(5))
+        self.assertEqual(resumed[0].status, "done")
+
+    def test_resume_owned_uploads(self):
+        """Uploads of other running instances are resumed once their lease
+        expired."""
+
+        uploads = [
+            self.queue.add(shotgrid.ShotGridUpload(make_version_data(), path))
+            for path in ("/renders/a.mp4", "/renders/b.mp4", "/renders/c.mp4")
+        ]
+
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+        owners = [
+            (os.getppid(), time.time() + 60),
+            (os.getppid(), time.time() - 1),
+            (process.pid, time.time() + 60),
+        ]
+        conn = sqlite3.connect(self.queue.path)
+        for upload, (owner, lease_expires) in zip(uploads, owners):
+            conn.execute(
+                "UPDATE uploads SET owner = ?, lease_expires = ? WHERE id = ?",
+                (owner, lease_expires, upload.id),
+            )
+        conn.commit()
+        conn.close()
+
+        ids = [u.id for u in uploads[1:]]
+        self.assertEqual([u.id for u in self.queue.claim_pending()], ids)
+        # Claimed uploads are owned by this process
+        self.assertEqual([u.id for u in self.queue.claim_pending()], ids)
+
+    def test_resume_waits_for_engine(self):
+        """Pending uploads are not resumed before an engine is running."""
+
+        uploader = mock.Mock(get_shotgun=shotgrid.get_engine_shotgun)
+        sgtk = mock.Mock()
+        sgtk.platform.current_engine.return_value = None
+        with mock.patch.object(shotgrid, "get_uploader", return_value=uploader):
+            with mock.patch.dict("sys.modules", {"sgtk": sgtk}):
+                shotgrid.resume_uploads()
+        uploader.load_pending.assert_not_called()
+
+
+class TestShotGridCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.shotgun = FakeShotgun()
+        self.project = {"type": "Project", "id": 1}
+        for code in ("shot_020", "shot_010"):
+            self.shotgun.create("Shot", {"code": code, "project": self.project})
+        self.asset = self.shotgun.create(
+            "Asset", {"code": "chair", "project": self.project}
+        )
+        for content in ("Rig", "Model"):
+            self.shotgun.create(
+                "Task",
+                {"content": content, "entity": self.asset, "project": self.project},
+            )
+        self.shot = self.shotgun.find("Shot", [["code", "is", "shot_010"]])[0]
+        self.shotgun.calls.clear()
+        self.caches = []
+
+    def tearDown(self):
+        # Background refreshes write snapshots to the temporary directory
+        for cache in self.caches:
+            with cache._lock:
+                refreshes = list(cache._refreshing.values())
+            for done in refreshes:
+                done.wait(5)
+        self.tempdir.cleanup()
+
+    def make_cache(self, **kwargs):
+        cache = shotgrid.ShotGridCache(
+            lambda: self.shotgun, snapshot_folder=self.tempdir.name, **kwargs
+        )
+        self.caches.append(cache)
+        return cache
+
+    def test_cached_lookups(self):
+        """Entities and tasks are fetched once while they are fresh."""
+
+        cache = self.make_cache()
+        entities = cache.get_entities(self.project)
+        self.assertEqual(
+            [e["code"] for e in entities], ["chair", "shot_010", "shot_020"]
+        )
+        self.assertIs(cache.get_entities(self.project), entities)
+
+        tasks = cache.get_tasks(self.project, self.asset)
+        self.assertEqual([t["content"] for t in tasks], ["Model", "Rig"])
+        cache.get_tasks(self.project, self.asset)
+        self.assertEqual(self.shotgun.calls, ["find", "find", "find"])
+
+    def test_prefetch_project_tasks(self):
+        """Tasks of every entity are fetched in a single background query."""
+
+        cache = self.make_cache()
+        cache.prefetch(self.project)
+        self.assertEqual(len(cache.get_entities(self.project)), 3)
+        self.assertEqual(len(cache.get_tasks(self.project, self.asset)), 2)
+        self.assertEqual(cache.get_tasks(self.project, self.shot), [])
+        self.assertEqual(self.shotgun.calls.count("find"), 3)
+
+    def test_stale_values_refresh_in_background(self):
+        cache = self.make_cache(ttl=0, snapshots=False)
+        entities = cache.get_entities(self.project)
+        self.shotgun.create("Shot", {"code": "shot_030", "project": self.project})
+
+        self.assertIs(cache.get_entities(self.project), entities)
+        for _ in range(100):
+            if len(cache.get_entities(self.project)) == 4:
+                break
+            time.sleep(0.01)
+        self.assertEqual(len(cache.get_entities(self.project)), 4)
+
+    def test_snapshot(self):
+        """A new session reads the snapshot without waiting for ShotGrid."""
+
+        self.make_cache().get_entities(self.project)
+        self.shotgun.calls.clear()
+
+        cache = self.make_cache(ttl=60)
+        with mock.patch.object(cache, "_refresh_in_background") as refresh:
+            entities = cache.get_entities(self.project)
+        self.assertEqual(len(entities), 3)
+        self.assertEqual(self.shotgun.calls, [])
+        refresh.assert_called_once()
+
+    def test_prefetch_with_snapshot(self):
+        """Snapshot values are returned while a prefetch is running."""
+
+        cache = self.make_cache()
+        cache.get_entities(self.project)
+        cache.get_tasks(self.project, self.asset)
+
+        release = threading.Event()
+        find = self.shotgun.find
+
+        def slow_find(*args, **kwargs):
+            release.wait(5)
+            return find(*args, **kwargs)
+
+        cache = self.make_cache(ttl=60)
+        with mock.patch.object(self.shotgun, "find", slow_find):
+            cache.prefetch(self.project)
+            start = time.time()
+            entities = cache.get_entities(self.project)
+            tasks = cache.get_tasks(self.project, self.asset)
+            self.assertLess(time.time() - start, 1)
+            release.set()
+            cache._wait_for_refresh(cache.refresh_entities, self.project)
+            cache._wait_for_refresh(cache.refresh_tasks, self.project)
+
+        self.assertEqual(len(entities), 3)
+        self.assertEqual([t["content"] for t in tasks], ["Model", "Rig"])
+
+    def open_dialog(self, cache, entity=None, task=None):
+        context = mock.Mock(project=self.project, entity=entity, task=task)
+        dialog_cls = shotgrid.ShotGridUploaderDialog
+        with mock.patch.object(
+            dialog_cls, "AddGadget", create=True
+        ), mock.patch.object(
+            dialog_cls, "context", new_callable=mock.PropertyMock, return_value=context
+        ), mock.patch.object(
+            shotgrid, "get_shotgrid_cache", return_value=cache
+        ):
+            dialog = dialog_cls("/review/shot_030.mp4")
+            dialog.LoadShotGridState()
+        return dialog
+
+    def test_context_missing_from_snapshot(self):
+        """Entities and tasks created after the snapshot are fetched."""
+
+        cache = self.make_cache()
+        cache.get_entities(self.project)
+        cache.get_tasks(self.project, self.asset)
+
+        shot = self.shotgun.create(
+            "Shot", {"code": "shot_030", "project": self.project}
+        )
+        task = self.shotgun.create(
+            "Task", {"content": "Anim", "entity": shot, "project": self.project}
+        )
+        dialog = self.open_dialog(self.make_cache(ttl=60), shot, task)
+        self.assertEqual(dialog.state["entity"]["id"], shot["id"])
+        self.assertEqual(dialog.state["task"]["id"], task["id"])
+
+    def test_context_missing_from_shotgrid(self):
+        """Falls back to the first entity if the context's is not found."""
+
+        missing = {"type": "Shot", "id": 1}
+        dialog = self.open_dialog(self.make_cache(), missing)
+        self.assertEqual(dialog.state["entity"]["code"], "chair")
+        self.assertEqual(dialog.state["task"]["content"], "Model")
+
+
+class TestMultiTakePublishing(unittest.TestCase):
+
+    def tearDown(self):
+        shotgrid.CTX["render_path"] = ""
+        shotgrid.CTX["render_paths"] = []
+
+    def test_version_names(self):
+        """Each take's render is published to a Version named after it."""
+
+        paths = ["/review/prj_Main.mp4", "/review/prj_Closeup.v2.mp4"]
+        shotgrid.CTX["render_path"] = paths[0]
+        shotgrid.CTX["render_paths"] = paths
+        self.assertEqual(shotgrid.get_render_paths(), paths)
+        names = [shotgrid.get_version_name(path) for path in paths]
+        self.assertEqual(names, ["prj_Main", "prj_Closeup"])
+
+    def test_single_render_path(self):
+        shotgrid.CTX["render_path"] = "/review/prj.mp4"
+        self.assertEqual(shotgrid.get_render_paths(), ["/review/prj.mp4"])
+
+
+class TestMediaIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "shot_010_anim_v001.mp4")
+        with open(self.path, "wb") as f:
+            f.write(b"movie" * 1000)
+        self.shotgun = FakeShotgun()
+        self.index = shotgrid.MediaIndex(os.path.join(self.tempdir.name, "m.sqlite"))
+        self.uploader = shotgrid.ShotGridUploader(
+            lambda: self.shotgun, media_index=self.index
+        )
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def upload(self):
+        upload = self.uploader.upload(make_version_data(), self.path)
+        self.assertTrue(upload.wait(5))
+        self.assertEqual(upload.status, "done")
+        return upload
+
+    def test_skip_uploaded_media(self):
+        """Uploading the same file to the same Version again is skipped."""
+
+        first = self.upload()
+        second = self.upload()
+        self.assertFalse(first.skipped)
+        self.assertTrue(second.skipped)
+        self.assertEqual(first.checksum, review4d.hash_file(self.path))
+        self.assertEqual(len(self.shotgun.uploads), 1)
+
+    def test_changed_media_is_uploaded(self):
+        self.upload()
+        with open(self.path, "ab") as f:
+            f.write(b"more")
+        self.assertFalse(self.upload().skipped)
+        self.assertEqual(len(self.shotgun.uploads), 2)
+
+    def test_checksums_are_cached(self):
+        checksum = self.index.get_checksum(self.path)
+        with mock.patch("review4d.hash_file") as hash_file:
+            self.assertEqual(self.index.get_checksum(self.path), checksum)
+        hash_file.assert_not_called()
+
+
+class TestEntityIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.entities = [
+            {"type": "Shot", "id": i, "code": "sq%02d_sh%04d" % (i // 100, i)}
+            for i in range(10000)
+        ]
+        self.entities += [
+            {"type": "Asset", "id": 20001, "code": "chair"},
+            {"type": "Asset", "id": 20002, "code": "chair_broken"},
+            {"type": "Asset", "id": 20003, "code": "armchair"},
+        ]
+        self.index = shotgrid.EntityIndex(self.entities)
+
+    def codes(self, *args, **kwargs):
+        return [e["code"] for e in self.index.search(*args, **kwargs)]
+
+    def test_ranking(self):
+        """Exact codes rank before code prefixes and token prefixes."""
+
+        self.assertEqual(self.codes("chair"), ["chair", "chair_broken"])
+        self.assertEqual(self.codes("CHAIR br"), ["chair_broken"])
+        self.assertEqual(self.codes("arm"), ["armchair"])
+        self.assertEqual(self.codes("sq42 sh4217"), ["sq42_sh4217"])
+        self.assertEqual(self.codes("nothing"), [])
+
+    def test_limit_and_pinned(self):
+        """Pinned entities are listed first when they match the query."""
+
+        codes = self.codes("sq42", limit=5, pinned=[4250, 20001])
+        self.assertEqual(
+            codes,
+            ["sq42_sh4250", "sq42_sh4200", "sq42_sh4201", "sq42_sh4202", "sq42_sh4203"],
+        )
+        self.assertEqual(len(self.codes("", limit=200)), 200)
+        self.assertEqual(self.codes("", limit=2, pinned=[20003]), ["armchair", "chair"])
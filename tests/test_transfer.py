@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import review4d
+from review4d import transfer
+
+
+class TestTransfer(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tempdir.name, "scratch", "review.mp4")
+        self.dst = os.path.join(self.tempdir.name, "server", "review", "review.mp4")
+        os.makedirs(os.path.dirname(self.src))
+        with open(self.src, "wb") as f:
+            f.write(os.urandom(1024 * 64))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_copy_file_verified(self):
+        """Files are copied, verified and moved into place."""
+
+        size, checksum = review4d.copy_file_verified(self.src, self.dst)
+        self.assertEqual(size, os.path.getsize(self.src))
+        self.assertEqual(checksum, review4d.hash_file(self.src))
+        self.assertEqual(review4d.hash_file(self.dst, chunk_size=1000), checksum)
+        self.assertFalse(os.path.exists(self.dst + transfer.PARTIAL_SUFFIX))
+
+    def test_checksum_mismatch(self):
+        """A copy that fails verification never replaces the destination."""
+
+        os.makedirs(os.path.dirname(self.dst))
+        with open(self.dst, "w") as f:
+            f.write("previous")
+
+        checksums = iter(["a", "b"])
+        with mock.patch.object(transfer, "hash_file", lambda path: next(checksums)):
+            with self.assertRaises(review4d.TransferError):
+                review4d.copy_file_verified(self.src, self.dst)
+
+        with open(self.dst, "r") as f:
+            self.assertEqual(f.read(), "previous")
+        self.assertFalse(os.path.exists(self.dst + transfer.PARTIAL_SUFFIX))
+
+    def test_transfer_pool(self):
+        """Files are copied in the background and failures are reported."""
+
+        missing = os.path.join(self.tempdir.name, "missing.mp4")
+        finished = []
+        pool = review4d.TransferPool(workers=2, retries=0)
+        result = pool.transfer(
+            [(self.src, self.dst), (missing, self.dst + ".2")],
+            on_finished=finished.append,
+        )
+        self.assertTrue(result.wait(10))
+        self.assertEqual(finished, [result])
+
+        statuses = [f.status for f in result.files]
+        self.assertEqual(statuses, ["done", "failed"])
+        self.assertFalse(result.succeeded)
+        self.assertEqual(len(result.errors), 1)
+        self.assertTrue(os.path.isfile(self.dst))